@@ -0,0 +1,5 @@
+"""
+Offline benchmarks of the API endpoints on synthetic inputs.
+
+Run from the backend directory: python -m benchmarks --scales small,medium
+"""
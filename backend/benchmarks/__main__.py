@@ -0,0 +1,264 @@
+"""
+Benchmark runner: python -m benchmarks [options], from the backend directory.
+
+Synthetic inputs are generated once per scale (and reused from the work
+directory). Every case runs in its own forked process with a fresh cache
+directory, imports the app there and calls the endpoint in-process; wall time
+per repeat, peak RSS during the measured calls and response size are recorded.
+Results can be saved as a named baseline and later runs compared against it.
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from queue import Empty
+
+from .cases import CASES
+from .synthetic import write_protein_pdb, write_smiles, write_trajectory
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Scaling points: protein residues (7 atoms each), waters, frames, replicas, and
+# library sizes for the per-compound endpoints and the pairwise Tanimoto matrix
+SCALES = {
+    "small": {"residues": 100, "waters": 0, "frames": 50, "replicas": 2, "compounds": 100, "pairwise": 10},
+    "medium": {"residues": 500, "waters": 5000, "frames": 500, "replicas": 4, "compounds": 2000, "pairwise": 30},
+    "large": {"residues": 2000, "waters": 30000, "frames": 2000, "replicas": 8, "compounds": 20000, "pairwise": 100},
+}
+
+
+def prepare_inputs(scale, workdir):
+    """Generate (or reuse) the synthetic files of a scale; returns {input name: path(s)}."""
+    tag = "-".join(f"{key}{value}" for key, value in sorted(scale.items()))
+    directory = os.path.join(workdir, tag)
+    os.makedirs(directory, exist_ok=True)
+    path = lambda name: os.path.join(directory, name)
+
+    if not os.path.exists(path("system.pdb")):
+        write_protein_pdb(path("system.pdb"), scale["residues"], n_chains=2, n_waters=scale["waters"])
+    replicas = [path(f"replica_{k}.xtc") for k in range(max(2, scale["replicas"]))]
+    for seed, xtc in enumerate(replicas):
+        if not os.path.exists(xtc):
+            write_trajectory(path("system.pdb"), xtc, scale["frames"], seed=seed)
+    bfactor_pdbs = [path(f"bfactor_{k}.pdb") for k in range(3)]
+    for seed, pdb in enumerate(bfactor_pdbs):
+        if not os.path.exists(pdb):
+            write_protein_pdb(pdb, scale["residues"], n_chains=2, seed=seed + 1)
+    for name in ("compounds", "pairwise"):
+        if not os.path.exists(path(f"{name}.smi")):
+            write_smiles(path(f"{name}.smi"), scale[name], seed=len(name))
+
+    return {
+        "pdb": path("system.pdb"),
+        "xtc": replicas[0],
+        "replica": replicas[1],
+        "replicas": replicas[:scale["replicas"]],
+        "bfactor_pdbs": bfactor_pdbs,
+        "compounds": path("compounds.smi"),
+        "pairwise_compounds": path("pairwise.smi"),
+    }
+
+
+def _status_mb(field):
+    """A memory field of /proc/self/status in MiB (None where unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux); returns whether it worked."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _run_case(name, inputs, repeat, cache_dir, verbose, queue):
+    os.environ["SIMANA_CACHE_DIR"] = cache_dir
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    result = {"case": name}
+    with open(os.devnull, "w") as devnull, contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+            stack.enter_context(contextlib.redirect_stderr(devnull))
+        try:
+            started = time.perf_counter()
+            from main import app
+
+            from .asgi import call
+            result["import_s"] = time.perf_counter() - started
+
+            request = lambda method, path, **kwargs: call(app, method, path, **kwargs)
+            spec = dict(CASES)[name](request, inputs)
+            result["endpoint"] = f"{spec['method']} {spec['path']}"
+
+            result["rss_before_mb"] = _status_mb("VmRSS")
+            peak_reset = _reset_peak_rss()
+            times = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                status, headers, body = call(app, spec["method"], spec["path"], data=spec.get("data"),
+                                             files=spec.get("files"), params=spec.get("params"))
+                times.append(time.perf_counter() - started)
+            peak = _status_mb("VmHWM")
+            if peak is None or not peak_reset:
+                # Lifetime peak of the process, including the import and setup
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+            result.update(times=times, first_s=times[0], median_s=statistics.median(times), peak_rss_mb=peak,
+                          peak_rss_exact=peak_reset, payload_bytes=len(body), status=status)
+            # Endpoints report failures as {"error": ...} or as HTTP errors with a detail
+            if headers.get("content-type", "").startswith("application/json"):
+                payload = json.loads(body)
+                if isinstance(payload, dict) and (payload.get("error") or status >= 400):
+                    result["error"] = str(payload.get("error") or payload.get("detail"))
+            if status >= 400 and "error" not in result:
+                result["error"] = f"HTTP {status}"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+    queue.put(result)
+
+
+def run_case(name, inputs, repeat=3, timeout=None, verbose=False):
+    """Run one case in a fresh process and return its measurements."""
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    queue = context.Queue()
+    with tempfile.TemporaryDirectory(prefix="simana_bench_") as cache_dir:
+        process = context.Process(target=_run_case, args=(name, inputs, repeat, cache_dir, verbose, queue))
+        process.start()
+        started = time.monotonic()
+        try:
+            while True:
+                try:
+                    return queue.get(timeout=1.0)
+                except Empty:
+                    pass
+                # A killed process (for example by the OOM killer) never reports
+                if not process.is_alive():
+                    try:
+                        return queue.get(timeout=1.0)
+                    except Empty:
+                        return {"case": name, "error": f"process exited with code {process.exitcode}"}
+                if timeout is not None and time.monotonic() - started > timeout:
+                    process.terminate()
+                    return {"case": name, "error": f"timed out after {timeout} s"}
+        finally:
+            process.join()
+
+
+def compare(results, baseline, tolerance):
+    """Attach baseline ratios to `results`; returns the keys of regressed cases."""
+    reference = {(row["scale"], row["case"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        before = reference.get((row["scale"], row["case"]))
+        if before is None or "median_s" not in before or "median_s" not in row:
+            continue
+        row["time_ratio"] = row["median_s"] / max(before["median_s"], 1e-9)
+        row["rss_ratio"] = row["peak_rss_mb"] / max(before["peak_rss_mb"], 1e-9)
+        # Small absolute changes are noise, whatever the ratio
+        slower = row["time_ratio"] > tolerance and row["median_s"] - before["median_s"] > 0.05
+        larger = row["rss_ratio"] > tolerance and row["peak_rss_mb"] - before["peak_rss_mb"] > 20
+        if slower or larger:
+            regressions.append(f"{row['scale']}/{row['case']}")
+    return regressions
+
+
+def print_table(results, out=sys.stdout):
+    header = f"{'scale':<8} {'case':<24} {'median s':>9} {'first s':>8} {'peak MiB':>9} {'payload KiB':>12} {'vs base':>8}"
+    print(header, file=out)
+    print("-" * len(header), file=out)
+    for row in results:
+        if "median_s" not in row:
+            print(f"{row['scale']:<8} {row['case']:<24} error: {row.get('error')}", file=out)
+            continue
+        ratio = f"{row['time_ratio']:.2f}x" if "time_ratio" in row else ""
+        print(f"{row['scale']:<8} {row['case']:<24} {row['median_s']:>9.3f} {row['first_s']:>8.3f} "
+              f"{row['peak_rss_mb']:>9.1f} {row['payload_bytes'] / 1024:>12.1f} {ratio:>8}"
+              + (f"  error: {row['error']}" if row.get("error") else ""), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the API endpoints in-process.")
+    parser.add_argument("--scales", default="small", help=f"Comma-separated scales ({', '.join(SCALES)})")
+    parser.add_argument("--cases", default="", help="Comma-separated case names or prefixes (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Measured calls per case")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a case is abandoned")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "simana_bench_inputs"),
+                        help="Where synthetic inputs are generated and reused")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Store the results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against baseline NAME (exit 1 on regression)")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Allowed slowdown/memory ratio")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    parser.add_argument("--verbose", action="store_true", help="Show the endpoints' own output")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(name for name, _ in CASES))
+        return 0
+    scales = [name.strip() for name in args.scales.split(",") if name.strip()]
+    unknown = [name for name in scales if name not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    prefixes = [name.strip() for name in args.cases.split(",") if name.strip()]
+    selected = [name for name, _ in CASES if not prefixes or any(name.startswith(p) for p in prefixes)]
+
+    results = []
+    for scale_name in scales:
+        scale = SCALES[scale_name]
+        print(f"Preparing inputs for scale '{scale_name}'...", file=sys.stderr)
+        inputs = prepare_inputs(scale, args.workdir)
+        for name in selected:
+            print(f"  {scale_name}/{name}", file=sys.stderr)
+            row = run_case(name, inputs, args.repeat, args.timeout, args.verbose)
+            row.update(scale=scale_name, **{f"n_{key}": value for key, value in scale.items()})
+            results.append(row)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    regressions = []
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(os.path.join(BASELINE_DIR, f"{args.save_baseline}.json"), "w") as f:
+            json.dump(report, f, indent=1)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance}x: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Minimal in-process ASGI client.
+
+Requests are encoded (query string, multipart form with files) and passed
+straight to the application callable, so endpoints are measured without a
+server, sockets or an HTTP client library.
+"""
+
+import asyncio
+import os
+import uuid
+from urllib.parse import urlencode
+
+
+def _form_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def encode_multipart(data=None, files=None):
+    """
+    Encode form fields and files as multipart/form-data. `files` maps a field
+    name to a path or a list of paths. Returns (content_type, body).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in (data or {}).items():
+        if value is None:
+            continue
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode())
+        parts.append(_form_value(value).encode() + b"\r\n")
+    for name, paths in (files or {}).items():
+        for path in paths if isinstance(paths, (list, tuple)) else [paths]:
+            header = (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                      f'filename="{os.path.basename(path)}"\r\nContent-Type: application/octet-stream\r\n\r\n')
+            with open(path, "rb") as f:
+                parts += [header.encode(), f.read(), b"\r\n"]
+    parts.append(f"--{boundary}--\r\n".encode())
+    return f"multipart/form-data; boundary={boundary}", b"".join(parts)
+
+
+async def _request(app, method, path, query, headers, body):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    response = {"status": None, "headers": {}, "body": []}
+    finished = asyncio.Event()
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Only report a disconnect once the response is complete
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode().lower(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], b"".join(response["body"])
+
+
+def call(app, method, path, data=None, files=None, params=None):
+    """Run one request against an ASGI app; returns (status, headers, body bytes)."""
+    headers = {}
+    body = b""
+    if data is not None or files is not None:
+        headers["content-type"], body = encode_multipart(data, files)
+        headers["content-length"] = str(len(body))
+    query = urlencode({k: _form_value(v) for k, v in (params or {}).items() if v is not None})
+    return asyncio.run(_request(app, method.upper(), path, query, headers, body))
@@ -0,0 +1,104 @@
+"""
+Benchmark cases: one or more per API endpoint.
+
+A case is a (name, build) pair. `build(request, inputs)` may issue unmeasured
+setup requests (for example a PCA run whose projection id a clustering request
+needs) and returns the keyword arguments of the measured request.
+"""
+
+import json
+
+
+def _json(response):
+    status, _, body = response
+    result = json.loads(body)
+    if status != 200 or (isinstance(result, dict) and result.get("error")):
+        raise RuntimeError(f"Setup request failed ({status}): {result}")
+    return result
+
+
+def _post(path, build_data=None, files=None):
+    """Case builder for a POST request with form data and files from the inputs."""
+    def build(request, inputs):
+        return {
+            "method": "POST",
+            "path": path,
+            "data": build_data(request, inputs) if build_data else {},
+            "files": {field: inputs[key] for field, key in (files or {}).items()},
+        }
+    return build
+
+
+def _traj_post(path, **data):
+    return _post(path, lambda request, inputs: dict(data), {"pdb_file": "pdb", "xtc_file": "xtc"})
+
+
+def _setup(request, path, inputs, **data):
+    """Unmeasured trajectory request whose JSON result a case needs."""
+    return _json(request("POST", path, data=data, files={"pdb_file": inputs["pdb"], "xtc_file": inputs["xtc"]}))
+
+
+def _projection(request, inputs, **data):
+    return {"projection_id": _setup(request, "/api/pca", inputs, dpi=72)["projection_id"], **data}
+
+
+def _dccm_block(request, inputs):
+    dccm_id = _setup(request, "/api/dccm", inputs, mode="lowrank", dpi=72)["dccm_id"]
+    return {"method": "GET", "path": "/api/dccm/block", "params": {"dccm_id": dccm_id}}
+
+
+def _tile_pyramid(request, inputs):
+    return _setup(request, "/api/dccm", inputs, tiles=True, dpi=72)["tiles"]
+
+
+def _tile_meta(request, inputs):
+    return {"method": "GET", "path": f"/api/tiles/{_tile_pyramid(request, inputs)['pyramid_id']}"}
+
+
+def _tile(request, inputs):
+    pyramid = _tile_pyramid(request, inputs)
+    return {"method": "GET", "path": f"/api/tiles/{pyramid['pyramid_id']}/0/0/0", "params": {"output_format": "png"}}
+
+
+def _converted_rmsd(request, inputs):
+    _setup(request, "/api/trajectory/convert", inputs, selection="backbone")
+    return _traj_post("/api/rmsd", output_format="binary")(request, inputs)
+
+
+CASES = (
+    ("root", lambda request, inputs: {"method": "GET", "path": "/"}),
+    ("ramachandran", _post("/api/ramachandran", files={"pdb_file": "pdb"})),
+    ("contact_map", _post("/api/contact_map", files={"pdb_file": "pdb"})),
+    ("contact_map_heavy", _post("/api/contact_map", lambda request, inputs: {"mode": "heavy"}, {"pdb_file": "pdb"})),
+    ("contact_map_difference", _post("/api/contact_map/difference", files={
+        "pdb_file_a": "pdb", "pdb_file_b": "pdb", "xtc_file_a": "xtc", "xtc_file_b": "replica"})),
+    ("bfactor", _post("/api/bfactor", files={"pdb_file": "pdb"})),
+    ("bfactor_compare", _post("/api/bfactor/compare", files={"pdb_files": "bfactor_pdbs"})),
+    ("dccm", _traj_post("/api/dccm")),
+    ("dccm_lowrank", _traj_post("/api/dccm", mode="lowrank")),
+    ("dccm_tiles", _traj_post("/api/dccm", tiles=True)),
+    ("dccm_block", _dccm_block),
+    ("tile_pyramid", _tile_meta),
+    ("tile", _tile),
+    ("pca", _traj_post("/api/pca")),
+    ("pca_landscape", _traj_post("/api/pca", landscape=True)),
+    ("pca_free_energy", _post("/api/pca/free_energy", lambda request, inputs: _projection(request, inputs, kde=True))),
+    ("pca_cluster", _post("/api/pca/cluster", lambda request, inputs: _projection(request, inputs))),
+    ("pca_cluster_density", _post("/api/pca/cluster",
+                                  lambda request, inputs: _projection(request, inputs, method="density"))),
+    ("pca_replicas", _post("/api/pca/replicas", files={"pdb_file": "pdb", "xtc_files": "replicas"})),
+    ("rmsd", _traj_post("/api/rmsd")),
+    ("rmsd_json", _traj_post("/api/rmsd", output_format="json")),
+    ("rmsd_converted", _converted_rmsd),
+    ("rmsf", _traj_post("/api/rmsf")),
+    ("rog", _traj_post("/api/rog")),
+    ("sasa", _traj_post("/api/sasa")),
+    ("hbonds", _traj_post("/api/hbonds")),
+    ("pipeline", _traj_post("/api/pipeline", analyses="rmsd,rmsf,rog,dccm,pca")),
+    ("trajectory_convert", _traj_post("/api/trajectory/convert")),
+    ("lipinski", _post("/api/lipinski", files={"compounds_file": "compounds"})),
+    ("boiled_egg", _post("/api/boiled_egg", files={"compounds_file": "compounds"})),
+    ("tanimoto", _post("/api/tanimoto", files={"file": "pairwise_compounds"})),
+    ("tanimoto_pair", _post("/api/tanimoto", lambda request, inputs: {
+        "smiles1": "CC(=O)Oc1ccccc1C(=O)O", "smiles2": "CC(=O)Nc1ccc(O)cc1"})),
+)
@@ -0,0 +1,170 @@
+"""
+Synthetic inputs for the benchmarks.
+
+Proteins are ideal alpha-helical segments of backbone atoms plus CB and the
+hydrogens H and HA, packed side by side on a square lattice and optionally
+capped by a slab of water. Trajectories add a few slow collective modes and
+thermal noise to the reference coordinates. Compound libraries are SMILES
+assembled from ring cores, linkers and substituents, valid by construction.
+Everything is seeded, so the same parameters always produce the same files.
+"""
+
+import numpy as np
+
+HELIX_LENGTH = 40
+HELIX_SPACING = 10.0
+WATER_SPACING = 3.1
+RESIDUE_NAMES = ("ALA", "SER", "LEU", "GLU", "LYS", "VAL", "THR", "ASP")
+CHAIN_IDS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Ideal alpha helix: (atom, element, radius, angle offset (deg), rise offset) relative to CA
+HELIX_ATOMS = (
+    ("N", "N", 1.55, -28.0, -0.99),
+    ("H", "H", 2.15, -40.0, -1.75),
+    ("CA", "C", 2.30, 0.0, 0.0),
+    ("HA", "H", 3.15, -8.0, 0.55),
+    ("CB", "C", 3.30, 12.0, -0.90),
+    ("C", "C", 1.63, 28.0, 1.02),
+    ("O", "O", 1.75, 42.0, 2.20),
+)
+HELIX_TURN = np.deg2rad(100.0)
+HELIX_RISE = 1.5
+
+# Cores end on a ring atom with a free valence; prefixes bond through their last
+# atom and suffixes through their first
+RING_CORES = ("c1ccccc1", "c1ccncc1", "C1CCNCC1", "c1ccc2ccccc2c1", "C1CCOC1", "c1ccsc1", "C1CCCCC1", "c1ccoc1")
+LINKERS = ("", "C", "CC", "O", "N", "C(=O)N", "S", "OCC")
+PREFIXES = ("", "C", "O", "N", "F", "Cl", "OC(=O)", "NC(=O)", "CO", "CC", "CN(C)", "NS(=O)(=O)", "N#C")
+SUFFIXES = ("", "C", "O", "N", "F", "Cl", "C(=O)O", "C(=O)N", "OC", "CC", "N(C)C", "S(=O)(=O)N", "C#N")
+
+
+def protein_coordinates(n_residues):
+    """Atom names, elements, residue numbers and coordinates of helical segments on a lattice."""
+    n_segments = -(-n_residues // HELIX_LENGTH)
+    side = int(np.ceil(np.sqrt(n_segments)))
+    residue = np.arange(n_residues)
+    segment, position = residue // HELIX_LENGTH, residue % HELIX_LENGTH
+    # Alternate segment directions so consecutive segments start next to each other
+    position = np.where(segment % 2 == 0, position, HELIX_LENGTH - 1 - position)
+    origin = np.stack([(segment % side) * HELIX_SPACING, (segment // side) * HELIX_SPACING], axis=1)
+
+    coordinates = []
+    for _, _, radius, offset, rise in HELIX_ATOMS:
+        angle = position * HELIX_TURN + np.deg2rad(offset)
+        coordinates.append(np.column_stack([
+            origin[:, 0] + radius * np.cos(angle),
+            origin[:, 1] + radius * np.sin(angle),
+            position * HELIX_RISE + rise,
+        ]))
+    # (residues, atoms per residue, 3) -> atoms in residue order
+    coordinates = np.stack(coordinates, axis=1).reshape(-1, 3)
+    names = np.tile([atom[0] for atom in HELIX_ATOMS], n_residues)
+    elements = np.tile([atom[1] for atom in HELIX_ATOMS], n_residues)
+    return names, elements, np.repeat(residue, len(HELIX_ATOMS)), coordinates
+
+
+def water_coordinates(n_waters, above):
+    """Oxygen and hydrogen positions of `n_waters` waters on a lattice above z = `above`."""
+    side = int(np.ceil(np.sqrt(n_waters / 4))) or 1
+    index = np.arange(n_waters)
+    oxygen = np.column_stack([
+        (index % side) * WATER_SPACING,
+        (index // side % side) * WATER_SPACING,
+        above + 3.0 + (index // side ** 2) * WATER_SPACING,
+    ])
+    h1 = oxygen + [0.96, 0.0, 0.0]
+    h2 = oxygen + [-0.24, 0.93, 0.0]
+    return np.stack([oxygen, h1, h2], axis=1).reshape(-1, 3)
+
+
+def _pdb_line(serial, name, resname, chain, resid, xyz, bfactor, segid, element, record="ATOM"):
+    atom_name = f" {name:<3}" if len(name) < 4 else name
+    return (f"{record:<6}{serial % 100000:>5} {atom_name:<4} {resname:<3} {chain}{resid % 10000:>4}    "
+            f"{xyz[0]:8.3f}{xyz[1]:8.3f}{xyz[2]:8.3f}{1.0:6.2f}{bfactor:6.2f}      {segid:<4}{element:>2}\n")
+
+
+def write_protein_pdb(path, n_residues, n_chains=1, n_waters=0, seed=0):
+    """
+    Write a synthetic protein of `n_residues` (7 atoms each) split into
+    `n_chains` chains, plus `n_waters` waters. Returns the number of atoms.
+    """
+    rng = np.random.default_rng(seed)
+    names, elements, residues, coordinates = protein_coordinates(n_residues)
+    chain_of = np.minimum(residues * n_chains // max(n_residues, 1), n_chains - 1)
+    # Smooth per-residue B-factors with a little noise
+    bfactors = 20 + 10 * np.sin(residues / 7.0 + seed) + rng.normal(0, 1.5, len(residues))
+
+    serial = 0
+    with open(path, "w") as f:
+        f.write("REMARK   Synthetic benchmark system\n")
+        previous_chain = 0
+        first_residue = 0
+        for k in range(len(names)):
+            chain = chain_of[k]
+            if chain != previous_chain:
+                f.write("TER\n")
+                previous_chain, first_residue = chain, residues[k]
+            serial += 1
+            resid = residues[k] - first_residue + 1
+            f.write(_pdb_line(serial, names[k], RESIDUE_NAMES[residues[k] % len(RESIDUE_NAMES)],
+                              CHAIN_IDS[chain % len(CHAIN_IDS)], resid, coordinates[k], bfactors[k],
+                              CHAIN_IDS[chain % len(CHAIN_IDS)], elements[k]))
+        if n_waters:
+            f.write("TER\n")
+            waters = water_coordinates(n_waters, coordinates[:, 2].max() if len(coordinates) else 0.0)
+            for k, xyz in enumerate(waters):
+                serial += 1
+                name, element = (("OW", "O"), ("HW1", "H"), ("HW2", "H"))[k % 3]
+                f.write(_pdb_line(serial, name, "SOL", "W", k // 3 + 1, xyz, 30.0, "SOL", element, "HETATM"))
+        f.write("END\n")
+    return serial
+
+
+def write_trajectory(topology_path, trajectory_path, n_frames, dt=10.0, amplitude=1.5, noise=0.15, n_modes=3,
+                     seed=0):
+    """
+    Write an XTC of `n_frames` for a topology: the reference coordinates plus
+    `n_modes` slow sinusoidal collective motions and Gaussian noise (Angstrom).
+    """
+    import MDAnalysis as mda
+
+    rng = np.random.default_rng(seed)
+    u = mda.Universe(topology_path)
+    reference = u.atoms.positions.copy()
+    span = np.ptp(reference, axis=0) + 1.0
+    # Smooth displacement fields: plane waves over the system with random directions
+    modes = []
+    for _ in range(n_modes):
+        wave = rng.normal(size=3) / span * 2 * np.pi
+        direction = rng.normal(size=3)
+        field = np.sin(reference @ wave + rng.uniform(0, 2 * np.pi))[:, None] * (direction / np.linalg.norm(direction))
+        modes.append((field.astype(np.float32), rng.uniform(20, 200), rng.uniform(0, 2 * np.pi)))
+
+    u.dimensions = [*(span + 10.0), 90.0, 90.0, 90.0]
+    with mda.Writer(trajectory_path, n_atoms=len(u.atoms)) as writer:
+        for frame in range(n_frames):
+            positions = reference.copy()
+            for field, period, phase in modes:
+                positions += amplitude * np.sin(2 * np.pi * frame / period + phase) * field
+            positions += rng.normal(0, noise, positions.shape).astype(np.float32)
+            u.atoms.positions = positions
+            u.trajectory.ts.time = frame * dt
+            writer.write(u.atoms)
+
+
+def random_smiles(rng):
+    """One SMILES of the form prefix-core[-linker-core]-suffix."""
+    pick = lambda options: options[rng.integers(len(options))]
+    parts = [pick(PREFIXES), pick(RING_CORES)]
+    if rng.random() < 0.7:
+        parts += [pick(LINKERS), pick(RING_CORES)]
+    parts.append(pick(SUFFIXES))
+    return "".join(parts)
+
+
+def write_smiles(path, n_compounds, seed=0):
+    """Write a 'SMILES name' library of `n_compounds` molecules."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for k in range(n_compounds):
+            f.write(f"{random_smiles(rng)} cpd{k + 1}\n")
@@ -0,0 +1,3 @@
+"""
+Cheminformatics helpers (descriptor calculation, rule evaluation) used by the API.
+"""
@@ -0,0 +1,251 @@
+"""
+Batch descriptor engine for compound libraries.
+
+SMILES are sharded into chunks and processed by a pool of worker processes. Each
+worker parses a molecule once and computes the whole descriptor set for it in a
+single pass, returning one DataFrame per chunk. Rule evaluation (Lipinski
+violations, BOILED-Egg regions) then runs vectorised over the descriptor table.
+"""
+
+from collections import Counter, deque
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+try:
+    from rdkit import Chem, RDLogger
+    from rdkit.Chem import Crippen, Descriptors, rdMolDescriptors
+    RDLogger.DisableLog("rdApp.*")
+    RDKIT_INSTALLED = True
+except ImportError:
+    RDKIT_INSTALLED = False
+
+from resources import budget_workers, process_pool
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Columns produced by each descriptor set, in the order they are reported
+DESCRIPTOR_SETS = {
+    "lipinski": ["MW", "nBonds", "fChar", "nHet", "MaxRing", "nRing", "nRot",
+                 "TPSA", "nHD", "nHA", "LogP", "SC"],
+    "boiled_egg": ["TPSA", "LogP"],
+}
+INTEGER_COLUMNS = {"nBonds", "fChar", "nHet", "MaxRing", "nRing", "nRot", "nHD", "nHA", "SC"}
+
+# (column, upper limit, label) for each rule of five criterion
+LIPINSKI_RULES = [
+    ("MW", 500, "MolWt > 500"),
+    ("nHD", 5, "HDonors > 5"),
+    ("nHA", 10, "HAcceptors > 10"),
+    ("LogP", 5, "LogP > 5"),
+]
+
+# (center, width, height) of the BOILED-Egg ellipses in (WLogP, TPSA) space
+EGG_WHITE_ELLIPSE = ((2.3, 70.0), 7.6, 140.0)
+EGG_YOLK_ELLIPSE = ((2.8, 90.0), 6.0, 120.0)
+
+REGION_ABSORPTION = {
+    "egg_white": "High probability of passive absorption by the gastrointestinal tract",
+    "egg_yolk": "High probability of brain penetration",
+    "outside": "Low probability of both GI absorption and brain penetration",
+}
+
+
+def parse_smiles_text(smiles):
+    """Split newline separated form input into (smiles, name) records; names follow '#'."""
+    records = []
+    for line in smiles.split('\n'):
+        if not line.strip():
+            continue
+        smi, _, name = line.partition('#')
+        records.append((smi.strip(), name.strip()))
+    return records
+
+
+def _lipinski_values(mol):
+    # A single walk over the atoms gives both the formal charge and the element counts
+    atom_dist = Counter()
+    formal_charge = 0
+    for atom in mol.GetAtoms():
+        atom_dist[atom.GetSymbol()] += 1
+        formal_charge += atom.GetFormalCharge()
+
+    atom_rings = mol.GetRingInfo().AtomRings()
+    values = [
+        Descriptors.ExactMolWt(mol),
+        mol.GetNumBonds(),
+        formal_charge,
+        rdMolDescriptors.CalcNumHeteroatoms(mol),
+        max(len(ring) for ring in atom_rings) if atom_rings else 0,
+        len(atom_rings),
+        Descriptors.NumRotatableBonds(mol),
+        rdMolDescriptors.CalcTPSA(mol),
+        rdMolDescriptors.CalcNumHBD(mol),
+        rdMolDescriptors.CalcNumHBA(mol),
+        Crippen.MolLogP(mol),
+        len(Chem.FindMolChiralCenters(mol)),
+    ]
+    return values, dict(atom_dist)
+
+
+def _boiled_egg_values(mol):
+    return [rdMolDescriptors.CalcTPSA(mol), Crippen.MolLogP(mol)], None
+
+
+_DESCRIPTOR_FUNCTIONS = {
+    "lipinski": _lipinski_values,
+    "boiled_egg": _boiled_egg_values,
+}
+
+
+def _to_mol(source):
+    # Sources are SMILES strings or RDKit binary molecules (from file suppliers);
+    # None marks an entry the file supplier already failed to parse
+    if source is None:
+        return None
+    if isinstance(source, (bytes, bytearray)):
+        return Chem.Mol(bytes(source))
+    return Chem.MolFromSmiles(source)
+
+
+def descriptor_chunk(chunk, descriptor_set="lipinski"):
+    """
+    Compute one descriptor set for a list of (position, source) pairs.
+
+    Returns a DataFrame of the valid molecules indexed by input position and the
+    list of positions that could not be parsed.
+    """
+    columns = DESCRIPTOR_SETS[descriptor_set]
+    compute = _DESCRIPTOR_FUNCTIONS[descriptor_set]
+
+    positions = []
+    rows = []
+    atom_dists = []
+    invalid = []
+    for position, source in chunk:
+        try:
+            mol = _to_mol(source)
+            if mol is None:
+                invalid.append(position)
+                continue
+            values, atom_dist = compute(mol)
+        except Exception:
+            invalid.append(position)
+            continue
+        positions.append(position)
+        rows.append(values)
+        atom_dists.append(atom_dist)
+
+    table = pd.DataFrame(rows, columns=columns, index=pd.Index(positions, dtype=np.int64))
+    for column in columns:
+        table[column] = table[column].astype(np.int64 if column in INTEGER_COLUMNS else np.float64)
+    if descriptor_set == "lipinski":
+        table["AtomDistribution"] = atom_dists
+    return table, invalid
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_descriptor_chunks(sources, descriptor_set="lipinski", chunk_size=DEFAULT_CHUNK_SIZE,
+                           n_workers=None):
+    """
+    Yield (table, invalid_positions) per chunk of `sources`, in input order.
+
+    `sources` may be any iterable (including a generator) of SMILES strings or
+    RDKit binary molecules. Inputs that fit in one chunk are processed in-process;
+    larger inputs are sharded across a process pool with a bounded number of chunks
+    in flight, so memory stays proportional to the chunk size.
+    """
+    if not RDKIT_INSTALLED:
+        raise RuntimeError("RDKit not installed on the server")
+    if descriptor_set not in DESCRIPTOR_SETS:
+        raise ValueError(f"Unknown descriptor set: {descriptor_set}")
+
+    chunks = _chunked(enumerate(sources), max(1, chunk_size))
+    first = next(chunks, None)
+    if first is None:
+        return
+    second = next(chunks, None)
+    n_workers = budget_workers(n_workers)
+
+    if second is None or n_workers == 1:
+        yield descriptor_chunk(first, descriptor_set)
+        if second is not None:
+            yield descriptor_chunk(second, descriptor_set)
+            for chunk in chunks:
+                yield descriptor_chunk(chunk, descriptor_set)
+        return
+
+    with process_pool(n_workers) as executor:
+        pending = deque()
+        for chunk in (first, second):
+            pending.append(executor.submit(descriptor_chunk, chunk, descriptor_set))
+        for chunk in chunks:
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(descriptor_chunk, chunk, descriptor_set))
+        while pending:
+            yield pending.popleft().result()
+
+
+def compute_descriptor_table(sources, descriptor_set="lipinski", chunk_size=DEFAULT_CHUNK_SIZE,
+                             n_workers=None):
+    """Compute the full descriptor table; returns (table, invalid_positions)."""
+    tables = []
+    invalid = []
+    for table, chunk_invalid in iter_descriptor_chunks(sources, descriptor_set, chunk_size, n_workers):
+        tables.append(table)
+        invalid.extend(chunk_invalid)
+    if not tables:
+        return descriptor_chunk([], descriptor_set)[0], invalid
+    return pd.concat(tables), invalid
+
+
+def evaluate_lipinski(table):
+    """Add LogD/LogS estimates and the rule of five verdict to a descriptor table."""
+    table = table.copy()
+    table.insert(table.columns.get_loc("LogP") + 1, "LogD", table["LogP"])
+    table.insert(table.columns.get_loc("LogD") + 1, "LogS", table["LogP"] - 0.89)
+
+    flags = np.column_stack([table[column].to_numpy() > limit for column, limit, _ in LIPINSKI_RULES])
+    # Encode each row's violations as a bit pattern and look up its label
+    codes = flags.astype(np.int64) @ (1 << np.arange(len(LIPINSKI_RULES)))
+    labels = np.array([
+        ", ".join(label for bit, (_, _, label) in enumerate(LIPINSKI_RULES) if code >> bit & 1) or "--"
+        for code in range(1 << len(LIPINSKI_RULES))
+    ], dtype=object)
+
+    table["FollowsLipinski"] = np.where(codes == 0, "Yes", "No")
+    table["Violations"] = labels[codes]
+    return table
+
+
+def _inside_ellipse(x, y, ellipse):
+    (cx, cy), width, height = ellipse
+    return (x - cx) ** 2 / (width / 2) ** 2 + (y - cy) ** 2 / (height / 2) ** 2 <= 1
+
+
+def boiled_egg_regions(wlogp, tpsa):
+    """Classify (WLogP, TPSA) points into 'egg_yolk', 'egg_white' or 'outside'."""
+    wlogp = np.asarray(wlogp, dtype=np.float64)
+    tpsa = np.asarray(tpsa, dtype=np.float64)
+    in_white = _inside_ellipse(wlogp, tpsa, EGG_WHITE_ELLIPSE)
+    in_yolk = _inside_ellipse(wlogp, tpsa, EGG_YOLK_ELLIPSE)
+    return np.where(in_yolk, "egg_yolk", np.where(in_white, "egg_white", "outside")).astype(object)
+
+
+def evaluate_boiled_egg(table):
+    """Add WLogP, region and absorption columns to a descriptor table."""
+    table = table.copy()
+    table["wlogp"] = table["LogP"]
+    table["region"] = boiled_egg_regions(table["LogP"].to_numpy(), table["TPSA"].to_numpy())
+    table["absorption"] = table["region"].map(REGION_ABSORPTION)
+    return table
@@ -0,0 +1,162 @@
+"""
+File-based compound ingestion.
+
+Uploads are streamed to disk in blocks, gzip input is decompressed on the fly, and
+the molecules are parsed with RDKit's multithreaded SDF/SMILES suppliers, using
+the job's thread budget. The result feeds the batch descriptor engine directly.
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+
+try:
+    from rdkit import Chem, RDLogger
+    RDLogger.DisableLog("rdApp.*")
+    RDKIT_INSTALLED = True
+except ImportError:
+    RDKIT_INSTALLED = False
+
+from resources import current_budget
+from uploads import UPLOAD_BLOCK_SIZE, save_upload
+
+from .descriptors import parse_smiles_text
+
+SDF_EXTENSIONS = (".sdf", ".sd", ".mol", ".mdl")
+SMILES_EXTENSIONS = (".smi", ".smiles", ".ism", ".can", ".txt")
+
+
+def detect_compound_format(path, filename=""):
+    """
+    Return (format, compressed) for a saved compound file.
+
+    The format is 'sdf' or 'smiles', taken from the file extension when it is known
+    and otherwise sniffed from the content; gzip is detected from the magic bytes.
+    """
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+
+    name = filename.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(SDF_EXTENSIONS):
+        return "sdf", compressed
+    if name.endswith(SMILES_EXTENSIONS):
+        return "smiles", compressed
+
+    opener = gzip.open if compressed else open
+    with opener(path, "rb") as f:
+        head = f.read(1 << 16)
+    is_sdf = b"$$$$" in head or b"M  END" in head or b"V2000" in head or b"V3000" in head
+    return ("sdf" if is_sdf else "smiles"), compressed
+
+
+def _supplier(path, file_format, n_threads):
+    if file_format == "sdf":
+        return Chem.MultithreadedSDMolSupplier(path, numWriterThreads=n_threads)
+    return Chem.MultithreadedSmilesMolSupplier(
+        path, delimiter=" \t", smilesColumn=0, nameColumn=1, titleLine=False,
+        numWriterThreads=n_threads
+    )
+
+
+def _entry(mol, text, file_format):
+    if mol is not None:
+        name = mol.GetProp("_Name") if mol.HasProp("_Name") else ""
+        return (Chem.MolToSmiles(mol), name), mol.ToBinary()
+    if file_format == "sdf":
+        return ("", text.split("\n", 1)[0].strip()), None
+    smi, _, name = text.strip().partition(" ")
+    return (smi, name.strip()), None
+
+
+def read_compound_file(path, file_format, n_threads=None):
+    """
+    Parse a (decompressed) compound file with a multithreaded supplier.
+
+    Yields ((smiles, name), source) in file order, where `source` is the RDKit
+    binary molecule, or None where the entry could not be parsed. Only entries
+    that arrive ahead of their turn are buffered, so the stream can be fed
+    straight to the descriptor engine.
+    """
+    if not RDKIT_INSTALLED:
+        raise RuntimeError("RDKit not installed on the server")
+
+    n_threads = n_threads or current_budget()
+    supplier = _supplier(path, file_format, n_threads)
+
+    # Molecules arrive out of order; record ids count entries from 1. The supplier
+    # can also repeat a record as None at end of input, which must be dropped.
+    pending = {}
+    next_id = 1
+    for mol in supplier:
+        record_id = supplier.GetLastRecordId()
+        text = supplier.GetLastItemText()
+        if record_id < next_id or record_id in pending or (mol is None and not text.strip()):
+            continue
+        pending[record_id] = _entry(mol, text, file_format)
+        while next_id in pending:
+            yield pending.pop(next_id)
+            next_id += 1
+    for record_id in sorted(pending):
+        yield pending[record_id]
+
+
+def split_records(entries):
+    """
+    Split a stream of (record, source) pairs into a dict of records by position,
+    filled as the sources are consumed, and a generator of the sources.
+    """
+    records = {}
+
+    def sources():
+        for position, (record, source) in enumerate(entries):
+            records[position] = record
+            yield source
+    return records, sources()
+
+
+def _read_upload_file(temp_dir, path, file_format, n_threads):
+    # Owns the temporary directory, which must outlive a streamed response
+    try:
+        yield from read_compound_file(path, file_format, n_threads)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+async def load_compound_upload(upload, n_threads=None):
+    """
+    Save and decompress an uploaded SDF/SMILES file (optionally gzipped) and return
+    (records, sources) as from `split_records`; parsing happens as the sources are read.
+    """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        raw_path = os.path.join(temp_dir, "upload")
+        await save_upload(upload, raw_path)
+
+        file_format, compressed = detect_compound_format(raw_path, upload.filename or "")
+        path = raw_path
+        if compressed:
+            path = os.path.join(temp_dir, "compounds")
+            with gzip.open(raw_path, "rb") as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst, UPLOAD_BLOCK_SIZE)
+            os.unlink(raw_path)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    return split_records(_read_upload_file(temp_dir, path, file_format, n_threads))
+
+
+async def load_compound_input(smiles=None, upload=None, n_threads=None):
+    """
+    Return (records, sources) from either an uploaded compound file or the
+    newline separated `smiles` form text (with optional '# name' comments).
+    `records` maps input positions to (smiles, name) pairs.
+    """
+    if upload is not None:
+        return await load_compound_upload(upload, n_threads)
+    if not smiles or not smiles.strip():
+        raise ValueError("Provide SMILES strings or a compound file")
+    records = parse_smiles_text(smiles)
+    return dict(enumerate(records)), [smi for smi, _ in records]
@@ -0,0 +1,81 @@
+"""
+Plotting helpers for compound libraries.
+
+Every function draws a whole library with a constant number of matplotlib artists
+so render time does not grow with the number of compounds.
+"""
+
+import numpy as np
+
+REGION_COLORS = {
+    "egg_white": "yellow",
+    "egg_yolk": "white",
+    "outside": "grey",
+}
+
+DEFAULT_MAX_LABELS = 50
+DEFAULT_DENSITY_THRESHOLD = 5000
+
+
+def label_indices(n_points, max_labels):
+    """Evenly decimated indices of the points that get a text label."""
+    if max_labels <= 0 or n_points == 0:
+        return np.zeros(0, dtype=np.int64)
+    if n_points <= max_labels:
+        return np.arange(n_points)
+    return np.unique(np.linspace(0, n_points - 1, max_labels).round().astype(np.int64))
+
+
+def draw_boiled_egg_points(ax, wlogp, tpsa, regions, labels, point_size=100, label_fontsize=9,
+                           max_labels=DEFAULT_MAX_LABELS, density_threshold=DEFAULT_DENSITY_THRESHOLD,
+                           gridsize=60, extent=None):
+    """
+    Draw compounds on a BOILED-Egg axis.
+
+    Up to `density_threshold` compounds are drawn as a single scatter coloured by
+    region, with at most `max_labels` annotations. Larger sets are drawn as a
+    hexbin density layer instead. Returns the hexbin collection in density mode
+    (for a colorbar), otherwise None.
+    """
+    wlogp = np.asarray(wlogp, dtype=np.float64)
+    tpsa = np.asarray(tpsa, dtype=np.float64)
+    regions = np.asarray(regions, dtype=object)
+
+    if density_threshold and len(wlogp) > density_threshold:
+        return ax.hexbin(
+            wlogp,
+            tpsa,
+            gridsize=gridsize,
+            extent=extent,
+            bins='log',
+            mincnt=1,
+            cmap='viridis',
+            alpha=0.8,
+            zorder=3
+        )
+
+    colors = np.full(len(regions), REGION_COLORS["outside"], dtype=object)
+    for region, color in REGION_COLORS.items():
+        colors[regions == region] = color
+
+    ax.scatter(
+        wlogp,
+        tpsa,
+        s=point_size,
+        c=colors.tolist(),
+        edgecolor='black',
+        alpha=0.7,
+        linewidth=1,
+        zorder=3
+    )
+
+    for i in label_indices(len(wlogp), max_labels):
+        ax.annotate(
+            labels[i],
+            (wlogp[i], tpsa[i]),
+            xytext=(10, 10),
+            textcoords='offset points',
+            fontsize=label_fontsize,
+            bbox=dict(boxstyle='round,pad=0.5', fc='white', alpha=0.7)
+        )
+    return None
@@ -0,0 +1,74 @@
+"""
+Streaming result encoders for compound libraries.
+
+Rows are emitted chunk by chunk as the descriptor engine finishes them, so clients
+see the first results immediately and server memory stays proportional to the
+chunk size rather than the library size.
+"""
+
+import numpy as np
+
+from .descriptors import INTEGER_COLUMNS, iter_descriptor_chunks
+
+# Smaller than the batch default so the first rows reach the client quickly
+STREAM_CHUNK_SIZE = 500
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Output columns per descriptor set (None keeps every evaluated column)
+STREAM_COLUMNS = {
+    "lipinski": None,
+    "boiled_egg": {"TPSA": "tpsa", "wlogp": "wlogp", "region": "region", "absorption": "absorption"},
+}
+
+
+def _chunk_rows(table, invalid, records, descriptor_set):
+    # Interleave valid and invalid entries of the chunk back into input order
+    positions = np.sort(np.concatenate([table.index.to_numpy(dtype=np.int64),
+                                        np.asarray(invalid, dtype=np.int64)]))
+    table = table.astype({column: "Int64" for column in table.columns if column in INTEGER_COLUMNS})
+
+    columns = STREAM_COLUMNS[descriptor_set]
+    if columns is not None:
+        table = table[list(columns)].rename(columns=columns)
+
+    rows = table.reindex(positions)
+    rows.insert(0, "valid", np.isin(positions, table.index.to_numpy()))
+    # Emitted records are released, so an uploaded library is never held whole
+    chunk_records = [records.pop(position) for position in positions]
+    rows.insert(0, "smiles", [smi for smi, _ in chunk_records])
+    rows.insert(0, "name", [name for _, name in chunk_records])
+    rows.insert(0, "id", positions + 1)
+    return rows
+
+
+def iter_compound_rows(records, descriptor_set, evaluate, output_format="ndjson",
+                       chunk_size=STREAM_CHUNK_SIZE, n_workers=None, sources=None):
+    """
+    Yield encoded result rows for `records`, a dict of (smiles, name) pairs by
+    position that may be filled while `sources` are read (see split_records).
+
+    `sources` are the engine inputs aligned with `records` (defaults to the SMILES).
+
+    `evaluate` turns a descriptor table into result columns (e.g. evaluate_lipinski).
+    NDJSON yields one JSON object per compound; CSV yields a header followed by rows
+    (nested columns such as AtomDistribution are left out of CSV).
+    """
+    if output_format not in STREAM_MEDIA_TYPES:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    if sources is None:
+        sources = [smi for smi, _ in records.values()]
+    first = True
+    for table, invalid in iter_descriptor_chunks(sources, descriptor_set, chunk_size, n_workers):
+        rows = _chunk_rows(evaluate(table), invalid, records, descriptor_set)
+        if output_format == "ndjson":
+            text = rows.to_json(orient="records", lines=True)
+            yield text if text.endswith("\n") else text + "\n"
+        else:
+            rows = rows.drop(columns=["AtomDistribution"], errors="ignore")
+            yield rows.to_csv(index=False, header=first)
+            first = False
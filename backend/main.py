@@ -1,20 +1,76 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 import base64
 import io
+import json
 import matplotlib.pyplot as plt
 import numpy as np
 import tempfile
 import os
+import shutil
 import sys
-from itertools import combinations
-from typing import Optional
+from typing import List, Optional
 
 # Add the backend directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import RamachandranPlotter
 from ramachandran.RamachandranPlotter import main as RamachandranPlotter
+from cheminformatics.descriptors import (
+    EGG_WHITE_ELLIPSE,
+    EGG_YOLK_ELLIPSE,
+    compute_descriptor_table,
+    evaluate_boiled_egg,
+    evaluate_lipinski,
+)
+from cheminformatics.ingest import load_compound_input, load_compound_upload
+from cheminformatics.plots import (
+    DEFAULT_DENSITY_THRESHOLD,
+    DEFAULT_MAX_LABELS,
+    draw_boiled_egg_points,
+)
+from cheminformatics.streaming import STREAM_MEDIA_TYPES, iter_compound_rows
+from resources import compute_budget
+from structure.bfactor import NORMALIZATIONS, compare_bfactor_profiles, structure_bfactors
+from structure.cache import resolve_selection
+from structure.ingest import load_structure_upload, load_universe
+from tiles import build_tile_pyramid, load_pyramid_meta, read_tile
+from trajectory.clustering import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_DENSITY_BINS,
+    DEFAULT_DENSITY_SMOOTHING,
+    DEFAULT_N_CLUSTERS,
+    cluster_projection,
+    write_frames_pdb,
+)
+from trajectory.contacts import (
+    CONTACT_MODES,
+    DEFAULT_MODE_CUTOFFS,
+    contact_difference,
+    contact_selection,
+    residue_min_distances,
+    system_contacts,
+)
+from trajectory.coordinates import convert_coordinates
+from trajectory.dccm import (
+    DCCM_PREVIEW_SIZE,
+    DEFAULT_DCCM_MODES,
+    correlation_block,
+    load_lowrank_dccm,
+    save_lowrank_dccm,
+)
+from trajectory.frames import DEFAULT_BLOCK_SIZE, select_atoms
+from trajectory.gyration import compute_gyration
+from trajectory.hbonds import DEFAULT_ANGLE_CUTOFF, DEFAULT_DA_CUTOFF, compute_hbonds
+from trajectory.landscape import BOLTZMANN, DEFAULT_FES_BINS, draw_free_energy, free_energy_surface
+from trajectory.pca import replica_pca
+from trajectory.pipeline import ANALYZERS, jsonable, run_pipeline
+from trajectory.projections import load_projection, projection_components, projection_sources, save_projection
+from trajectory.rmsd import compute_rmsd_series
+from trajectory.rmsf import compute_rmsf
+from trajectory.sasa import DEFAULT_PROBE_RADIUS, DEFAULT_SPHERE_POINTS, compute_sasa
+from trajectory.store import hold_trajectories, store_trajectory_upload
 
 try:
     import RamachanDraw
@@ -23,7 +79,6 @@ except ImportError:
 
 try:
     import MDAnalysis as mda
-    from MDAnalysis.analysis.align import alignto
     MDAnalysis_INSTALLED = True
 except ImportError:
     MDAnalysis_INSTALLED = False
@@ -75,8 +130,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Frame-Count", "X-Columns", "X-Units", "X-Tile-Shape"],
 )
 
+class LimitComputeThreads:
+    """
+    Each analysis request runs within a thread budget shared with concurrent jobs,
+    and the trajectories it stores are kept until it finishes. As plain ASGI
+    middleware it holds both until the whole response, including a streamed body,
+    has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+        with hold_trajectories(), compute_budget():
+            await self.app(scope, receive, send)
+
+app.add_middleware(LimitComputeThreads)
+
 @app.get("/")
 def read_root():
     return {"message": "SimAna API is running"}
@@ -105,13 +180,11 @@ ATOM      3  C   ALA A   1       2.009   1.420   0.000  1.00  0.00           C
 ATOM      4  O   ALA A   1       1.251   2.390   0.000  1.00  0.00           O
 ATOM      5  CB  ALA A   1       1.988  -0.773  -1.232  1.00  0.00           C""")
             else:
-                # Save uploaded file to temporary directory
-                pdb_path = os.path.join(temp_dir, pdb_file.filename)
-                with open(pdb_path, "wb") as f:
-                    f.write(await pdb_file.read())
+                # Save (and decompress) the uploaded PDB/mmCIF/BinaryCIF file
+                pdb_path = await load_structure_upload(pdb_file, temp_dir)
 
             # Generate the plot
-            plot_name = os.path.basename(pdb_path).replace(".pdb", "")
+            plot_name = os.path.splitext(os.path.basename(pdb_path))[0]
             plot_path = os.path.join(temp_dir, f"{plot_name}_AllRamachandranPlot.{file_type}")
             
             # Convert model number to integer
@@ -165,6 +238,15 @@ async def generate_dccm(
     ylabel: str = Form("Residue index"),
     title: str = Form("Dynamic Cross-Correlation Matrix"),
     colorbar_label: str = Form("Correlation Coefficient"),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    mode: str = Form("full"),
+    n_modes: int = Form(DEFAULT_DCCM_MODES),
+    tiles: bool = Form(False),
+    pooling: str = Form("mean"),
     dpi: int = Form(300)
 ):
     try:
@@ -172,36 +254,86 @@ async def generate_dccm(
         if not MDAnalysis_INSTALLED:
             return {"error": "MDAnalysis not installed on the server"}
         
+        if mode not in ("full", "lowrank"):
+            return {"error": "mode must be 'full' or 'lowrank'"}
+        
         # Save uploaded files to temporary locations
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdb") as pdb_temp:
-            pdb_temp_path = pdb_temp.name
-            contents = await pdb_file.read()
-            pdb_temp.write(contents)
+        structure_dir = tempfile.mkdtemp()
+        pdb_temp_path = await load_structure_upload(pdb_file, structure_dir, "topology")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xtc") as xtc_temp:
-            xtc_temp_path = xtc_temp.name
-            contents = await xtc_file.read()
-            xtc_temp.write(contents)
+        xtc_temp_path = await store_trajectory_upload(xtc_file)
         
         # Calculate DCCM
         try:
-            u = mda.Universe(pdb_temp_path, xtc_temp_path)
-            ca_atoms = u.select_atoms('name CA')
-            alignto(u, u, select='name CA')
-
-            positions = np.zeros((len(u.trajectory), len(ca_atoms), 3))
-
-            for i, ts in enumerate(u.trajectory):
-                positions[i] = ca_atoms.positions
-
-            mean_positions = positions.mean(axis=0)
-            fluctuations = positions - mean_positions
-            covariance_matrix = np.tensordot(fluctuations, fluctuations, axes=((0, 2), (0, 2)))
-            dccm = np.corrcoef(covariance_matrix)
+            if mode == "lowrank":
+                # Top-k covariance modes only; the dense matrix is never formed
+                result = run_pipeline(
+                    pdb_temp_path,
+                    xtc_temp_path,
+                    [("dccm_lowrank", {"selection": "name CA", "n_modes": n_modes})],
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop
+                )["dccm_lowrank"]
+                factors = result["factors"]
+                dccm_id = save_lowrank_dccm(factors, resids=result["resids"], segids=result["segids"].astype(str))
+                
+                # Strided preview of at most DCCM_PREVIEW_SIZE residues per axis
+                preview_stride = -(-len(factors) // DCCM_PREVIEW_SIZE)
+                preview = correlation_block(factors, stride=preview_stride)
+                extent = (-0.5, len(factors) - 0.5, -0.5, len(factors) - 0.5)
+                
+                fig, ax = plt.subplots(figsize=(10, 10))
+                im = ax.imshow(preview, cmap=cmap, vmin=vmin, vmax=vmax, extent=extent, origin='lower')
+                ax.set_title(title, fontsize=16)
+                ax.set_xlabel(xlabel, fontsize=15)
+                ax.set_ylabel(ylabel, fontsize=15)
+                ax.tick_params(axis='both', which='major', labelsize=12)
+                plt.colorbar(im, ax=ax, label=colorbar_label)
+                
+                buf = io.BytesIO()
+                fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight')
+                buf.seek(0)
+                img_str = base64.b64encode(buf.read()).decode('utf-8')
+                plt.close(fig)
+                
+                # Sub-blocks are reconstructed on demand through /api/dccm/block
+                response = {
+                    "plot": f"data:image/png;base64,{img_str}",
+                    "dccm_id": dccm_id,
+                    "residue_count": result["residue_count"],
+                    "n_modes": result["n_modes"],
+                    "captured_variance": result["captured_variance"],
+                    "preview_stride": preview_stride,
+                    "n_frames": result["n_frames"]
+                }
+                if tiles:
+                    response["tiles"] = build_tile_pyramid(factors=factors, pooling=pooling)
+                return response
+            
+            # Streaming covariance over the selected frames (single decoding pass)
+            result = run_pipeline(
+                pdb_temp_path,
+                xtc_temp_path,
+                [("dccm", {"selection": "name CA"})],
+                start=start,
+                stop=stop,
+                stride=stride,
+                time_start=time_start,
+                time_stop=time_stop
+            )["dccm"]
+            dccm = result["matrix"]
+            
+            # With tiles, plot the coarsest pyramid level instead of resampling the full matrix
+            tile_meta = build_tile_pyramid(dccm, pooling=pooling) if tiles else None
+            plotted = dccm if tile_meta is None else read_tile(tile_meta["pyramid_id"], tile_meta["levels"] - 1, 0, 0)
+            extent = (-0.5, len(dccm) - 0.5, len(dccm) - 0.5, -0.5)
             
             # Generate plot with customizations
             fig, ax = plt.subplots(figsize=(10, 10))
-            im = ax.imshow(dccm, cmap=cmap, vmin=vmin, vmax=vmax)
+            im = ax.imshow(plotted, cmap=cmap, vmin=vmin, vmax=vmax, extent=extent)
             ax.set_title(title, fontsize=16)
             ax.set_xlabel(xlabel, fontsize=15)
             ax.set_ylabel(ylabel, fontsize=15)
@@ -220,17 +352,90 @@ async def generate_dccm(
             img_str = base64.b64encode(buf.read()).decode('utf-8')
             plt.close(fig)  # Close the figure to free memory
             
-            # Also return the matrix data for frontend visualization
-            return {
+            # Also return the matrix data (or, with tiles, the pyramid) for frontend visualization
+            response = {
                 "plot": f"data:image/png;base64,{img_str}",
-                "matrix": dccm.tolist(),
-                "residue_count": len(ca_atoms)
+                "residue_count": result["residue_count"],
+                "n_frames": result["n_frames"]
             }
+            if tile_meta is None:
+                response["matrix"] = dccm.tolist()
+            else:
+                response["tiles"] = tile_meta
+            return response
             
         finally:
             # Clean up temporary files
-            os.unlink(pdb_temp_path)
-            os.unlink(xtc_temp_path)
+            shutil.rmtree(structure_dir, ignore_errors=True)
+    
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/dccm/block")
+async def get_dccm_block(
+    dccm_id: str,
+    row_start: int = 0,
+    row_stop: Optional[int] = None,
+    col_start: int = 0,
+    col_stop: Optional[int] = None,
+    stride: int = 1
+):
+    try:
+        # Reconstruct a block of a stored low-rank DCCM
+        stored = load_lowrank_dccm(dccm_id)
+        matrix = correlation_block(stored["factors"], row_start, row_stop, col_start, col_stop, stride)
+        rows = np.arange(len(stored["factors"]))[row_start:row_stop:max(1, stride)]
+        cols = np.arange(len(stored["factors"]))[col_start:col_stop:max(1, stride)]
+        
+        return {
+            "matrix": matrix.tolist(),
+            "rows": rows.tolist(),
+            "cols": cols.tolist(),
+            "row_resids": stored["resids"][rows].tolist(),
+            "col_resids": stored["resids"][cols].tolist(),
+            "residue_count": len(stored["factors"])
+        }
+    
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/tiles/{pyramid_id}")
+async def get_tile_pyramid(pyramid_id: str):
+    try:
+        return load_pyramid_meta(pyramid_id)
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/tiles/{pyramid_id}/{level}/{row}/{col}")
+async def get_tile(
+    pyramid_id: str,
+    level: int,
+    row: int,
+    col: int,
+    output_format: str = "png",
+    cmap: str = "viridis",
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None
+):
+    try:
+        tile = read_tile(pyramid_id, level, row, col)
+        
+        if output_format == "json":
+            return {"level": level, "row": row, "col": col, "matrix": tile.tolist()}
+        if output_format == "binary":
+            # Little-endian float32, row-major
+            return Response(
+                content=tile.astype("<f4").tobytes(),
+                media_type="application/octet-stream",
+                headers={"X-Tile-Shape": f"{tile.shape[0]},{tile.shape[1]}"}
+            )
+        if output_format != "png":
+            return {"error": f"Unknown output format: {output_format}"}
+        
+        # One pixel per cell, colour-mapped without a figure
+        buf = io.BytesIO()
+        plt.imsave(buf, tile, cmap=cmap, vmin=vmin, vmax=vmax, format="png", origin="lower")
+        return Response(content=buf.getvalue(), media_type="image/png")
     
     except Exception as e:
         return {"error": str(e)}
@@ -238,7 +443,9 @@ async def generate_dccm(
 @app.post("/api/contact_map")
 async def generate_contact_map(
     pdb_file: UploadFile = File(...),
-    cutoff: float = Form(8.0),
+    cutoff: Optional[float] = Form(None),
+    mode: str = Form("ca"),
+    selection: str = Form("protein"),
     cmap: str = Form("viridis"),
     vmin: float = Form(0.0),
     vmax: float = Form(1.0),
@@ -252,6 +459,8 @@ async def generate_contact_map(
     ylim_max: int = Form(None),
     label_fontsize: int = Form(15),
     tick_labelsize: int = Form(12),
+    tiles: bool = Form(False),
+    pooling: str = Form("max"),
     dpi: int = Form(300)
 ):
     try:
@@ -260,27 +469,28 @@ async def generate_contact_map(
             return {"error": "MDAnalysis not installed on the server"}
         
         # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdb") as pdb_temp:
-            pdb_temp_path = pdb_temp.name
-            contents = await pdb_file.read()
-            pdb_temp.write(contents)
+        structure_dir = tempfile.mkdtemp()
+        pdb_temp_path = await load_structure_upload(pdb_file, structure_dir, "topology")
         
         try:
-            # Calculate contact map
-            u = mda.Universe(pdb_temp_path)
-            protein = u.select_atoms('protein')
-            ca_atoms = protein.select_atoms('name CA')
-            num_residues = len(ca_atoms)
-            
-            # Initialize contact map matrix
-            contact_map = np.zeros((num_residues, num_residues))
-            
-            # Calculate distances and populate contact map
-            for i, j in combinations(range(num_residues), 2):
-                distance = np.linalg.norm(ca_atoms.positions[i] - ca_atoms.positions[j])
-                if distance < cutoff:
-                    contact_map[i, j] = 1
-                    contact_map[j, i] = 1
+            # Calculate contact map: CA-CA distance or minimum heavy-atom distance per residue pair
+            if mode not in CONTACT_MODES:
+                return {"error": f"mode must be one of {', '.join(CONTACT_MODES)}"}
+            cutoff = DEFAULT_MODE_CUTOFFS[mode] if cutoff is None else cutoff
+            u = load_universe(pdb_temp_path)
+            atoms = resolve_selection(u, contact_selection(selection, mode))
+            if len(atoms) == 0:
+                return {"error": f"Selection '{selection}' did not match any atoms."}
+            
+            # Populate the contact map from a cell-list neighbour search
+            residues, i, j, min_distances = residue_min_distances(atoms, atoms.positions, cutoff)
+            num_residues = len(residues)
+            # The dense map is only built when it is returned; tiles scatter the pairs per strip
+            contact_map = None
+            if not tiles:
+                contact_map = np.zeros((num_residues, num_residues))
+                contact_map[i, j] = 1
+                contact_map[j, i] = 1
             
             # Plot contact map
             fig, ax = plt.subplots(figsize=(10, 10))
@@ -291,8 +501,16 @@ async def generate_contact_map(
             y_min = 0 if ylim_min is None else ylim_min
             y_max = num_residues if ylim_max is None else min(ylim_max, num_residues)
             
+            # With tiles, plot the coarsest pyramid level instead of resampling the full matrix
+            tile_meta = None
+            if tiles:
+                pairs = (np.concatenate([i, j]), np.concatenate([j, i]), np.ones(2 * len(i), dtype=np.float32))
+                tile_meta = build_tile_pyramid(pairs=pairs, shape=(num_residues, num_residues), pooling=pooling)
+            plotted = contact_map if tile_meta is None else read_tile(tile_meta["pyramid_id"], tile_meta["levels"] - 1, 0, 0)
+            extent = (-0.5, num_residues - 0.5, num_residues - 0.5, -0.5)
+            
             # Create plot
-            im = ax.imshow(contact_map, cmap=cmap, vmin=vmin, vmax=vmax)
+            im = ax.imshow(plotted, cmap=cmap, vmin=vmin, vmax=vmax, extent=extent)
             ax.set_xlabel(xlabel, fontsize=label_fontsize)
             ax.set_ylabel(ylabel, fontsize=label_fontsize)
             
@@ -322,30 +540,137 @@ async def generate_contact_map(
             img_str = base64.b64encode(buf.read()).decode('utf-8')
             plt.close(fig)  # Close the figure to free memory
             
-            # Return both image and matrix data
-            return {
+            # Return both image and matrix data (or, with tiles, the pyramid)
+            response = {
                 "plot": f"data:image/png;base64,{img_str}",
-                "matrix": contact_map.tolist(),
-                "residue_count": num_residues
+                "residue_count": num_residues,
+                "mode": mode,
+                "cutoff": cutoff
             }
+            if mode == "heavy":
+                response["min_distances"] = {"i": i.tolist(), "j": j.tolist(), "distance": min_distances.tolist()}
+            if tile_meta is None:
+                response["matrix"] = contact_map.tolist()
+            else:
+                response["tiles"] = tile_meta
+            return response
             
         finally:
             # Clean up temporary file
-            os.unlink(pdb_temp_path)
+            shutil.rmtree(structure_dir, ignore_errors=True)
     
     except Exception as e:
         return {"error": str(e)}
     
+@app.post("/api/contact_map/difference")
+async def generate_contact_difference(
+    pdb_file_a: UploadFile = File(...),
+    pdb_file_b: UploadFile = File(...),
+    xtc_file_a: Optional[UploadFile] = File(None),
+    xtc_file_b: Optional[UploadFile] = File(None),
+    selection: str = Form("protein"),
+    mode: str = Form("ca"),
+    cutoff: Optional[float] = Form(None),
+    mapping: str = Form("resid"),
+    min_delta: float = Form(0.0),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    cmap: str = Form("RdBu_r"),
+    xlabel: str = Form("Residue Index"),
+    ylabel: str = Form("Residue Index"),
+    title: str = Form("Contact Frequency Difference (B - A)"),
+    dpi: int = Form(300)
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        if mode not in CONTACT_MODES:
+            return {"error": f"mode must be one of {', '.join(CONTACT_MODES)}"}
+        cutoff = DEFAULT_MODE_CUTOFFS[mode] if cutoff is None else cutoff
+        frame_options = dict(start=start, stop=stop, stride=stride, time_start=time_start, time_stop=time_stop)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Each side is a structure (all models) or a structure plus trajectory
+            systems = []
+            for label, pdb_file, xtc_file in (("a", pdb_file_a, xtc_file_a), ("b", pdb_file_b, xtc_file_b)):
+                pdb_path = await load_structure_upload(pdb_file, temp_dir, f"topology_{label}")
+                xtc_path = await store_trajectory_upload(xtc_file) if xtc_file is not None else None
+                try:
+                    systems.append(system_contacts(pdb_path, xtc_path, selection=selection, mode=mode, cutoff=cutoff,
+                                                   **(frame_options if xtc_path else {})))
+                except ValueError as e:
+                    return {"error": f"System {label.upper()}: {e}"}
+        
+        (residues_a, ia, ja, freq_a, frames_a), (residues_b, ib, jb, freq_b, frames_b) = systems
+        try:
+            diff = contact_difference((residues_a, ia, ja, freq_a), (residues_b, ib, jb, freq_b), mapping)
+        except ValueError as e:
+            return {"error": str(e)}
+        keep = (np.abs(diff["delta"]) > min_delta) if min_delta > 0 else (diff["delta"] != 0)
+        i, j, delta = diff["i"][keep], diff["j"][keep], diff["delta"][keep]
+        n = len(residues_a)
+        
+        # Sparse pairs drawn as cells of a diverging map (both triangles), no dense matrix
+        fig, ax = plt.subplots(figsize=(10, 10))
+        marker_size = max(0.5, (72 * 8.0 / max(n, 1)) ** 2)
+        points = ax.scatter(np.r_[i, j], np.r_[j, i], c=np.r_[delta, delta], cmap=cmap, vmin=-1, vmax=1,
+                            s=marker_size, marker='s', linewidths=0)
+        ax.set_xlim(-0.5, n - 0.5)
+        ax.set_ylim(-0.5, n - 0.5)
+        ax.set_aspect('equal')
+        ax.set_title(title, fontsize=16)
+        ax.set_xlabel(xlabel, fontsize=15)
+        ax.set_ylabel(ylabel, fontsize=15)
+        plt.colorbar(points, ax=ax, label='Contact frequency B - A')
+        
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight')
+        buf.seek(0)
+        img_str = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)
+        
+        return {
+            "plot": f"data:image/png;base64,{img_str}",
+            "residues": [{"segid": str(segid), "resid": int(resid), "resname": str(resname)}
+                         for segid, resid, resname in zip(residues_a.segids, residues_a.resids, residues_a.resnames)],
+            "pairs": {
+                "i": i.tolist(),
+                "j": j.tolist(),
+                "frequency_a": diff["first"][keep].tolist(),
+                "frequency_b": diff["second"][keep].tolist(),
+                "delta": delta.tolist()
+            },
+            "residue_count": n,
+            "mode": mode,
+            "cutoff": cutoff,
+            "n_frames_a": frames_a,
+            "n_frames_b": frames_b,
+            "unmapped_residues_b": diff["unmapped"]
+        }
+    
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.post("/api/pca")
 async def perform_dimensionality_reduction(
     xtc_file: UploadFile = File(...),
     pdb_file: UploadFile = File(...),
     method: str = Form("pca"),
     selection: str = Form("backbone"),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
     stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
     n_components: int = Form(10),
     comp1: int = Form(0),
     comp2: int = Form(1),
+    landscape: bool = Form(False),
+    bins: int = Form(DEFAULT_FES_BINS),
+    temperature: float = Form(300.0),
     dpi: int = Form(300)
 ):
     try:
@@ -356,15 +681,12 @@ async def perform_dimensionality_reduction(
             }
         
         # Save uploaded files temporarily
-        with tempfile.NamedTemporaryFile(suffix=".xtc", delete=False) as temp_xtc:
-            temp_xtc.write(await xtc_file.read())
-            xtc_path = temp_xtc.name
-            print(f"Saved XTC file to: {xtc_path}")  # Debug log
+        xtc_path = await store_trajectory_upload(xtc_file)
+        print(f"Stored XTC file at: {xtc_path}")  # Debug log
         
-        with tempfile.NamedTemporaryFile(suffix=".pdb", delete=False) as temp_pdb:
-            temp_pdb.write(await pdb_file.read())
-            pdb_path = temp_pdb.name
-            print(f"Saved PDB file to: {pdb_path}")  # Debug log
+        structure_dir = tempfile.mkdtemp()
+        pdb_path = await load_structure_upload(pdb_file, structure_dir, "topology")
+        print(f"Saved structure file to: {pdb_path}")  # Debug log
             
         try:
             import MDAnalysis as mda
@@ -372,41 +694,29 @@ async def perform_dimensionality_reduction(
             matplotlib.use('Agg')  # Non-interactive backend
             print("Imported required libraries")  # Debug log
             
-            # Load trajectory
-            print("Loading trajectory...")  # Debug log
-            u = mda.Universe(pdb_path, xtc_path)
-            
-            # Select atoms for analysis
+            # Extract coordinates and fit PCA in one decoding pass
+            print("Extracting coordinates and performing PCA...")  # Debug log
             try:
-                print(f"Selecting atoms with: {selection}")  # Debug log
-                selected_atoms = u.select_atoms(selection)
-                if len(selected_atoms) == 0:
-                    return {"error": f"Selection '{selection}' did not match any atoms."}
-                print(f"Selected {len(selected_atoms)} atoms")  # Debug log
-            except Exception as e:
-                return {"error": f"Selection error: {str(e)}"}
-            
-            # Extract coordinates
-            print("Extracting coordinates...")  # Debug log
-            n_frames = len(u.trajectory[::stride])
-            coords = np.zeros((n_frames, len(selected_atoms), 3))
-            
-            for i, ts in enumerate(u.trajectory[::stride]):
-                coords[i] = selected_atoms.positions
-            print(f"Extracted coordinates for {n_frames} frames")  # Debug log
-                
-            # Reshape to 2D array (n_frames, n_atoms * 3)
-            n_atoms = len(selected_atoms)
-            features = coords.reshape(n_frames, n_atoms * 3)
-            
-            # Center the data
-            features_centered = features - np.mean(features, axis=0)
-            
-            # Generate PCA results (for variance plot and preprocessing)
-            print("Performing PCA...")  # Debug log
-            pca = PCA(n_components=min(n_components, features_centered.shape[0], features_centered.shape[1]))
-            pca_result = pca.fit_transform(features_centered)
-            explained_variance = pca.explained_variance_ratio_
+                result = run_pipeline(
+                    pdb_path,
+                    xtc_path,
+                    [("pca", {"selection": selection, "n_components": n_components})],
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+            analysed_frames = result["frames"]
+            result = result["pca"]
+            
+            pca_result = result["projection"]
+            time_data = result["times"]
+            n_frames = len(pca_result)
+            n_atoms = result["n_atoms"]
+            explained_variance = result["explained_variance"]
             cumulative_variance = np.cumsum(explained_variance)
             n_components_70 = np.argmax(cumulative_variance >= 0.7) + 1 if any(cumulative_variance >= 0.7) else len(cumulative_variance)
             print(f"PCA completed. Explained variance shape: {explained_variance.shape}")  # Debug log
@@ -532,6 +842,13 @@ async def perform_dimensionality_reduction(
                 return {"error": f"Unknown method: {method}"}
             
             print(f"Dimensionality reduction completed. Result shape: {result.shape}")  # Debug log
+
+            # Cache the projection for landscapes and clustering without refitting
+            projection_id = save_projection(
+                result, analysed_frames, time_data, topology_path=pdb_path, trajectory_path=xtc_path,
+                method=method, selection=selection,
+                explained_variance=explained_variance[:result.shape[1]].tolist() if method == 'pca' else None
+            )
                 
             # Make sure comp1 and comp2 are different
             if comp1 == comp2:
@@ -541,25 +858,33 @@ async def perform_dimensionality_reduction(
             print("Generating projection plot...")  # Debug log
             fig_proj, ax = plt.subplots(figsize=(12, 10))
             
-            # Get time from trajectory if available
-            time_data = np.array([ts.time for ts in u.trajectory[::stride]])
+            # Use trajectory times when available
             if time_data[0] is None or np.isnan(time_data[0]):
                 time_data = np.arange(n_frames)
             
-            # Create scatter plot with time as color
-            scatter = ax.scatter(
-                result[:, comp1], 
-                result[:, comp2],
-                c=time_data,
-                cmap='viridis',
-                s=50,  # Increased marker size
-                alpha=0.8,
-                edgecolors='none'
-            )
-            
-            # Add colorbar
-            cbar = plt.colorbar(scatter)
-            cbar.set_label('Simulation Time', fontsize=14, fontweight='bold')
+            if landscape:
+                # Free-energy landscape drawn as one image, independent of frame count
+                energy, x_edges, y_edges = free_energy_surface(
+                    result[:, comp1], result[:, comp2], bins=bins, temperature=temperature
+                )
+                image = draw_free_energy(ax, energy, x_edges, y_edges)
+                cbar = plt.colorbar(image)
+                cbar.set_label('Free Energy (kJ/mol)', fontsize=14, fontweight='bold')
+            else:
+                # Create scatter plot with time as color
+                scatter = ax.scatter(
+                    result[:, comp1], 
+                    result[:, comp2],
+                    c=time_data,
+                    cmap='viridis',
+                    s=50,  # Increased marker size
+                    alpha=0.8,
+                    edgecolors='none'
+                )
+                
+                # Add colorbar
+                cbar = plt.colorbar(scatter)
+                cbar.set_label('Simulation Time', fontsize=14, fontweight='bold')
             cbar.ax.tick_params(labelsize=12)
             
             # Set labels
@@ -615,6 +940,7 @@ async def perform_dimensionality_reduction(
                 "variance_plot": f"data:image/png;base64,{variance_plot_data}",
                 "projection_plot": f"data:image/png;base64,{projection_plot_data}",
                 "method": method,
+                "projection_id": projection_id,
                 "n_frames": n_frames,
                 "n_atoms": n_atoms,
                 "comp1": comp1,
@@ -629,10 +955,7 @@ async def perform_dimensionality_reduction(
             
         finally:
             # Clean up temporary files
-            if os.path.exists(xtc_path):
-                os.unlink(xtc_path)
-            if os.path.exists(pdb_path):
-                os.unlink(pdb_path)
+            shutil.rmtree(structure_dir, ignore_errors=True)
                 
     except Exception as e:
         import traceback
@@ -640,9 +963,267 @@ async def perform_dimensionality_reduction(
         print(f"Error in PCA analysis: {str(e)}")  # Debug log
         return {"error": str(e)}
 
+@app.post("/api/pca/free_energy")
+async def projection_free_energy(
+    projection_id: str = Form(...),
+    comp1: int = Form(0),
+    comp2: int = Form(1),
+    bins: int = Form(DEFAULT_FES_BINS),
+    temperature: float = Form(300.0),
+    units: str = Form("kJ/mol"),
+    kde: bool = Form(False),
+    bandwidth: float = Form(1.0),
+    max_energy: Optional[float] = Form(None),
+    cmap: str = Form("viridis"),
+    title: str = Form("Free Energy Landscape"),
+    dpi: int = Form(300)
+):
+    try:
+        if units not in BOLTZMANN:
+            return {"error": f"units must be one of {', '.join(BOLTZMANN)}"}
+        if bins < 2:
+            return {"error": "bins must be at least 2"}
+        try:
+            projection, frames, times, meta = load_projection(projection_id)
+            x, y = projection_components(projection, comp1, comp2)
+            energy, x_edges, y_edges = free_energy_surface(
+                x, y, bins=bins, temperature=temperature, units=units, kde=kde, bandwidth=bandwidth
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+        
+        fig, ax = plt.subplots(figsize=(10, 8))
+        image = draw_free_energy(ax, energy, x_edges, y_edges, cmap=cmap, max_energy=max_energy)
+        method_names = {'pca': 'PC', 'tsne': 't-SNE', 'umap': 'UMAP'}
+        prefix = method_names.get(meta.get("method"), "Component ")
+        variance = meta.get("explained_variance")
+        xlabel, ylabel = (f'{prefix}{comp + 1}' + (f' ({variance[comp] * 100:.1f}%)' if variance else '')
+                          for comp in (comp1, comp2))
+        ax.set_xlabel(xlabel, fontsize=14, fontweight='bold')
+        ax.set_ylabel(ylabel, fontsize=14, fontweight='bold')
+        ax.set_title(title, fontsize=16, fontweight='bold')
+        cbar = plt.colorbar(image, ax=ax)
+        cbar.set_label(f'Free Energy ({units})', fontsize=14, fontweight='bold')
+        
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight')
+        buf.seek(0)
+        img_str = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)
+        
+        return {
+            "plot": f"data:image/png;base64,{img_str}",
+            "free_energy": [[None if np.isnan(v) else float(v) for v in row] for row in energy],
+            "x_edges": x_edges.tolist(),
+            "y_edges": y_edges.tolist(),
+            "units": units,
+            "temperature": temperature,
+            "method": meta.get("method"),
+            "n_frames": len(frames)
+        }
+    
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/api/pca/cluster")
+async def cluster_projection_frames(
+    projection_id: str = Form(...),
+    method: str = Form("kmeans"),
+    components: str = Form("0,1"),
+    n_clusters: int = Form(DEFAULT_N_CLUSTERS),
+    bins: int = Form(DEFAULT_DENSITY_BINS),
+    min_population: float = Form(0.01),
+    smoothing: float = Form(DEFAULT_DENSITY_SMOOTHING),
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE),
+    export_pdb: bool = Form(True),
+    export_selection: str = Form("protein"),
+    labels_format: str = Form("json"),
+    dpi: int = Form(300)
+):
+    try:
+        if labels_format not in ("json", "base64"):
+            return {"error": "labels_format must be json or base64"}
+        try:
+            comps = [int(c) for c in components.split(",") if c.strip()]
+        except ValueError:
+            return {"error": "components must be comma-separated component indices"}
+        try:
+            projection, frames, times, meta = load_projection(projection_id, mmap=True)
+            clusters = cluster_projection(
+                projection, comps, method=method, n_clusters=n_clusters, bins=bins,
+                min_population=min_population, chunk_size=max(1, chunk_size), smoothing=smoothing
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+        labels = clusters["labels"]
+        representatives = clusters["representatives"]
+        found = representatives >= 0
+        rep_frames = np.where(found, frames[np.maximum(representatives, 0)], -1)
+        rep_times = np.where(found, times[np.maximum(representatives, 0)], np.nan)
+        
+        # Cluster centres on the landscape of the first two clustered components
+        plot = None
+        if len(comps) >= 2:
+            x, y = projection_components(projection, comps[0], comps[1])
+            energy, x_edges, y_edges = free_energy_surface(x, y)
+            fig, ax = plt.subplots(figsize=(10, 8))
+            image = draw_free_energy(ax, energy, x_edges, y_edges, cmap="Greys_r", levels=0)
+            ax.scatter(clusters["centers"][:, 0], clusters["centers"][:, 1], c=np.arange(len(clusters["centers"])),
+                       cmap="tab10", s=120, marker="X", edgecolors="white", linewidths=1.5)
+            for k, (cx, cy) in enumerate(clusters["centers"][:, :2]):
+                ax.annotate(str(k), (cx, cy), xytext=(6, 6), textcoords="offset points", fontsize=12,
+                            fontweight="bold", color="#d62728")
+            ax.set_xlabel(f"Component {comps[0] + 1}", fontsize=14, fontweight='bold')
+            ax.set_ylabel(f"Component {comps[1] + 1}", fontsize=14, fontweight='bold')
+            ax.set_title(f"{method} clusters ({len(clusters['centers'])})", fontsize=16, fontweight='bold')
+            plt.colorbar(image, ax=ax).set_label("Free Energy (kJ/mol)", fontsize=14, fontweight='bold')
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight')
+            buf.seek(0)
+            plot = f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
+            plt.close(fig)
+        
+        # Representative frames read back from the stored trajectory
+        pdb_data = None
+        if export_pdb and found.any():
+            try:
+                topology_path, trajectory_path = projection_sources(projection_id, meta)
+            except ValueError as e:
+                return {"error": str(e)}
+            with tempfile.TemporaryDirectory() as temp_dir:
+                pdb_path = os.path.join(temp_dir, "representatives.pdb")
+                write_frames_pdb(topology_path, trajectory_path, rep_frames[found], pdb_path, export_selection)
+                with open(pdb_path, "rb") as f:
+                    pdb_data = base64.b64encode(f.read()).decode()
+        
+        if labels_format == "base64":
+            # Little-endian int32, one label per projected frame
+            labels_data = base64.b64encode(labels.astype("<i4").tobytes()).decode()
+        else:
+            labels_data = labels.tolist()
+        
+        return {
+            "plot": plot,
+            "method": method,
+            "components": comps,
+            "n_frames": len(labels),
+            "labels": labels_data,
+            "labels_format": labels_format,
+            "populations": clusters["populations"].tolist(),
+            "centers": clusters["centers"].tolist(),
+            "unassigned": clusters["unassigned"],
+            "representatives": [
+                {"cluster": k, "frame": int(frame), "time": float(time)}
+                for k, (frame, time) in enumerate(zip(rep_frames, rep_times)) if frame >= 0
+            ],
+            "representatives_pdb": pdb_data
+        }
+    
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/api/pca/replicas")
+async def replica_pca_analysis(
+    pdb_file: UploadFile = File(...),
+    xtc_files: List[UploadFile] = File(...),
+    selection: str = Form("backbone"),
+    align: bool = Form(True),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    n_components: int = Form(10),
+    comp1: int = Form(0),
+    comp2: int = Form(1),
+    n_workers: int = Form(1),
+    dpi: int = Form(300)
+):
+    try:
+        if not MDAnalysis_INSTALLED or not SKLEARN_INSTALLED:
+            return {
+                "error": "Required libraries not installed. Please install MDAnalysis and scikit-learn."
+            }
+        
+        names = [upload.filename or f"replica_{k + 1}" for k, upload in enumerate(xtc_files)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_paths = [await store_trajectory_upload(upload) for upload in xtc_files]
+            
+            try:
+                result = replica_pca(
+                    pdb_path,
+                    xtc_paths,
+                    temp_dir,
+                    selection=selection,
+                    n_components=n_components,
+                    align=align,
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop,
+                    n_workers=n_workers
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+        
+        explained_variance = result["explained_variance"]
+        n_fitted = len(explained_variance)
+        comp1 = min(comp1, n_fitted - 1)
+        comp2 = min(comp2, n_fitted - 1)
+        if comp1 == comp2:
+            comp2 = (comp2 + 1) % n_fitted
+        
+        # Combined projection plot, one colour per replica
+        fig, ax = plt.subplots(figsize=(12, 10))
+        colors = plt.cm.tab20(np.linspace(0, 1, max(len(names), 2)))
+        for name, replica, color in zip(names, result["replicas"], colors):
+            projection = replica["projection"]
+            ax.scatter(projection[:, comp1], projection[:, comp2], s=20, alpha=0.6,
+                       color=color, edgecolors='none', label=name)
+        ax.set_xlabel(f'PC{comp1 + 1} ({explained_variance[comp1] * 100:.1f}%)', fontsize=14, fontweight='bold')
+        ax.set_ylabel(f'PC{comp2 + 1} ({explained_variance[comp2] * 100:.1f}%)', fontsize=14, fontweight='bold')
+        ax.set_title('Replica PCA Projection (shared basis)', fontsize=16, fontweight='bold', pad=20)
+        if len(names) <= 20:
+            ax.legend(fontsize=10, markerscale=2)
+        ax.grid(alpha=0.3)
+        
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight')
+        buf.seek(0)
+        img_str = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)  # Close the figure to free memory
+        
+        return {
+            "projection_plot": f"data:image/png;base64,{img_str}",
+            "explained_variance": explained_variance.tolist(),
+            "cumulative_variance": np.cumsum(explained_variance).tolist(),
+            "n_atoms": result["n_atoms"],
+            "comp1": comp1,
+            "comp2": comp2,
+            "replicas": [
+                {
+                    "name": name,
+                    "n_frames": len(replica["frames"]),
+                    "frames": replica["frames"].tolist(),
+                    "time": replica["times"].tolist(),
+                    "projection": replica["projection"].tolist()
+                }
+                for name, replica in zip(names, result["replicas"])
+            ]
+        }
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
 @app.post("/api/boiled_egg")
 async def generate_boiled_egg(
-    smiles: str = Form(...),
+    smiles: str = Form(None),
+    compounds_file: UploadFile = File(None),
     title: str = Form("BOILED-Egg Plot"),
     x_label: str = Form("WLogP"),
     y_label: str = Form("TPSA"),
@@ -657,83 +1238,62 @@ async def generate_boiled_egg(
     label_fontsize: int = Form(9),
     axis_fontsize: int = Form(12),
     title_fontsize: int = Form(14),
-    dpi: int = Form(300)
+    dpi: int = Form(300),
+    max_labels: int = Form(DEFAULT_MAX_LABELS),
+    density_threshold: int = Form(DEFAULT_DENSITY_THRESHOLD),
+    density_gridsize: int = Form(60),
+    n_workers: Optional[int] = Form(None),
+    output_format: str = Form("json")
 ):
     try:
         if not RDKIT_INSTALLED:
             return {"error": "RDKit not installed on the server"}
         
-        from rdkit import Chem
-        from rdkit.Chem import Descriptors
-        from rdkit.Chem import Draw
-        from rdkit.Chem import AllChem
         import matplotlib.pyplot as plt
         import numpy as np
         from matplotlib.patches import Ellipse
         
-        # Parse SMILES strings
-        smiles_list = [line.split('#')[0].strip() for line in smiles.split('\n') if line.strip()]
-        valid_molecules = []
-        invalid_smiles = []
+        records, sources = await load_compound_input(smiles, compounds_file)
         
-        for i, smi in enumerate(smiles_list):
-            try:
-                mol = Chem.MolFromSmiles(smi)
-                if mol is not None:
-                    # Calculate descriptors
-                    tpsa = Descriptors.TPSA(mol)
-                    wlogp = Descriptors.MolLogP(mol)
-                    
-                    # Determine region based on elliptical boundaries
-                    # Parameters for the egg white (GI absorption) ellipse
-                    white_center = (2.3, 70)
-                    white_width = 7.6
-                    white_height = 140
-                    
-                    # Parameters for the egg yolk (brain penetration) ellipse
-                    yolk_center = (2.8, 90)
-                    yolk_width = 6.0
-                    yolk_height = 120
-                    
-                    # Check if point is in egg white (GI absorption)
-                    in_white = ((wlogp - white_center[0])**2 / (white_width/2)**2 + 
-                              (tpsa - white_center[1])**2 / (white_height/2)**2) <= 1
-                    
-                    # Check if point is in egg yolk (brain penetration)
-                    in_yolk = ((wlogp - yolk_center[0])**2 / (yolk_width/2)**2 + 
-                              (tpsa - yolk_center[1])**2 / (yolk_height/2)**2) <= 1
-                    
-                    if in_white and not in_yolk:
-                        region = "egg_white"
-                        absorption = "High probability of passive absorption by the gastrointestinal tract"
-                    elif in_yolk:
-                        region = "egg_yolk"
-                        absorption = "High probability of brain penetration"
-                    else:
-                        region = "outside"
-                        absorption = "Low probability of both GI absorption and brain penetration"
-                    
-                    # Get molecule name from comment if available
-                    name = ""
-                    if '#' in smiles.split('\n')[i]:
-                        name = smiles.split('\n')[i].split('#')[1].strip()
-                    
-                    valid_molecules.append({
-                        "id": i + 1,
-                        "smiles": smi,
-                        "tpsa": tpsa,
-                        "wlogp": wlogp,
-                        "region": region,
-                        "absorption": absorption,
-                        "name": name
-                    })
-                else:
-                    invalid_smiles.append([i + 1, smi])
-            except Exception:
-                invalid_smiles.append([i + 1, smi])
+        # Stream per-compound rows as they are computed (no plot)
+        if output_format in STREAM_MEDIA_TYPES:
+            return StreamingResponse(
+                iter_compound_rows(records, "boiled_egg", evaluate_boiled_egg, output_format,
+                                   n_workers=n_workers, sources=sources),
+                media_type=STREAM_MEDIA_TYPES[output_format],
+                headers={"Content-Disposition": f"attachment; filename=boiled_egg.{output_format}"}
+            )
+        if output_format != "json":
+            return {"error": f"Unknown output format: {output_format}"}
+        
+        # Compute descriptors for the whole library
+        table, invalid_positions = compute_descriptor_table(
+            sources, descriptor_set="boiled_egg", n_workers=n_workers
+        )
+        table = evaluate_boiled_egg(table)
+
+        valid_molecules = [
+            {
+                "id": position + 1,
+                "smiles": records[position][0],
+                "tpsa": tpsa,
+                "wlogp": wlogp,
+                "region": region,
+                "absorption": absorption,
+                "name": records[position][1]
+            }
+            for position, tpsa, wlogp, region, absorption in zip(
+                table.index.tolist(),
+                table["TPSA"].tolist(),
+                table["wlogp"].tolist(),
+                table["region"].tolist(),
+                table["absorption"].tolist()
+            )
+        ]
+        invalid_smiles = [[position + 1, records[position][0]] for position in invalid_positions]
         
         if not valid_molecules:
-            return {"error": "No valid SMILES strings provided"}
+            return {"error": "No valid molecules provided"}
         
         # Create plot
         fig, ax = plt.subplots(figsize=(12, 10))
@@ -742,47 +1302,31 @@ async def generate_boiled_egg(
         ax.set_facecolor('#f0f0f0')
         
         # Create egg white ellipse (yellow region)
-        white_ellipse = Ellipse(white_center, white_width, white_height, 
+        white_ellipse = Ellipse(*EGG_WHITE_ELLIPSE,
                               facecolor='yellow', alpha=0.3, edgecolor='none')
         ax.add_patch(white_ellipse)
         
         # Create egg yolk ellipse (white region)
-        yolk_ellipse = Ellipse(yolk_center, yolk_width, yolk_height,
+        yolk_ellipse = Ellipse(*EGG_YOLK_ELLIPSE,
                               facecolor='white', alpha=0.5, edgecolor='black', linewidth=1)
         ax.add_patch(yolk_ellipse)
         
-        # Plot points
-        for mol in valid_molecules:
-            if mol["region"] == "egg_white":
-                color = 'yellow'
-                edgecolor = 'black'
-            elif mol["region"] == "egg_yolk":
-                color = 'white'
-                edgecolor = 'black'
-            else:
-                color = 'grey'
-                edgecolor = 'black'
-            
-            point = ax.scatter(
-                mol["wlogp"], 
-                mol["tpsa"], 
-                s=point_size,
-                c=color,
-                edgecolor=edgecolor,
-                alpha=0.7,
-                linewidth=1
-            )
-            
-            # Add label with molecule name or ID
-            label = mol["name"] if mol["name"] else f"Molecule {mol['id']}"
-            ax.annotate(
-                label,
-                (mol["wlogp"], mol["tpsa"]),
-                xytext=(10, 10),
-                textcoords='offset points',
-                fontsize=label_fontsize,
-                bbox=dict(boxstyle='round,pad=0.5', fc='white', alpha=0.7)
-            )
+        # Plot all points at once (or as a density layer for large libraries)
+        density = draw_boiled_egg_points(
+            ax,
+            table["wlogp"].to_numpy(),
+            table["TPSA"].to_numpy(),
+            table["region"].to_numpy(),
+            [mol["name"] if mol["name"] else f"Molecule {mol['id']}" for mol in valid_molecules],
+            point_size=point_size,
+            label_fontsize=label_fontsize,
+            max_labels=max_labels,
+            density_threshold=density_threshold,
+            gridsize=density_gridsize,
+            extent=(wlogp_min, wlogp_max, tpsa_min, tpsa_max)
+        )
+        if density is not None:
+            plt.colorbar(density, ax=ax, label='Compounds per bin')
         
         # Set labels and title
         ax.set_xlabel(x_label, fontsize=axis_fontsize)
@@ -819,7 +1363,8 @@ async def generate_boiled_egg(
             "molecules": valid_molecules,
             "invalid_smiles": invalid_smiles,
             "valid_count": len(valid_molecules),
-            "invalid_count": len(invalid_smiles)
+            "invalid_count": len(invalid_smiles),
+            "density_mode": density is not None
         }
         
     except Exception as e:
@@ -827,17 +1372,20 @@ async def generate_boiled_egg(
 
 @app.post("/api/lipinski")
 async def calculate_lipinski(
-    smiles: str = Form(...),
+    smiles: str = Form(None),
+    compounds_file: UploadFile = File(None),
     include_radar: bool = Form(True),
-    include_distributions: bool = Form(True)
+    include_distributions: bool = Form(True),
+    include_structures: bool = Form(True),
+    n_workers: Optional[int] = Form(None),
+    output_format: str = Form("json")
 ):
     try:
         if not RDKIT_INSTALLED:
             return {"error": "RDKit not installed on the server"}
         
         from rdkit import Chem
-        from rdkit.Chem import Descriptors, Draw
-        from rdkit.Chem import rdMolDescriptors
+        from rdkit.Chem import Draw
         import pandas as pd
         import matplotlib.pyplot as plt
         import seaborn as sns
@@ -847,51 +1395,13 @@ async def calculate_lipinski(
         import zipfile
         from io import BytesIO
         
-        def calculate_properties(smiles):
+        def generate_structure_image(smiles):
             mol = Chem.MolFromSmiles(smiles)
-            if mol is None:
-                return None
-            
-            properties = {
-                "MW": Descriptors.ExactMolWt(mol),
-                "nBonds": mol.GetNumBonds(),
-                "fChar": Chem.GetFormalCharge(mol),
-                "nHet": rdMolDescriptors.CalcNumHeteroatoms(mol),
-                "MaxRing": max([len(ring) for ring in mol.GetRingInfo().AtomRings()]) if mol.GetRingInfo().AtomRings() else 0,
-                "nRing": rdMolDescriptors.CalcNumRings(mol),
-                "nRot": Descriptors.NumRotatableBonds(mol),
-                "TPSA": Descriptors.TPSA(mol),
-                "nHD": Descriptors.NumHDonors(mol),
-                "nHA": Descriptors.NumHAcceptors(mol),
-                "LogP": Descriptors.MolLogP(mol),
-                "LogD": Descriptors.MolLogP(mol),
-                "LogS": Descriptors.MolLogP(mol) - 0.89,
-                "SC": len(Chem.FindMolChiralCenters(mol))
-            }
-            
-            violations = []
-            if properties["MW"] > 500: violations.append("MolWt > 500")
-            if properties["nHD"] > 5: violations.append("HDonors > 5")
-            if properties["nHA"] > 10: violations.append("HAcceptors > 10")
-            if properties["LogP"] > 5: violations.append("LogP > 5")
-            
-            properties["FollowsLipinski"] = "No" if violations else "Yes"
-            properties["Violations"] = ", ".join(violations) if violations else "--"
-            
-            atom_dist = {}
-            for atom in mol.GetAtoms():
-                symbol = atom.GetSymbol()
-                atom_dist[symbol] = atom_dist.get(symbol, 0) + 1
-            properties["AtomDistribution"] = atom_dist
-            
-            # Generate 2D structure image
             img = Draw.MolToImage(mol, size=(500, 500))
             img_byte_arr = io.BytesIO()
             img.save(img_byte_arr, format='PNG')
             img_byte_arr = img_byte_arr.getvalue()
-            properties["structure_image"] = base64.b64encode(img_byte_arr).decode('utf-8')
-            
-            return properties
+            return base64.b64encode(img_byte_arr).decode('utf-8')
 
         def plot_distributions(data):
             plt.rcParams.update({
@@ -985,41 +1495,39 @@ async def calculate_lipinski(
             buf.seek(0)
             return base64.b64encode(buf.read()).decode('utf-8')
 
-        # Process SMILES strings
-        smiles_list = [line.split('#')[0].strip() for line in smiles.split('\n') if line.strip()]
-        compounds = []
-        invalid_smiles = []
+        records, sources = await load_compound_input(smiles, compounds_file)
         
-        for i, smi in enumerate(smiles_list):
-            try:
-                properties = calculate_properties(smi)
-                if properties is not None:
-                    # Get molecule name from comment if available
-                    name = ""
-                    if '#' in smiles.split('\n')[i]:
-                        name = smiles.split('\n')[i].split('#')[1].strip()
-                    properties["name"] = name
-                    compounds.append(properties)
-                else:
-                    invalid_smiles.append([i + 1, smi])
-            except Exception:
-                invalid_smiles.append([i + 1, smi])
+        # Stream per-compound rows as they are computed (no plots or ZIP archive)
+        if output_format in STREAM_MEDIA_TYPES:
+            return StreamingResponse(
+                iter_compound_rows(records, "lipinski", evaluate_lipinski, output_format,
+                                   n_workers=n_workers, sources=sources),
+                media_type=STREAM_MEDIA_TYPES[output_format],
+                headers={"Content-Disposition": f"attachment; filename=lipinski_data.{output_format}"}
+            )
+        if output_format != "json":
+            return {"error": f"Unknown output format: {output_format}"}
+        
+        # Process SMILES strings: descriptors for the whole library, then vectorised rules
+        table, invalid_positions = compute_descriptor_table(
+            sources, descriptor_set="lipinski", n_workers=n_workers
+        )
+        table = evaluate_lipinski(table)
+        
+        compounds = table.to_dict(orient="records")
+        for position, properties in zip(table.index.tolist(), compounds):
+            if include_structures:
+                properties["structure_image"] = generate_structure_image(records[position][0])
+            # Get molecule name from comment if available
+            properties["name"] = records[position][1]
+        invalid_smiles = [[position + 1, records[position][0]] for position in invalid_positions]
         
         if not compounds:
-            return {"error": "No valid SMILES strings provided"}
+            return {"error": "No valid molecules provided"}
         
         # Create DataFrame for CSV export
-        df = pd.DataFrame([{
-            "Name": c.get("name", f"Compound {i+1}"),
-            "MW": c["MW"],
-            "LogP": c["LogP"],
-            "TPSA": c["TPSA"],
-            "nRing": c["nRing"],
-            "nHD": c["nHD"],
-            "nHA": c["nHA"],
-            "FollowsLipinski": c["FollowsLipinski"],
-            "Violations": c["Violations"]
-        } for i, c in enumerate(compounds)])
+        df = table[["MW", "LogP", "TPSA", "nRing", "nHD", "nHA", "FollowsLipinski", "Violations"]].reset_index(drop=True)
+        df.insert(0, "Name", [records[position][1] for position in table.index.tolist()])
         
         # Generate plots if requested
         plots = {}
@@ -1105,19 +1613,12 @@ async def calculate_tanimoto(
 
         # Process input
         if file:
-            # Read file content
-            content = await file.read()
-            smiles_list = [line.strip() for line in content.decode().split('\n') if line.strip()]
-            
-            # Convert SMILES to molecules
-            molecules = []
-            for smi in smiles_list:
-                mol = Chem.MolFromSmiles(smi)
-                if mol is not None:
-                    molecules.append(mol)
+            # Parse the SMILES/SDF file (optionally gzipped) with multithreaded suppliers
+            records, sources = await load_compound_upload(file)
+            molecules = [Chem.Mol(source) for source in sources if source is not None]
             
             if len(molecules) < 2:
-                return {"error": "File must contain at least 2 valid SMILES strings"}
+                return {"error": "File must contain at least 2 valid molecules"}
             
             # Calculate similarity matrix
             n_molecules = len(molecules)
@@ -1265,31 +1766,19 @@ async def analyze_bfactor(
         d_y_max = float(dist_y_max) if dist_y_max else None
         
         # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdb") as pdb_temp:
-            pdb_temp_path = pdb_temp.name
-            contents = await pdb_file.read()
-            pdb_temp.write(contents)
+        structure_dir = tempfile.mkdtemp()
+        pdb_temp_path = await load_structure_upload(pdb_file, structure_dir, "topology")
         
         try:
-            # Load PDB file
-            u = mda.Universe(pdb_temp_path)
-            
-            # Select protein atoms
-            selected_atoms = u.select_atoms("protein")
-            if len(selected_atoms) == 0:
+            # Per-residue statistics (models of a multi-model file are averaged)
+            try:
+                result = structure_bfactors(pdb_temp_path, selection="protein")
+            except ValueError:
                 return {"error": "No protein atoms found in the PDB file"}
             
-            # Get residue numbers and B-factors
-            residue_numbers = []
-            b_factors = []
-            b_factor_stds = []
-            
-            for residue in selected_atoms.residues:
-                residue_numbers.append(int(residue.resnum))
-                # Get B-factors for all atoms in the residue
-                residue_bfactors = [float(atom.bfactor) for atom in residue.atoms]
-                b_factors.append(float(np.mean(residue_bfactors)))
-                b_factor_stds.append(float(np.std(residue_bfactors)) if len(residue_bfactors) > 1 else 0.0)
+            residue_numbers = result["residues"].resnums
+            b_factors = result["mean"]
+            b_factor_stds = result["std"]
             
             # Create residue plot (curve plot)
             fig_curve, ax_curve = plt.subplots(figsize=(10, 6))
@@ -1301,9 +1790,8 @@ async def analyze_bfactor(
             
             # Add standard deviation if requested
             if show_std_dev:
-                upper = [b + s for b, s in zip(b_factors, b_factor_stds)]
-                lower = [b - s for b, s in zip(b_factors, b_factor_stds)]
-                ax_curve.fill_between(residue_numbers, lower, upper, color='#1f77b4', alpha=0.2)
+                ax_curve.fill_between(residue_numbers, b_factors - b_factor_stds, b_factors + b_factor_stds,
+                                      color='#1f77b4', alpha=0.2)
             
             # Set axis labels and title
             ax_curve.set_xlabel(curve_x_label, fontsize=c_x_label_size)
@@ -1378,18 +1866,554 @@ async def analyze_bfactor(
                     "std_bfactor": float(b_factor_stds[i])
                 })
             
-            return {
+            response = {
                 "curve_plot": f"data:image/png;base64,{img_str_curve}",
                 "dist_plot": f"data:image/png;base64,{img_str_dist}",
                 "residue_data": residue_data,
-                "residue_count": len(residue_data)
+                "residue_count": len(residue_data),
+                "model_count": result["n_models"]
             }
+            if result["n_models"] > 1:
+                # Per-model residue means for ensembles (rows follow residue_data)
+                response["model_profiles"] = result["model_means"].tolist()
+            return response
             
         finally:
             # Clean up temporary file
-            os.unlink(pdb_temp_path)
+            shutil.rmtree(structure_dir, ignore_errors=True)
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+@app.post("/api/bfactor/compare")
+async def compare_bfactors(
+    pdb_files: List[UploadFile] = File(...),
+    selection: str = Form("protein"),
+    normalization: str = Form("zscore"),
+    n_workers: int = Form(1),
+    colormap: str = Form("viridis"),
+    dpi: int = Form(150)
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        if normalization not in NORMALIZATIONS:
+            return {"error": f"Unknown normalization '{normalization}'. Choose from: {', '.join(NORMALIZATIONS)}"}
+        
+        names = [upload.filename or f"structure_{k + 1}" for k, upload in enumerate(pdb_files)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            paths = []
+            for k, upload in enumerate(pdb_files):
+                paths.append(await load_structure_upload(upload, temp_dir, f"structure_{k}"))
+            
+            try:
+                result = compare_bfactor_profiles(
+                    paths,
+                    selection=selection,
+                    normalization=normalization,
+                    n_workers=n_workers
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+        
+        profiles = result["profiles"]
+        fig, ax = plt.subplots(figsize=(12, max(3, min(0.25 * len(names), 20))))
+        im = ax.imshow(np.ma.masked_invalid(profiles), aspect='auto', cmap=colormap, interpolation='nearest')
+        fig.colorbar(im, ax=ax, label=f"B-factor ({normalization})")
+        ax.set_xlabel("Residue", fontsize=12)
+        ax.set_ylabel("Structure", fontsize=12)
+        ax.set_title("Normalised B-factor Profiles", fontsize=14)
+        if len(names) <= 50:
+            ax.set_yticks(range(len(names)))
+            ax.set_yticklabels(names, fontsize=8)
+        
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight')
+        buf.seek(0)
+        img_str = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)  # Close the figure to free memory
+        
+        # Missing residues and undefined correlations are reported as null
+        nullable = lambda matrix: [[None if np.isnan(v) else float(v) for v in row] for row in matrix]
+        return {
+            "plot": f"data:image/png;base64,{img_str}",
+            "structures": [
+                {"name": name, "residue_count": int(n_residues), "model_count": int(n_models)}
+                for name, n_residues, n_models in zip(names, result["residue_counts"], result["model_counts"])
+            ],
+            "residues": [
+                {"segid": str(segid), "residue": int(resid)}
+                for segid, resid in zip(result["segids"], result["resids"])
+            ],
+            "profiles": nullable(profiles),
+            "correlation": nullable(result["correlation"]),
+            "normalization": normalization
+        }
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+@app.post("/api/rmsd")
+async def calculate_rmsd(
+    pdb_file: UploadFile = File(...),
+    xtc_file: UploadFile = File(...),
+    selection: str = Form("backbone"),
+    ref_frame: Optional[int] = Form(None),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    mass_weighted: bool = Form(False),
+    n_workers: int = Form(1),
+    output_format: str = Form("binary")
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_path = await store_trajectory_upload(xtc_file)
+            
+            try:
+                frames, times, rmsd = compute_rmsd_series(
+                    pdb_path,
+                    xtc_path,
+                    selection=selection,
+                    ref_frame=ref_frame,
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop,
+                    mass_weighted=mass_weighted,
+                    n_workers=n_workers
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+        
+        if output_format == "json":
+            return {
+                "frames": frames.tolist(),
+                "time": times.tolist(),
+                "rmsd": rmsd.tolist(),
+                "units": {"time": "ps", "rmsd": "angstrom"}
+            }
+        
+        # Compact binary: little-endian float32 (time, rmsd) pairs
+        data = np.column_stack([times, rmsd]).astype("<f4").tobytes()
+        return Response(
+            content=data,
+            media_type="application/octet-stream",
+            headers={
+                "X-Frame-Count": str(len(frames)),
+                "X-Columns": "time,rmsd",
+                "X-Units": "ps,angstrom"
+            }
+        )
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+@app.post("/api/rmsf")
+async def calculate_rmsf(
+    pdb_file: UploadFile = File(...),
+    xtc_file: UploadFile = File(...),
+    selection: str = Form("protein"),
+    fit_selection: str = Form("backbone"),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    include_atoms: bool = Form(False),
+    n_workers: int = Form(1),
+    xlabel: str = Form("Residue Number"),
+    ylabel: str = Form("RMSF (Å)"),
+    title: str = Form("Root Mean Square Fluctuation"),
+    dpi: int = Form(300)
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_path = await store_trajectory_upload(xtc_file)
+            
+            try:
+                result = compute_rmsf(
+                    pdb_path,
+                    xtc_path,
+                    selection=selection,
+                    fit_selection=fit_selection,
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop,
+                    n_workers=n_workers
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+        
+        residues = result["residues"]
+        residue_rmsf = result["residue_rmsf"]
+        
+        # Plot per-residue RMSF
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(residues.resids, residue_rmsf, color='#1f77b4', linewidth=1.5)
+        ax.set_xlabel(xlabel, fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.set_title(title, fontsize=14)
+        ax.grid(True, alpha=0.3)
+        
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight')
+        buf.seek(0)
+        img_str = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close(fig)  # Close the figure to free memory
+        
+        residue_data = [
+            {"residue": int(resid), "resname": str(resname), "segid": str(segid), "rmsf": float(value)}
+            for resid, resname, segid, value in zip(residues.resids, residues.resnames, residues.segids, residue_rmsf)
+        ]
+        response = {
+            "plot": f"data:image/png;base64,{img_str}",
+            "residue_data": residue_data,
+            "residue_count": len(residue_data),
+            "n_frames": result["n_frames"]
+        }
+        if include_atoms:
+            response["atom_rmsf"] = result["atom_rmsf"].tolist()
+        return response
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+@app.post("/api/rog")
+async def calculate_radius_of_gyration(
+    pdb_file: UploadFile = File(...),
+    xtc_file: UploadFile = File(...),
+    selection: str = Form("protein"),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    n_workers: int = Form(1),
+    output_format: str = Form("binary")
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_path = await store_trajectory_upload(xtc_file)
+            
+            try:
+                frames, times, rg, rg_axes = compute_gyration(
+                    pdb_path,
+                    xtc_path,
+                    selection=selection,
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop,
+                    n_workers=n_workers
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+        
+        if output_format == "json":
+            return {
+                "frames": frames.tolist(),
+                "time": times.tolist(),
+                "rg": rg.tolist(),
+                "rg_x": rg_axes[:, 0].tolist(),
+                "rg_y": rg_axes[:, 1].tolist(),
+                "rg_z": rg_axes[:, 2].tolist(),
+                "units": {"time": "ps", "rg": "angstrom"}
+            }
+        
+        # Compact binary: little-endian float32 (time, rg, rg_x, rg_y, rg_z) rows
+        data = np.column_stack([times, rg, rg_axes]).astype("<f4").tobytes()
+        return Response(
+            content=data,
+            media_type="application/octet-stream",
+            headers={
+                "X-Frame-Count": str(len(frames)),
+                "X-Columns": "time,rg,rg_x,rg_y,rg_z",
+                "X-Units": "ps,angstrom"
+            }
+        )
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+@app.post("/api/sasa")
+async def calculate_sasa(
+    pdb_file: UploadFile = File(...),
+    xtc_file: UploadFile = File(...),
+    selection: str = Form("protein"),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    probe_radius: float = Form(DEFAULT_PROBE_RADIUS),
+    n_sphere_points: int = Form(DEFAULT_SPHERE_POINTS),
+    n_workers: int = Form(1),
+    include_atoms: bool = Form(False),
+    output_format: str = Form("json")
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_path = await store_trajectory_upload(xtc_file)
+            
+            try:
+                result = compute_sasa(
+                    pdb_path,
+                    xtc_path,
+                    selection=selection,
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop,
+                    probe_radius=probe_radius,
+                    n_points=n_sphere_points,
+                    n_workers=n_workers
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+        
+        if output_format == "binary":
+            # Compact binary: little-endian float32 (time, total SASA) pairs
+            data = np.column_stack([result["times"], result["total"]]).astype("<f4").tobytes()
+            return Response(
+                content=data,
+                media_type="application/octet-stream",
+                headers={
+                    "X-Frame-Count": str(len(result["frames"])),
+                    "X-Columns": "time,sasa",
+                    "X-Units": "ps,angstrom^2"
+                }
+            )
+        
+        residues = result["residues"]
+        residue_data = [
+            {"residue": int(resid), "resname": str(resname), "segid": str(segid), "sasa": float(value)}
+            for resid, resname, segid, value in zip(residues.resids, residues.resnames, residues.segids,
+                                                   result["residue_sasa"])
+        ]
+        response = {
+            "frames": result["frames"].tolist(),
+            "time": result["times"].tolist(),
+            "total_sasa": result["total"].tolist(),
+            "residue_data": residue_data,
+            "residue_count": len(residue_data),
+            "units": {"time": "ps", "sasa": "angstrom^2"}
+        }
+        if include_atoms:
+            response["atom_sasa"] = result["atom_sasa"].tolist()
+        return response
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+@app.post("/api/hbonds")
+async def analyze_hbonds(
+    pdb_file: UploadFile = File(...),
+    xtc_file: UploadFile = File(...),
+    selection: str = Form("protein"),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None),
+    distance_cutoff: float = Form(DEFAULT_DA_CUTOFF),
+    angle_cutoff: float = Form(DEFAULT_ANGLE_CUTOFF),
+    max_pairs: int = Form(500),
+    n_workers: int = Form(1)
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_path = await store_trajectory_upload(xtc_file)
+            
+            try:
+                result = compute_hbonds(
+                    pdb_path,
+                    xtc_path,
+                    selection=selection,
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop,
+                    d_a_cutoff=distance_cutoff,
+                    angle_cutoff=angle_cutoff,
+                    n_workers=n_workers
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+            
+            atoms = load_universe(pdb_path).atoms
+        
+        def describe(index):
+            atom = atoms[int(index)]
+            return f"{atom.segid}:{atom.resname}{atom.resid}:{atom.name}"
+        
+        n_frames = len(result["frames"])
+        times = result["times"]
+        frame_dt = float(times[1] - times[0]) if n_frames > 1 else 0.0
+        
+        # Pair occupancy and lifetime table, most occupied first
+        present = result["pair_present"]
+        runs = result["pair_runs"]
+        order = np.argsort(-present, kind="stable")[:max_pairs]
+        pairs = []
+        for k in order:
+            h = result["pair_hydrogen"][k]
+            a = result["pair_acceptor"][k]
+            lifetime = present[k] / max(runs[k], 1)
+            pairs.append({
+                "donor": describe(result["donors"][h]),
+                "hydrogen": describe(result["hydrogens"][h]),
+                "acceptor": describe(result["acceptors"][a]),
+                "occupancy": float(present[k] / max(n_frames, 1)),
+                "frames_present": int(present[k]),
+                "mean_lifetime_frames": float(lifetime),
+                "mean_lifetime_ps": float(lifetime * frame_dt)
+            })
+        
+        return {
+            "frames": result["frames"].tolist(),
+            "time": times.tolist(),
+            "counts": result["counts"].tolist(),
+            "pairs": pairs,
+            "pair_count": int(len(present)),
+            "n_frames": n_frames
+        }
     
     except Exception as e:
         import traceback
         traceback.print_exc()
         return {"error": str(e)}
+
+@app.post("/api/pipeline")
+async def run_analysis_pipeline(
+    pdb_file: UploadFile = File(...),
+    xtc_file: UploadFile = File(...),
+    analyses: str = Form("rmsd,rmsf,rog"),
+    params: Optional[str] = Form(None),
+    start: Optional[int] = Form(None),
+    stop: Optional[int] = Form(None),
+    stride: int = Form(1),
+    time_start: Optional[float] = Form(None),
+    time_stop: Optional[float] = Form(None)
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        # Comma separated analysis names; optional JSON object of per-analysis parameters
+        names = list(dict.fromkeys(name.strip() for name in analyses.split(",") if name.strip()))
+        if not names:
+            return {"error": f"No analyses requested. Available: {', '.join(sorted(ANALYZERS))}"}
+        try:
+            options = json.loads(params) if params else {}
+        except ValueError:
+            return {"error": "params must be a JSON object keyed by analysis name"}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Stream uploads to disk
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_path = await store_trajectory_upload(xtc_file)
+            
+            try:
+                results = run_pipeline(
+                    pdb_path,
+                    xtc_path,
+                    [(name, options.get(name, {})) for name in names],
+                    start=start,
+                    stop=stop,
+                    stride=stride,
+                    time_start=time_start,
+                    time_stop=time_stop
+                )
+            except (ValueError, TypeError) as e:
+                return {"error": str(e)}
+        
+        return {
+            "analyses": names,
+            "frames": results["frames"].tolist(),
+            "n_frames": len(results["frames"]),
+            "results": jsonable({name: results[name] for name in names})
+        }
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+@app.post("/api/trajectory/convert")
+async def convert_trajectory(
+    pdb_file: UploadFile = File(...),
+    xtc_file: UploadFile = File(...),
+    selection: str = Form("protein")
+):
+    try:
+        if not MDAnalysis_INSTALLED:
+            return {"error": "MDAnalysis not installed on the server"}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdb_path = await load_structure_upload(pdb_file, temp_dir, "topology")
+            xtc_path = await store_trajectory_upload(xtc_file)
+            
+            # Decode the selected atoms once into the memory-mapped float32 store;
+            # later analyses of the same trajectory read from it automatically
+            u = load_universe(pdb_path, xtc_path)
+            try:
+                atoms = select_atoms(u, selection)
+            except ValueError as e:
+                return {"error": str(e)}
+            stored = convert_coordinates(atoms, DEFAULT_BLOCK_SIZE)
+        
+        return {
+            "trajectory_id": os.path.splitext(os.path.basename(xtc_path))[0],
+            "selection": selection,
+            **stored
+        }
+    
+    except Exception as e:
+        return {"error": str(e)}
@@ -25,6 +25,7 @@ import warnings
 warnings.filterwarnings("ignore")
 
 import math
+import os
 
 import Bio.PDB
 import numpy as np
@@ -249,6 +250,27 @@ def ModelDihedrals(model, model_num, iter_chains=True, chain_id=None):
 
 
 
+def StructureParser(file_name):
+	"""
+	====================================================================================
+	Returns a Biopython structure parser matching the file extension: PDB, mmCIF 
+	(FastMMCIFParser) or BinaryCIF (BinaryCIFParser, Biopython >= 1.84)
+	====================================================================================
+	"""
+
+	extension = os.path.splitext(file_name)[1].lower()
+
+	if extension in (".cif", ".mmcif"):
+		return Bio.PDB.FastMMCIFParser(QUIET=True)
+
+	if extension == ".bcif":
+		from Bio.PDB.binary_cif import BinaryCIFParser
+		return BinaryCIFParser()
+
+	return Bio.PDB.PDBParser()
+
+
+
 def ExtractDihedrals(pdb_file_name=None, iter_models=True, model_number=0, 
 													iter_chains=True, chain_id=None):
 	"""
@@ -264,14 +286,14 @@ def ExtractDihedrals(pdb_file_name=None, iter_models=True, model_number=0,
 
 		# Attempts to extract information from PDB file
 		try:
-			pdb_code = pdb_file_name[:-4]
+			pdb_code = os.path.splitext(pdb_file_name)[0]
 			pdb_summaryDF = pd.DataFrame(columns=["ModelID","chainID","residueName",
 													"residueIndex","phi","psi","type"])
 
 			# User did not parse in specific model: Iterate over all models in PDB object
 			if iter_models:
 
-				models = Bio.PDB.PDBParser().get_structure(pdb_code, pdb_file_name)
+				models = StructureParser(pdb_file_name).get_structure(pdb_code, pdb_file_name)
 
 				for model in models:
 
@@ -283,7 +305,7 @@ def ExtractDihedrals(pdb_file_name=None, iter_models=True, model_number=0,
 			# Specific model number parsed in by user
 			else:
 				try:
-					model = Bio.PDB.PDBParser().get_structure(pdb_code, pdb_file_name)[model_number]
+					model = StructureParser(pdb_file_name).get_structure(pdb_code, pdb_file_name)[model_number]
 					model_dihedrals = ModelDihedrals(model, model_number)
 					pdb_summaryDF = pd.concat([pdb_summaryDF, model_dihedrals], ignore_index=True)
 				# Invalid model number given 
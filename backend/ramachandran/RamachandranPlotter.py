@@ -58,7 +58,7 @@ def main(pdb, itmod, model_num, itchain, chain_num, plot_type, out_dir, verb, sa
 	# User input determines background
 	plot_type = options[int(plot_type)]				
 	# Out file name
-	plot_name = os.path.join(out_dir, pdb[:-4] + '_' + plot_type + "RamachandranPlot_tmp")
+	plot_name = os.path.join(out_dir, os.path.splitext(pdb)[0] + '_' + plot_type + "RamachandranPlot_tmp")
 
 
 
@@ -0,0 +1,161 @@
+"""
+Compute-thread budgeting.
+
+Every API job registers itself in a job directory shared by all server
+processes and receives a thread budget: MAX_THREADS divided by the number of
+running jobs. The budget caps BLAS/OpenMP pools through threadpoolctl, numba's
+thread count and the size of worker process pools, so concurrent requests
+share the cores instead of each starting one thread per core. The load average
+is deliberately not used: it lags by a minute, so the server's own finished
+jobs would still count as busy cores.
+
+BLAS limits are process-wide; this matches the server, where endpoints run
+their compute on the event loop and therefore one at a time per process.
+"""
+
+import contextvars
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_INSTALLED = True
+except ImportError:
+    THREADPOOLCTL_INSTALLED = False
+
+try:
+    import numba
+    NUMBA_INSTALLED = True
+except ImportError:
+    NUMBA_INSTALLED = False
+
+from trajectory.store import CACHE_DIR
+
+JOB_DIR = os.path.join(CACHE_DIR, "jobs")
+
+
+def _cpu_count():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+MAX_THREADS = int(os.environ.get("SIMANA_MAX_THREADS", _cpu_count()))
+
+_budget = contextvars.ContextVar("thread_budget", default=None)
+# Budgets of the jobs running in this process, in start order
+_local_budgets = []
+_restore_limits = None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def active_jobs():
+    """Thread counts granted to running jobs; entries of dead processes are removed."""
+    if not os.path.isdir(JOB_DIR):
+        return []
+    granted = []
+    for name in os.listdir(JOB_DIR):
+        path = os.path.join(JOB_DIR, name)
+        try:
+            pid = int(name.split("-", 1)[0])
+            with open(path) as f:
+                threads = int(f.read() or 1)
+        except (ValueError, OSError):
+            continue
+        if not _pid_alive(pid):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            continue
+        granted.append(threads)
+    return granted
+
+
+def thread_budget(n_jobs):
+    """Threads for one of `n_jobs` concurrent jobs: an equal share of MAX_THREADS."""
+    return max(1, MAX_THREADS // max(1, n_jobs))
+
+
+def apply_thread_limits(threads):
+    """
+    Limit BLAS/OpenMP pools and numba to `threads` in this process. Returns a
+    callable restoring the previous limits.
+    """
+    limiter = threadpool_limits(limits=threads) if THREADPOOLCTL_INSTALLED else None
+    numba_threads = numba.get_num_threads() if NUMBA_INSTALLED else None
+    if NUMBA_INSTALLED:
+        numba.set_num_threads(max(1, min(threads, numba.config.NUMBA_NUM_THREADS)))
+
+    def restore():
+        if limiter is not None:
+            limiter.restore_original_limits()
+        if numba_threads is not None:
+            numba.set_num_threads(numba_threads)
+    return restore
+
+
+@contextmanager
+def compute_budget():
+    """Register a job for the duration of the block and apply its thread budget."""
+    global _restore_limits
+    os.makedirs(JOB_DIR, exist_ok=True)
+    others = active_jobs()
+    threads = thread_budget(len(others) + 1)
+    path = os.path.join(JOB_DIR, f"{os.getpid()}-{uuid.uuid4().hex}")
+    with open(path, "w") as f:
+        f.write(str(threads))
+
+    token = _budget.set(threads)
+    restore = apply_thread_limits(threads)
+    if not _local_budgets:
+        _restore_limits = restore
+    _local_budgets.append(threads)
+    try:
+        yield threads
+    finally:
+        _budget.reset(token)
+        _local_budgets.remove(threads)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        # Jobs interleave at await points: keep the latest remaining job's limits,
+        # or restore the limits the process had before its first job
+        if _local_budgets:
+            apply_thread_limits(_local_budgets[-1])
+        else:
+            _restore_limits()
+
+
+def current_budget():
+    """Thread budget of the running job (MAX_THREADS outside of a job)."""
+    budget = _budget.get()
+    return MAX_THREADS if budget is None else budget
+
+
+def budget_workers(n_workers=None):
+    """Worker process count within the current budget (the budget itself when unset)."""
+    budget = current_budget()
+    return max(1, min(n_workers or budget, budget))
+
+
+def process_pool(n_workers):
+    """
+    ProcessPoolExecutor with at most `n_workers` (clamped to the budget) workers,
+    each limited to an equal share of the job's threads.
+    """
+    n_workers = budget_workers(n_workers)
+    return ProcessPoolExecutor(max_workers=n_workers, initializer=apply_thread_limits,
+                               initargs=(max(1, current_budget() // n_workers),))
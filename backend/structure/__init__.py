@@ -0,0 +1,3 @@
+"""
+Static structure analyses (B-factor profiles and structure comparison) used by the API.
+"""
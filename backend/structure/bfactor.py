@@ -0,0 +1,188 @@
+"""
+Per-residue B-factor profiles.
+
+Atom B-factors are reduced to per-residue mean and standard deviation with
+np.bincount over residue indices. Multi-model files contribute one set of
+B-factors per model, and batches of structures are compared through normalised
+profiles placed on a shared (segment, residue) axis.
+"""
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+from resources import budget_workers, process_pool
+
+from .cache import register_universe, resolve_selection, topology_digest
+from .ingest import atom_site_models, load_universe, read_atom_site, structure_format, universe_from_atom_site
+
+NORMALIZATIONS = ("zscore", "minmax", "none")
+
+# Minimum number of shared residues for a profile correlation to be reported
+MIN_SHARED_RESIDUES = 3
+
+
+def residue_bfactor_stats(values, atoms):
+    """
+    Per-residue mean and (population) standard deviation of per-atom values.
+
+    Returns (residues, mean, std) for the residues of `atoms`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    residues = atoms.residues
+    local = np.searchsorted(residues.ix, atoms.resindices)
+    counts = np.maximum(np.bincount(local, minlength=len(residues)), 1)
+    mean = np.bincount(local, weights=values, minlength=len(residues)) / counts
+    # Deviations from the residue mean avoid cancellation for large B-factors
+    variance = np.bincount(local, weights=(values - mean[local]) ** 2, minlength=len(residues)) / counts
+    return residues, mean, np.sqrt(variance)
+
+
+def model_bfactors(universe, atoms):
+    """B-factors of `atoms` per model as an (n_models, n_atoms) array."""
+    trajectory = universe.trajectory
+    if len(trajectory) <= 1:
+        return atoms.tempfactors.astype(np.float64)[None, :]
+    values = np.empty((len(trajectory), len(atoms)), dtype=np.float64)
+    for k, ts in enumerate(trajectory):
+        tempfactor = ts.data.get("tempfactor")
+        values[k] = atoms.tempfactors if tempfactor is None else np.asarray(tempfactor)[atoms.indices]
+    return values
+
+
+def residue_model_means(values, atoms):
+    """Per-residue mean of every model in one bincount; returns (n_models, n_residues)."""
+    n_models = len(values)
+    residues = atoms.residues
+    local = np.searchsorted(residues.ix, atoms.resindices)
+    counts = np.maximum(np.bincount(local, minlength=len(residues)), 1)
+    # Offset residue indices by model so all models reduce together
+    keys = (local[None, :] + len(residues) * np.arange(n_models)[:, None]).ravel()
+    sums = np.bincount(keys, weights=values.ravel(), minlength=n_models * len(residues))
+    return sums.reshape(n_models, len(residues)) / counts
+
+
+def structure_bfactors(path, selection="protein"):
+    """
+    B-factor profile of one structure file.
+
+    Atom B-factors are averaged over models before the per-residue reduction.
+    Returns a dict with the residues, per-residue mean and std, the number of
+    models and the per-model residue means.
+    """
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+
+    if structure_format(path) == "pdb":
+        u = load_universe(path)
+        model_values = None
+    else:
+        # mmCIF/BinaryCIF keep B-factors for every model in the atom table
+        table = read_atom_site(path)
+        u = universe_from_atom_site(table)
+        register_universe(u, topology_digest(path))
+        model_values = atom_site_models(table, "B_iso_or_equiv")
+    atoms = resolve_selection(u, selection)
+    if len(atoms) == 0:
+        raise ValueError(f"Selection '{selection}' did not match any atoms.")
+
+    values = model_bfactors(u, atoms) if model_values is None else model_values[:, atoms.indices]
+    residues, mean, std = residue_bfactor_stats(values.mean(axis=0), atoms)
+    return {
+        "residues": residues,
+        "mean": mean,
+        "std": std,
+        "n_models": len(values),
+        "model_means": residue_model_means(values, atoms),
+    }
+
+
+def normalize_profile(values, method="zscore"):
+    """Normalise a profile by z-score or min-max scaling ('none' returns a copy)."""
+    values = np.asarray(values, dtype=np.float64)
+    if method == "zscore":
+        spread = values.std()
+        return (values - values.mean()) / spread if spread > 0 else np.zeros_like(values)
+    if method == "minmax":
+        span = values.max() - values.min() if len(values) else 0.0
+        return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+    if method == "none":
+        return values.copy()
+    raise ValueError(f"Unknown normalization '{method}'. Choose from: {', '.join(NORMALIZATIONS)}")
+
+
+def residue_profile(path, selection="protein"):
+    """(segids, resids, mean B-factor, n_models) of one structure; used directly and by workers."""
+    result = structure_bfactors(path, selection)
+    residues = result["residues"]
+    return residues.segids.astype(str), residues.resids.astype(np.int64), result["mean"], result["n_models"]
+
+
+def profile_correlations(matrix, mask):
+    """
+    Pairwise Pearson correlation of profiles over their shared residues.
+
+    `matrix` holds profiles as rows with missing entries zeroed and `mask` marks
+    the present entries. All pair sums come from matrix products; pairs sharing
+    fewer than MIN_SHARED_RESIDUES residues are NaN.
+    """
+    present = mask.astype(np.float64)
+    n = present @ present.T
+    sum_x = matrix @ present.T
+    sum_xx = (matrix ** 2) @ present.T
+    sum_xy = matrix @ matrix.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = n * sum_xy - sum_x * sum_x.T
+        variance_x = n * sum_xx - sum_x ** 2
+        correlation = covariance / np.sqrt(variance_x * variance_x.T)
+    correlation[n < MIN_SHARED_RESIDUES] = np.nan
+    return correlation
+
+
+def compare_bfactor_profiles(paths, selection="protein", normalization="zscore", n_workers=1):
+    """
+    Normalised per-residue B-factor profiles of many structures on a common residue axis.
+
+    Structures are parsed in a process pool when n_workers > 1. Returns a dict with
+    the shared (segid, resid) axis, the profile matrix (NaN where a structure lacks
+    a residue), the number of residues and models per structure and the pairwise
+    profile correlations.
+    """
+    if normalization not in NORMALIZATIONS:
+        raise ValueError(f"Unknown normalization '{normalization}'. Choose from: {', '.join(NORMALIZATIONS)}")
+    if not paths:
+        raise ValueError("No structures provided")
+
+    n_workers = min(budget_workers(n_workers), len(paths))
+    if n_workers > 1:
+        with process_pool(n_workers) as executor:
+            chunksize = max(1, len(paths) // (4 * n_workers))
+            profiles = list(executor.map(residue_profile, paths, [selection] * len(paths), chunksize=chunksize))
+    else:
+        profiles = [residue_profile(path, selection) for path in paths]
+
+    # Shared residue axis ordered by segment, then residue number
+    sizes = np.array([len(resids) for _, resids, _, _ in profiles])
+    keys = np.empty(sizes.sum(), dtype=[("segid", "U8"), ("resid", np.int64)])
+    keys["segid"] = np.concatenate([segids for segids, _, _, _ in profiles])
+    keys["resid"] = np.concatenate([resids for _, resids, _, _ in profiles])
+    axis, columns = np.unique(keys, return_inverse=True)
+    rows = np.repeat(np.arange(len(profiles)), sizes)
+
+    matrix = np.full((len(profiles), len(axis)), np.nan)
+    matrix[rows, columns] = np.concatenate([
+        normalize_profile(mean, normalization) for _, _, mean, _ in profiles
+    ])
+    mask = ~np.isnan(matrix)
+    return {
+        "segids": axis["segid"],
+        "resids": axis["resid"],
+        "profiles": matrix,
+        "residue_counts": sizes,
+        "model_counts": np.array([n_models for _, _, _, n_models in profiles]),
+        "correlation": profile_correlations(np.where(mask, matrix, 0.0), mask),
+    }
@@ -0,0 +1,141 @@
+"""
+Per-topology caches.
+
+Topology files are identified by a hash of their content. Parsed topologies are
+kept in a small in-process LRU so repeated uploads of the same structure skip
+parsing and attribute guessing, and resolved atom selections are stored as
+index arrays (in memory and under the cache directory) keyed by topology hash
+and selection string, so repeat analyses skip selection parsing and evaluation.
+Stored selections also depend on the MDAnalysis version, and only those of the
+most recently used topologies are kept on disk. Selections that depend on
+coordinates are always evaluated.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from MDAnalysis import __version__ as MDANALYSIS_VERSION
+except ImportError:
+    MDANALYSIS_VERSION = ""
+
+from trajectory.store import CACHE_DIR
+from uploads import UPLOAD_BLOCK_SIZE
+
+SELECTION_DIR = os.path.join(CACHE_DIR, "selections")
+TOPOLOGY_CACHE_SIZE = int(os.environ.get("SIMANA_TOPOLOGY_CACHE_SIZE", 4))
+SELECTION_CACHE_SIZE = 256
+# Topologies whose selections are kept under SELECTION_DIR
+MAX_STORED_SELECTION_TOPOLOGIES = 64
+
+# Selection keywords whose result depends on the current coordinates
+GEOMETRIC_KEYWORDS = {"around", "sphzone", "sphlayer", "cyzone", "cylayer", "isolayer", "point", "prop"}
+
+_topologies = OrderedDict()
+_selections = OrderedDict()
+_digests = {}
+_universe_keys = weakref.WeakKeyDictionary()
+
+
+def topology_digest(path):
+    """Content hash of a topology file (memoised by path, size and modification time)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digests:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(UPLOAD_BLOCK_SIZE), b""):
+                digest.update(block)
+        if len(_digests) >= SELECTION_CACHE_SIZE:
+            _digests.clear()
+        _digests[memo_key] = digest.hexdigest()
+    return _digests[memo_key]
+
+
+def _remember(cache, key, value, size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def cached_topology(key):
+    """(topology, coordinates) stored for a topology hash, or None."""
+    entry = _topologies.get(key)
+    if entry is not None:
+        _topologies.move_to_end(key)
+    return entry
+
+
+def store_topology(key, topology, coordinates=None):
+    """
+    Keep a parsed topology (and, for formats read into memory, its (models, atoms, 3)
+    coordinates) under `key`. Callers must copy both before use.
+    """
+    if TOPOLOGY_CACHE_SIZE > 0:
+        _remember(_topologies, key, (topology, coordinates), TOPOLOGY_CACHE_SIZE)
+
+
+def register_universe(universe, key):
+    """Associate a Universe with the hash of the topology it was built from."""
+    _universe_keys[universe] = key
+
+
+def _selection_path(key, selection):
+    # Selection semantics can change between MDAnalysis versions
+    name = hashlib.blake2b(f"{MDANALYSIS_VERSION}\0{selection}".encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(SELECTION_DIR, key, name + ".npy")
+
+
+def _prune_selections():
+    if not os.path.isdir(SELECTION_DIR):
+        return
+    entries = sorted((os.path.getmtime(os.path.join(SELECTION_DIR, name)), name)
+                     for name in os.listdir(SELECTION_DIR))
+    for _, name in entries[:max(0, len(entries) - MAX_STORED_SELECTION_TOPOLOGIES + 1)]:
+        shutil.rmtree(os.path.join(SELECTION_DIR, name), ignore_errors=True)
+
+
+def _write_indices(path, indices):
+    if not os.path.isdir(os.path.dirname(path)):
+        _prune_selections()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npy")
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, indices)
+    os.replace(temp_path, path)
+
+
+def resolve_selection(universe, selection):
+    """
+    universe.select_atoms(selection), served from the selection cache when the
+    Universe was registered with a topology hash.
+    """
+    key = _universe_keys.get(universe)
+    words = set(re.findall(r"[a-z_]+", selection.lower()))
+    if key is None or words & GEOMETRIC_KEYWORDS:
+        return universe.select_atoms(selection)
+
+    cache_key = (key, selection)
+    indices = _selections.get(cache_key)
+    if indices is None:
+        path = _selection_path(key, selection)
+        try:
+            indices = np.load(path)
+            # The directory's modification time orders topologies for pruning
+            os.utime(os.path.dirname(path))
+        except (OSError, ValueError):
+            indices = universe.select_atoms(selection).indices.astype(np.int64)
+            try:
+                _write_indices(path, indices)
+            except OSError:
+                pass
+    _remember(_selections, cache_key, indices, SELECTION_CACHE_SIZE)
+    return universe.atoms[indices]
@@ -0,0 +1,283 @@
+"""
+Structure file ingestion.
+
+Uploads are streamed to disk, gzip/bzip2 input is decompressed block by block,
+and the format (PDB, mmCIF or BinaryCIF) is sniffed from the content. PDB files
+go straight to MDAnalysis; mmCIF is read with gemmi when installed (Biopython's
+MMCIF2Dict otherwise) and BinaryCIF with the NumPy column decoder, and the atom
+table is turned into an MDAnalysis Universe from arrays. All structure-based
+endpoints load their topology through `load_universe`, which reuses parsed
+topologies of previously seen files.
+"""
+
+import bz2
+import gzip
+import os
+import shutil
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    from MDAnalysis.coordinates.memory import MemoryReader
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+try:
+    import gemmi
+    GEMMI_INSTALLED = True
+except ImportError:
+    GEMMI_INSTALLED = False
+
+try:
+    from Bio.PDB.MMCIF2Dict import MMCIF2Dict
+    BIOPYTHON_INSTALLED = True
+except ImportError:
+    BIOPYTHON_INSTALLED = False
+
+from uploads import UPLOAD_BLOCK_SIZE, save_upload
+
+from .binary_cif import read_binary_cif_category
+from .cache import cached_topology, register_universe, store_topology, topology_digest
+
+STRUCTURE_EXTENSIONS = {"pdb": ".pdb", "cif": ".cif", "bcif": ".bcif"}
+COMPRESSION_OPENERS = {"gzip": gzip.open, "bz2": bz2.open}
+
+# _atom_site columns used to build a Universe (auth_* preferred, label_* as fallback)
+ATOM_SITE_COLUMNS = (
+    "group_PDB", "id", "type_symbol", "label_atom_id", "auth_atom_id", "label_alt_id",
+    "label_comp_id", "auth_comp_id", "label_asym_id", "auth_asym_id", "label_seq_id",
+    "auth_seq_id", "pdbx_PDB_ins_code", "Cartn_x", "Cartn_y", "Cartn_z", "occupancy",
+    "B_iso_or_equiv", "pdbx_PDB_model_num",
+)
+
+
+def _sniff_format(head):
+    # BinaryCIF is a MessagePack map at the top level (fixmap, map16 or map32)
+    if head and (0x80 <= head[0] <= 0x8f or head[0] in (0xde, 0xdf)):
+        return "bcif"
+    for line in head.decode("latin-1").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        return "cif" if line.startswith("data_") else "pdb"
+    return "pdb"
+
+
+def detect_structure_format(path):
+    """
+    Return (format, compression) for a saved structure file.
+
+    The format is 'pdb', 'cif' or 'bcif' and is sniffed from the (decompressed)
+    content; compression is 'gzip', 'bz2' or None from the magic bytes.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(3)
+    compression = "gzip" if magic[:2] == b"\x1f\x8b" else "bz2" if magic == b"BZh" else None
+
+    opener = COMPRESSION_OPENERS.get(compression, open)
+    with opener(path, "rb") as f:
+        head = f.read(1 << 12)
+    return _sniff_format(head), compression
+
+
+def structure_stem(filename, default="structure"):
+    """File name without directories, compression and structure extensions."""
+    name = os.path.basename(filename or "")
+    for suffix in (".gz", ".bz2", ".pdb", ".ent", ".cif", ".mmcif", ".bcif"):
+        if name.lower().endswith(suffix):
+            name = name[:-len(suffix)]
+    return name or default
+
+
+def structure_format(path):
+    """Format of a file written by `prepare_structure_file`, from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    for file_format, known in STRUCTURE_EXTENSIONS.items():
+        if extension == known:
+            return file_format
+    return "pdb"
+
+
+def prepare_structure_file(raw_path, directory, stem="structure"):
+    """
+    Decompress (streaming) and rename a saved upload to `stem` plus the extension
+    of its sniffed format; returns the new path.
+    """
+    file_format, compression = detect_structure_format(raw_path)
+    path = os.path.join(directory, stem + STRUCTURE_EXTENSIONS[file_format])
+    if compression:
+        with COMPRESSION_OPENERS[compression](raw_path, "rb") as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst, UPLOAD_BLOCK_SIZE)
+        os.unlink(raw_path)
+    elif raw_path != path:
+        os.replace(raw_path, path)
+    return path
+
+
+async def load_structure_upload(upload, directory, stem=None):
+    """Save an uploaded PDB/mmCIF/BinaryCIF file (optionally compressed) into `directory`."""
+    stem = stem or structure_stem(upload.filename)
+    raw_path = os.path.join(directory, f"{stem}.upload")
+    await save_upload(upload, raw_path)
+    return prepare_structure_file(raw_path, directory, stem)
+
+
+def _read_cif_category(path):
+    if GEMMI_INSTALLED:
+        # Raw strings of the whole category in one call; only quoted values need decoding
+        category = gemmi.cif.read(path).sole_block().get_mmcif_category("_atom_site.", raw=True)
+        table = {}
+        for name in ATOM_SITE_COLUMNS:
+            if name in category:
+                values = np.array(category[name])
+                quoted = np.char.startswith(values, "'") | np.char.startswith(values, '"')
+                if quoted.any():
+                    values[quoted] = [gemmi.cif.as_string(value) for value in values[quoted]]
+                table[name] = values
+        return table
+    if not BIOPYTHON_INSTALLED:
+        raise RuntimeError("Reading mmCIF requires gemmi or Biopython")
+    mmcif = MMCIF2Dict(path)
+    return {
+        name: np.array(mmcif[f"_atom_site.{name}"]) for name in ATOM_SITE_COLUMNS
+        if f"_atom_site.{name}" in mmcif
+    }
+
+
+def read_atom_site(path):
+    """Return the _atom_site table of an mmCIF or BinaryCIF file as {column: array}."""
+    if structure_format(path) == "bcif":
+        return read_binary_cif_category(path, "_atom_site")
+    return _read_cif_category(path)
+
+
+def _column(table, *names, default=""):
+    for name in names:
+        if name in table:
+            values = table[name]
+            if values.dtype.kind == "U":
+                # CIF placeholders for missing values
+                values = np.where(np.isin(values, (".", "?")), "", values)
+            return values
+    n_rows = len(next(iter(table.values())))
+    return np.full(n_rows, default)
+
+
+def _numbers(values, dtype):
+    if values.dtype.kind == "U":
+        values = np.where(values == "", "0", values)
+    return values.astype(dtype)
+
+
+def atom_site_models(table, name, default="0"):
+    """
+    Numeric _atom_site column as an (n_models, n_atoms) array, or only the first
+    model as a single row when models differ in size.
+    """
+    models = _numbers(_column(table, "pdbx_PDB_model_num", default="1"), np.int64)
+    values = _numbers(_column(table, name, default=default), np.float64)
+    n_models = len(np.unique(models))
+    first = models == models[0]
+    if n_models > 1 and len(values) == n_models * first.sum():
+        return values.reshape(n_models, -1)
+    return values[first][None, :]
+
+
+def universe_from_atom_site(table):
+    """
+    Build an MDAnalysis Universe from an _atom_site table.
+
+    The first model defines the topology; when every model has the same number
+    of atoms, all models are loaded as frames of an in-memory trajectory.
+    """
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+    if not table or "Cartn_x" not in table:
+        raise ValueError("No atoms found in the structure file")
+
+    models = _numbers(_column(table, "pdbx_PDB_model_num", default="1"), np.int64)
+    model_ids, model_sizes = np.unique(models, return_counts=True)
+    first = models == models[0]
+    n_atoms = int(first.sum())
+
+    names = _column(table, "auth_atom_id", "label_atom_id")[first]
+    resnames = _column(table, "auth_comp_id", "label_comp_id")[first]
+    chains = _column(table, "auth_asym_id", "label_asym_id")[first]
+    resids = _numbers(_column(table, "auth_seq_id", "label_seq_id", default="0")[first], np.int64)
+    icodes = _column(table, "pdbx_PDB_ins_code")[first]
+    elements = _column(table, "type_symbol")[first]
+
+    # A new residue starts wherever chain, number, insertion code or name changes
+    changed = np.ones(n_atoms, dtype=bool)
+    changed[1:] = ((chains[1:] != chains[:-1]) | (resids[1:] != resids[:-1])
+                   | (icodes[1:] != icodes[:-1]) | (resnames[1:] != resnames[:-1]))
+    atom_resindex = np.cumsum(changed) - 1
+    residue_starts = np.nonzero(changed)[0]
+    segids, residue_segindex = np.unique(chains[residue_starts], return_inverse=True)
+
+    u = mda.Universe.empty(n_atoms, n_residues=len(residue_starts), n_segments=len(segids),
+                           atom_resindex=atom_resindex, residue_segindex=residue_segindex,
+                           trajectory=True)
+    u.add_TopologyAttr("names", names)
+    u.add_TopologyAttr("types", elements)
+    u.add_TopologyAttr("elements", np.char.capitalize(elements))
+    u.add_TopologyAttr("ids", _numbers(_column(table, "id", default="0")[first], np.int64))
+    u.add_TopologyAttr("record_types", np.where(_column(table, "group_PDB")[first] == "HETATM", "HETATM", "ATOM"))
+    u.add_TopologyAttr("altLocs", _column(table, "label_alt_id")[first])
+    u.add_TopologyAttr("occupancies", _numbers(_column(table, "occupancy", default="1")[first], np.float64))
+    u.add_TopologyAttr("tempfactors", _numbers(_column(table, "B_iso_or_equiv", default="0")[first], np.float64))
+    u.add_TopologyAttr("chainIDs", chains)
+    u.add_TopologyAttr("resnames", resnames[residue_starts])
+    u.add_TopologyAttr("resids", resids[residue_starts])
+    u.add_TopologyAttr("resnums", resids[residue_starts])
+    u.add_TopologyAttr("icodes", icodes[residue_starts])
+    u.add_TopologyAttr("segids", segids)
+    if hasattr(u, "guess_TopologyAttrs"):
+        u.guess_TopologyAttrs(to_guess=["masses"])
+    else:
+        from MDAnalysis.topology.guessers import guess_masses
+        u.add_TopologyAttr("masses", guess_masses(u.atoms.types))
+
+    coordinates = np.column_stack([
+        _numbers(table[axis], np.float32) for axis in ("Cartn_x", "Cartn_y", "Cartn_z")
+    ])
+    if len(model_ids) > 1 and np.all(model_sizes == n_atoms):
+        u.load_new(coordinates.reshape(len(model_ids), n_atoms, 3), format=MemoryReader, order="fac")
+    else:
+        u.atoms.positions = coordinates[first]
+    return u
+
+
+def load_universe(topology_path, *coordinates):
+    """
+    mda.Universe(topology_path, *coordinates) that also accepts mmCIF and
+    BinaryCIF topologies prepared by `prepare_structure_file`.
+
+    Parsed topologies are cached by content hash, and the Universe is registered
+    with that hash for the selection cache.
+    """
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+    key = topology_digest(topology_path)
+    cached = cached_topology(key)
+    pdb = structure_format(topology_path) == "pdb"
+
+    if pdb:
+        if cached is None:
+            u = mda.Universe(topology_path, *coordinates)
+            store_topology(key, u._topology.copy())
+        else:
+            u = mda.Universe(cached[0].copy(), *(coordinates or (topology_path,)))
+    else:
+        if cached is None:
+            u = universe_from_atom_site(read_atom_site(topology_path))
+            store_topology(key, u._topology.copy(), u.trajectory.coordinate_array.copy())
+        else:
+            u = mda.Universe(cached[0].copy())
+            u.load_new(cached[1].copy(), format=MemoryReader, order="fac")
+        if coordinates:
+            u.load_new(coordinates[0] if len(coordinates) == 1 else list(coordinates))
+    register_universe(u, key)
+    return u
@@ -0,0 +1,166 @@
+"""
+Tile pyramids for large residue-residue matrices (DCCM, contact maps).
+
+Level 0 is the matrix itself; each further level halves both axes by max or
+mean pooling 2x2 cells, until the whole matrix fits in one tile. Levels are
+built in row strips from a row source, so the dense matrix need not be in
+memory, and are stored as float32 .npy files under the cache directory. Tiles
+are read back through memory maps. Sparse matrices (such as contact maps) are
+given as their nonzero entries and scattered into one strip at a time. For
+low-rank matrices only the factors are stored for level 0 and its tiles are
+reconstructed on demand.
+"""
+
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from trajectory.store import CACHE_DIR
+
+TILE_DIR = os.path.join(CACHE_DIR, "tiles")
+TILE_SIZE = 256
+POOLINGS = ("max", "mean")
+MAX_STORED_PYRAMIDS = 32
+
+# Target number of matrix cells computed per row strip while building levels
+STRIP_CELLS = 1 << 24
+
+
+def _pyramid_dir(pyramid_id):
+    if not pyramid_id or not all(c in "0123456789abcdef" for c in pyramid_id):
+        raise ValueError("Invalid tile pyramid id")
+    return os.path.join(TILE_DIR, pyramid_id)
+
+
+def _pool(block, factor, pooling):
+    """Pool a (rows, cols) block by `factor` along both axes, padding ragged edges with NaN."""
+    rows, cols = block.shape
+    out_rows, out_cols = -(-rows // factor), -(-cols // factor)
+    if rows % factor == 0 and cols % factor == 0:
+        windows = block.reshape(out_rows, factor, out_cols, factor)
+        return windows.max(axis=(1, 3)) if pooling == "max" else windows.mean(axis=(1, 3), dtype=np.float32)
+    padded = np.full((out_rows * factor, out_cols * factor), np.nan, dtype=np.float32)
+    padded[:rows, :cols] = block
+    windows = padded.reshape(out_rows, factor, out_cols, factor)
+    reduce = np.nanmax if pooling == "max" else np.nanmean
+    return reduce(windows, axis=(1, 3))
+
+
+def _prune_pyramids():
+    if not os.path.isdir(TILE_DIR):
+        return
+    entries = sorted((os.path.getmtime(os.path.join(TILE_DIR, name)), name) for name in os.listdir(TILE_DIR))
+    for _, name in entries[:max(0, len(entries) - MAX_STORED_PYRAMIDS + 1)]:
+        shutil.rmtree(os.path.join(TILE_DIR, name), ignore_errors=True)
+
+
+def build_tile_pyramid(matrix=None, factors=None, pooling="max", tile_size=TILE_SIZE, pairs=None, shape=None):
+    """
+    Precompute the pooled levels of a dense `matrix`, of the low-rank matrix
+    factors @ factors.T (clipped to [-1, 1]), or of the sparse matrix of `shape`
+    whose nonzero entries are `pairs` = (rows, cols, values), and return the
+    pyramid metadata.
+    """
+    if pooling not in POOLINGS:
+        raise ValueError(f"pooling must be one of {', '.join(POOLINGS)}")
+    if sum(source is not None for source in (matrix, factors, pairs)) != 1:
+        raise ValueError("Provide either a matrix, low-rank factors or sparse pairs")
+
+    if matrix is not None:
+        shape = matrix.shape
+        rows_of = lambda lo, hi: matrix[lo:hi]
+    elif factors is not None:
+        factors = np.asarray(factors, dtype=np.float32)
+        shape = (len(factors), len(factors))
+        rows_of = lambda lo, hi: np.clip(factors[lo:hi] @ factors.T, -1.0, 1.0)
+    else:
+        if shape is None:
+            raise ValueError("Sparse pairs need the matrix shape")
+        rows, cols, values = (np.asarray(column) for column in pairs)
+        order = np.argsort(rows, kind="stable")
+        rows, cols, values = rows[order], cols[order], values[order].astype(np.float32)
+
+        def rows_of(lo, hi):
+            block = np.zeros((hi - lo, shape[1]), dtype=np.float32)
+            first, last = np.searchsorted(rows, (lo, hi))
+            block[rows[first:last] - lo, cols[first:last]] = values[first:last]
+            return block
+
+    n_levels = 1
+    while max(-(-shape[0] // 2 ** (n_levels - 1)), -(-shape[1] // 2 ** (n_levels - 1))) > tile_size:
+        n_levels += 1
+
+    _prune_pyramids()
+    pyramid_id = uuid.uuid4().hex
+    directory = _pyramid_dir(pyramid_id)
+    os.makedirs(directory)
+
+    first_level = 0 if factors is None else 1
+    if factors is not None:
+        np.save(os.path.join(directory, "factors.npy"), factors)
+    levels = {
+        level: np.lib.format.open_memmap(
+            os.path.join(directory, f"level_{level}.npy"), mode="w+", dtype=np.float32,
+            shape=(-(-shape[0] // 2 ** level), -(-shape[1] // 2 ** level)))
+        for level in range(first_level, n_levels)
+    }
+
+    # Strips are a multiple of the coarsest pooling factor so every level gets whole rows
+    step = 2 ** (n_levels - 1)
+    strip = step * max(1, STRIP_CELLS // (step * max(shape[1], 1)))
+    for lo in range(0, shape[0], strip):
+        block = np.asarray(rows_of(lo, min(lo + strip, shape[0])), dtype=np.float32)
+        for level in range(n_levels):
+            if level > 0:
+                block = _pool(block, 2, pooling)
+            if level in levels:
+                start = lo // 2 ** level
+                levels[level][start:start + len(block)] = block
+    for array in levels.values():
+        array.flush()
+
+    meta = {
+        "pyramid_id": pyramid_id,
+        "shape": list(shape),
+        "levels": n_levels,
+        "tile_size": tile_size,
+        "pooling": pooling,
+        "low_rank": factors is not None,
+    }
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def load_pyramid_meta(pyramid_id):
+    """Metadata written by `build_tile_pyramid`."""
+    path = os.path.join(_pyramid_dir(pyramid_id), "meta.json")
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown tile pyramid '{pyramid_id}'")
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_tile(pyramid_id, level, row, col):
+    """
+    Tile (row, col) of a pyramid level as a float32 array of at most
+    tile_size x tile_size cells; level 0 is full resolution.
+    """
+    meta = load_pyramid_meta(pyramid_id)
+    if not 0 <= level < meta["levels"]:
+        raise ValueError(f"Level must be between 0 and {meta['levels'] - 1}")
+    size = meta["tile_size"]
+    n_rows, n_cols = (-(-n // 2 ** level) for n in meta["shape"])
+    if not (0 <= row < -(-n_rows // size) and 0 <= col < -(-n_cols // size)):
+        raise ValueError(f"Tile ({row}, {col}) is outside level {level}")
+
+    rows = slice(row * size, min((row + 1) * size, n_rows))
+    cols = slice(col * size, min((col + 1) * size, n_cols))
+    directory = _pyramid_dir(pyramid_id)
+    if level == 0 and meta["low_rank"]:
+        factors = np.load(os.path.join(directory, "factors.npy"), mmap_mode="r")
+        return np.clip(factors[rows] @ factors[cols].T, -1.0, 1.0)
+    return np.array(np.load(os.path.join(directory, f"level_{level}.npy"), mmap_mode="r")[rows, cols])
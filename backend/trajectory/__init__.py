@@ -0,0 +1,3 @@
+"""
+Trajectory analysis engines (superposition, fluctuations, structural descriptors) used by the API.
+"""
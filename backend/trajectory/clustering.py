@@ -0,0 +1,235 @@
+"""
+Conformational clustering of cached low-dimensional projections.
+
+Projections are read in chunks (memory-mapped), so memory stays bounded by the
+chunk size and the number of clusters or grid cells, not the number of frames.
+'kmeans' fits a MiniBatchKMeans with partial_fit over the chunks; 'density'
+histograms frames on a grid over up to three components and assigns every
+occupied cell to the peak of the (Gaussian-smoothed) density reached by
+steepest ascent, so each basin of the landscape becomes one state.
+Representatives are the frames nearest to each cluster centre (the centroid or
+the peak cell).
+"""
+
+import itertools
+
+import numpy as np
+
+try:
+    from sklearn.cluster import MiniBatchKMeans
+    SKLEARN_INSTALLED = True
+except ImportError:
+    SKLEARN_INSTALLED = False
+
+try:
+    from scipy.ndimage import gaussian_filter
+    SCIPY_INSTALLED = True
+except ImportError:
+    SCIPY_INSTALLED = False
+
+from structure.ingest import load_universe
+
+from .frames import select_atoms
+
+CLUSTER_METHODS = ("kmeans", "density")
+DEFAULT_CHUNK_SIZE = 65536
+DEFAULT_N_CLUSTERS = 5
+DEFAULT_DENSITY_BINS = 50
+# Factor on Scott's-rule bandwidth of the Gaussian smoothing the density before the ascent
+DEFAULT_DENSITY_SMOOTHING = 1.0
+MAX_DENSITY_DIMENSIONS = 3
+
+
+def _chunks(n, chunk_size):
+    for start in range(0, n, chunk_size):
+        yield start, min(start + chunk_size, n)
+
+
+class _ColumnView:
+    """Row-sliceable view of selected columns of a 2D array."""
+
+    def __init__(self, array, columns):
+        self.array = array
+        self.columns = columns
+        self.shape = (len(array), len(columns))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, rows):
+        return np.asarray(self.array[rows])[:, self.columns]
+
+
+def _nearest_frames(data, labels_of, centers, chunk_size):
+    """Row of `data` nearest to each centre among the rows assigned to it (-1 if none)."""
+    best = np.full(len(centers), np.inf)
+    rows = np.full(len(centers), -1, dtype=np.int64)
+    for start, stop in _chunks(len(data), chunk_size):
+        chunk = np.asarray(data[start:stop], dtype=np.float64)
+        labels = labels_of(start, stop)
+        assigned = labels >= 0
+        distances = np.full(len(chunk), np.inf)
+        distances[assigned] = np.sum((chunk[assigned] - centers[labels[assigned]]) ** 2, axis=1)
+        for label in np.unique(labels[assigned]):
+            members = np.flatnonzero(labels == label)
+            k = members[np.argmin(distances[members])]
+            if distances[k] < best[label]:
+                best[label], rows[label] = distances[k], start + k
+    return rows
+
+
+def kmeans_clusters(data, n_clusters=DEFAULT_N_CLUSTERS, chunk_size=DEFAULT_CHUNK_SIZE, n_epochs=3,
+                    random_state=0):
+    """
+    Mini-batch k-means over the rows of `data`, fitted chunk by chunk.
+    Returns (labels, centers).
+    """
+    if not SKLEARN_INSTALLED:
+        raise RuntimeError("scikit-learn is required for k-means clustering")
+    n = len(data)
+    if n < n_clusters:
+        raise ValueError(f"Cannot form {n_clusters} clusters from {n} frames")
+    # Every partial_fit call needs at least n_clusters rows
+    chunk_size = max(chunk_size, n_clusters)
+    model = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, batch_size=min(chunk_size, 4096),
+                            n_init=3)
+    rng = np.random.default_rng(random_state)
+    for _ in range(n_epochs):
+        starts = [start for start, _ in _chunks(n, chunk_size)]
+        for start in rng.permutation(starts):
+            stop = min(start + chunk_size, n)
+            # A short trailing chunk is extended backwards to n_clusters rows
+            model.partial_fit(np.asarray(data[min(start, stop - n_clusters):stop], dtype=np.float64))
+    labels = np.empty(n, dtype=np.int32)
+    for start, stop in _chunks(n, chunk_size):
+        labels[start:stop] = model.predict(np.asarray(data[start:stop], dtype=np.float64))
+    return labels, model.cluster_centers_
+
+
+def _steepest_ascent(density):
+    """Index (flat) of the density peak reached from every grid cell by steepest ascent."""
+    shape = density.shape
+    padded = np.pad(density, 1, constant_values=-np.inf)
+    flat_index = np.pad(np.arange(density.size).reshape(shape), 1, constant_values=-1)
+    best_value = density.copy()
+    best_index = np.arange(density.size).reshape(shape)
+    for offset in itertools.product((-1, 0, 1), repeat=density.ndim):
+        if not any(offset):
+            continue
+        window = tuple(slice(1 + o, 1 + o + n) for o, n in zip(offset, shape))
+        higher = padded[window] > best_value
+        best_value = np.where(higher, padded[window], best_value)
+        best_index = np.where(higher, flat_index[window], best_index)
+    pointer = best_index.ravel()
+    # Pointer jumping until every cell points at a peak (a cell pointing at itself)
+    while True:
+        jumped = pointer[pointer]
+        if np.array_equal(jumped, pointer):
+            return pointer
+        pointer = jumped
+
+
+def density_clusters(data, bins=DEFAULT_DENSITY_BINS, min_population=0.01, chunk_size=DEFAULT_CHUNK_SIZE,
+                     smoothing=DEFAULT_DENSITY_SMOOTHING):
+    """
+    Grid-density clustering of the rows of `data` (one to three components).
+
+    Counts are smoothed with a Gaussian of `smoothing` times Scott's-rule
+    bandwidth (0 disables it), so sampling noise does not split basins into
+    many small peaks.
+
+    Basins whose population is below `min_population` (fraction of frames) are
+    labelled -1. Clusters are numbered by decreasing population. Returns
+    (labels, centers) with the centres of the peak cells.
+    """
+    n, n_dims = data.shape
+    if not 1 <= n_dims <= MAX_DENSITY_DIMENSIONS:
+        raise ValueError(f"Density clustering uses 1 to {MAX_DENSITY_DIMENSIONS} components")
+
+    lo = np.full(n_dims, np.inf)
+    hi = np.full(n_dims, -np.inf)
+    total = np.zeros(n_dims)
+    total_sq = np.zeros(n_dims)
+    for start, stop in _chunks(n, chunk_size):
+        chunk = np.asarray(data[start:stop], dtype=np.float64)
+        lo, hi = np.minimum(lo, chunk.min(axis=0)), np.maximum(hi, chunk.max(axis=0))
+        total += chunk.sum(axis=0)
+        total_sq += (chunk ** 2).sum(axis=0)
+    std = np.sqrt(np.maximum(total_sq / n - (total / n) ** 2, 0.0))
+    hi = np.where(hi > lo, hi, lo + 1.0)
+    width = (hi - lo) / bins
+
+    def cells_of(start, stop):
+        cells = np.floor((np.asarray(data[start:stop], dtype=np.float64) - lo) / width).astype(np.int64)
+        return np.ravel_multi_index(tuple(np.clip(cells, 0, bins - 1).T), (bins,) * n_dims)
+
+    counts = np.zeros(bins ** n_dims, dtype=np.int64)
+    for start, stop in _chunks(n, chunk_size):
+        counts += np.bincount(cells_of(start, stop), minlength=len(counts))
+
+    smoothed = counts.astype(np.float64)
+    if smoothing > 0 and SCIPY_INSTALLED:
+        sigma = smoothing * n ** (-1.0 / (n_dims + 4)) * std / width
+        smoothed = gaussian_filter(smoothed.reshape((bins,) * n_dims), sigma, mode="constant").ravel()
+    # Ranks of (density, index) break ties, so flat plateaus have a single peak;
+    # cells without density never attract ascent
+    rank = np.empty(len(counts))
+    rank[np.lexsort((np.arange(len(counts)), smoothed))] = np.arange(len(counts))
+    density = np.where(smoothed > 1e-9 * smoothed.max(), rank, -1.0).reshape((bins,) * n_dims)
+    peak_of = _steepest_ascent(density)
+    peaks, basin_of = np.unique(peak_of, return_inverse=True)
+    populations = np.bincount(basin_of, weights=counts, minlength=len(peaks))
+
+    order = np.argsort(-populations, kind="stable")
+    kept = order[populations[order] >= max(min_population * n, 1)]
+    label_of_basin = np.full(len(peaks), -1, dtype=np.int32)
+    label_of_basin[kept] = np.arange(len(kept), dtype=np.int32)
+    label_of_cell = label_of_basin[basin_of]
+
+    peak_cells = np.stack(np.unravel_index(peaks[kept], (bins,) * n_dims), axis=1)
+    centers = lo + (peak_cells + 0.5) * width
+    labels = np.empty(n, dtype=np.int32)
+    for start, stop in _chunks(n, chunk_size):
+        labels[start:stop] = label_of_cell[cells_of(start, stop)]
+    return labels, centers
+
+
+def cluster_projection(projection, components, method="kmeans", n_clusters=DEFAULT_N_CLUSTERS,
+                       bins=DEFAULT_DENSITY_BINS, min_population=0.01, chunk_size=DEFAULT_CHUNK_SIZE,
+                       smoothing=DEFAULT_DENSITY_SMOOTHING):
+    """
+    Cluster the frames of a (possibly memory-mapped) projection on `components`.
+
+    Returns a dict with per-frame labels (-1: unassigned), cluster centres,
+    populations (fractions of frames) and representative rows of the projection.
+    """
+    if method not in CLUSTER_METHODS:
+        raise ValueError(f"method must be one of {', '.join(CLUSTER_METHODS)}")
+    components = list(components)
+    n_components = projection.shape[1]
+    if not components or any(not 0 <= c < n_components for c in components):
+        raise ValueError(f"Components must be between 0 and {n_components - 1}")
+
+    # Column selection on a memory map copies one chunk at a time
+    data = _ColumnView(projection, components)
+    if method == "kmeans":
+        labels, centers = kmeans_clusters(data, n_clusters, chunk_size)
+    else:
+        labels, centers = density_clusters(data, bins, min_population, chunk_size, smoothing)
+
+    counts = np.bincount(labels[labels >= 0], minlength=len(centers))
+    representatives = _nearest_frames(data, lambda start, stop: labels[start:stop], centers, chunk_size)
+    return {
+        "labels": labels,
+        "centers": centers,
+        "populations": counts / len(labels),
+        "representatives": representatives,
+        "unassigned": int(np.count_nonzero(labels < 0)),
+    }
+
+
+def write_frames_pdb(topology_path, trajectory_path, frames, path, selection="protein"):
+    """Write `frames` of a trajectory as models of one multi-model PDB file."""
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    atoms.write(path, frames=u.trajectory[np.asarray(frames, dtype=np.int64)], multiframe=True)
@@ -0,0 +1,190 @@
+"""
+Residue contact frequencies and difference contact maps.
+
+Contacts are found per frame with the cell-list neighbour search over CA atoms
+or all heavy atoms, collapsed to residue pairs and counted as integer pair
+codes, so a structure (one frame or several models) and a trajectory go through
+the same path and only contacting pairs are ever stored. Two systems are
+compared on the residue axis of the first after mapping the residues of the
+second onto it.
+"""
+
+import json
+
+import numpy as np
+
+from structure.ingest import load_universe
+
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, select_atoms, select_frames
+from .neighbors import neighbor_pairs
+
+DEFAULT_CONTACT_CUTOFF = 8.0
+RESIDUE_MAPPINGS = ("resid", "order")
+
+# Atoms representing each residue per contact mode, and the default cutoff (Angstrom)
+CONTACT_MODES = {"ca": "name CA", "heavy": "not (name H* or name [1-9]H*)"}
+DEFAULT_MODE_CUTOFFS = {"ca": DEFAULT_CONTACT_CUTOFF, "heavy": 4.5}
+
+
+def contact_selection(selection, mode="ca"):
+    """Atom selection for a contact mode: CA atoms or all heavy atoms of `selection`."""
+    if mode not in CONTACT_MODES:
+        raise ValueError(f"Contact mode must be one of {', '.join(CONTACT_MODES)}")
+    return f"({selection}) and {CONTACT_MODES[mode]}"
+
+
+def _residue_index(atoms):
+    """The unique residues of `atoms` and, per atom, its position in them."""
+    residues = atoms.residues
+    return residues, np.searchsorted(residues.resindices, atoms.resindices)
+
+
+def _residue_pair_codes(residue_of, n_residues, i, j):
+    ri, rj = residue_of[i], residue_of[j]
+    keep = ri != rj
+    ri, rj = ri[keep], rj[keep]
+    return np.minimum(ri, rj) * n_residues + np.maximum(ri, rj), keep
+
+
+def residue_min_distances(atoms, positions, cutoff):
+    """
+    Minimum atom-atom distance of every residue pair closer than `cutoff`.
+
+    Atom pairs come from the cell-list search and are reduced to residue pairs by
+    sorting on (pair code, distance). Returns (residues, i, j, distance) with i < j.
+    """
+    residues, residue_of = _residue_index(atoms)
+    n_residues = len(residues)
+    i, j, distances = neighbor_pairs(positions, cutoff=cutoff, return_distances=True)
+    codes, keep = _residue_pair_codes(residue_of, n_residues, i, j)
+    distances = distances[keep]
+    order = np.lexsort((distances, codes))
+    codes, distances = codes[order], distances[order]
+    first = np.r_[True, codes[1:] != codes[:-1]] if len(codes) else np.zeros(0, dtype=bool)
+    codes = codes[first]
+    return residues, codes // n_residues, codes % n_residues, distances[first]
+
+
+def _merge_counts(codes, counts, new_codes):
+    """Add one count for each code in `new_codes` to the sparse (codes, counts) tally."""
+    merged, inverse = np.unique(np.concatenate([codes, new_codes]), return_inverse=True)
+    weights = np.concatenate([counts, np.ones(len(new_codes), dtype=np.int64)])
+    return merged, np.bincount(inverse, weights=weights, minlength=len(merged)).astype(np.int64)
+
+
+def contact_frequencies(atoms, frames, cutoff=DEFAULT_CONTACT_CUTOFF, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Fraction of `frames` in which each residue pair of `atoms` has an atom pair
+    closer than `cutoff`.
+
+    Returns (residues, i, j, frequency) with i < j indexing `residues`, for pairs
+    in contact in at least one frame.
+    """
+    residues, residue_of = _residue_index(atoms)
+    n_residues = len(residues)
+
+    codes = np.zeros(0, dtype=np.int64)
+    counts = np.zeros(0, dtype=np.int64)
+    for _, _, positions in iter_position_blocks(atoms, frames, block_size):
+        block_codes = []
+        for frame_positions in positions:
+            i, j = neighbor_pairs(frame_positions, cutoff=cutoff)
+            # Each residue pair counts once per frame
+            block_codes.append(np.unique(_residue_pair_codes(residue_of, n_residues, i, j)[0]))
+        codes, counts = _merge_counts(codes, counts, np.concatenate(block_codes))
+
+    return residues, codes // n_residues, codes % n_residues, counts / len(frames)
+
+
+def residue_labels(residues):
+    """'segid:resid' labels for a residue group."""
+    return np.array([f"{segid}:{resid}" for segid, resid in zip(residues.segids, residues.resids)])
+
+
+def map_residues(residues_a, residues_b, mapping="resid"):
+    """
+    Index of each residue of `residues_b` on the axis of `residues_a` (-1 if unmapped).
+
+    `mapping` is 'resid' (same segment and residue number), 'order' (position in
+    the selection) or a JSON object of 'segid:resid' labels (second -> first);
+    labels may omit the segment ('resid' alone).
+    """
+    labels_a = residue_labels(residues_a)
+    index_a = {label: k for k, label in enumerate(labels_a)}
+    if mapping == "order":
+        n = min(len(residues_a), len(residues_b))
+        return np.r_[np.arange(n), np.full(len(residues_b) - n, -1)].astype(np.int64)
+    if mapping == "resid":
+        return np.array([index_a.get(label, -1) for label in residue_labels(residues_b)], dtype=np.int64)
+
+    try:
+        pairs = json.loads(mapping)
+    except ValueError:
+        raise ValueError(f"mapping must be one of {', '.join(RESIDUE_MAPPINGS)} or a JSON object of residue labels")
+    if not isinstance(pairs, dict):
+        raise ValueError("A custom residue mapping must be a JSON object of 'segid:resid' labels")
+
+    # Bare residue numbers match when they are unique in their structure
+    def lookup(labels, resids):
+        table = dict(zip(labels, range(len(labels))))
+        numbers, counts = np.unique(resids, return_counts=True)
+        unique = set(numbers[counts == 1].tolist())
+        table.update({str(resid): k for k, resid in enumerate(resids) if resid in unique})
+        return table
+
+    table_a = lookup(labels_a, residues_a.resids)
+    table_b = lookup(residue_labels(residues_b), residues_b.resids)
+    result = np.full(len(residues_b), -1, dtype=np.int64)
+    for label_b, label_a in pairs.items():
+        if str(label_b) in table_b and str(label_a) in table_a:
+            result[table_b[str(label_b)]] = table_a[str(label_a)]
+    return result
+
+
+def system_contacts(topology_path, trajectory_path=None, selection="protein", mode="ca",
+                    cutoff=DEFAULT_CONTACT_CUTOFF, start=None, stop=None, stride=1,
+                    time_start=None, time_stop=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Contact frequencies of one structure (all its models) or trajectory, with
+    residues in contact when their CA atoms ('ca') or any heavy atoms ('heavy')
+    are closer than `cutoff`. Returns (residues, i, j, frequency, n_frames).
+    """
+    u = load_universe(topology_path, trajectory_path) if trajectory_path else load_universe(topology_path)
+    atoms = select_atoms(u, contact_selection(selection, mode))
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+    residues, i, j, frequency = contact_frequencies(atoms, frames, cutoff, block_size)
+    return residues, i, j, frequency, len(frames)
+
+
+def contact_difference(first, second, mapping="resid"):
+    """
+    Sparse frequency difference (second - first) on the residue axis of `first`.
+
+    `first` and `second` are (residues, i, j, frequency) tuples. Returns a dict
+    with the pair indices, both frequencies, their difference and the number of
+    residues of `second` that could not be mapped.
+    """
+    residues_a, ia, ja, freq_a = first
+    residues_b, ib, jb, freq_b = second
+    n = len(residues_a)
+    to_a = map_residues(residues_a, residues_b, mapping)
+
+    ib, jb = to_a[ib], to_a[jb]
+    mapped = (ib >= 0) & (jb >= 0) & (ib != jb)
+    codes_b = np.minimum(ib, jb)[mapped] * n + np.maximum(ib, jb)[mapped]
+    codes_a = ia * n + ja
+
+    codes, inverse = np.unique(np.concatenate([codes_a, codes_b]), return_inverse=True)
+    values_a = np.zeros(len(codes))
+    values_b = np.zeros(len(codes))
+    np.add.at(values_a, inverse[:len(codes_a)], freq_a)
+    # Several residues of `second` may map onto one residue of `first`; keep the largest frequency
+    np.maximum.at(values_b, inverse[len(codes_a):], freq_b[mapped])
+    return {
+        "i": codes // n,
+        "j": codes % n,
+        "first": values_a,
+        "second": values_b,
+        "delta": values_b - values_a,
+        "unmapped": int(np.count_nonzero(to_a < 0)),
+    }
@@ -0,0 +1,142 @@
+"""
+Memory-mapped float32 coordinate store.
+
+A stored trajectory can be converted once, for an atom selection, into a
+float32 (frames, atoms, 3) array on local disk, written block by block. Block
+readers then find the converted array automatically and serve blocks as views
+of a memory map through the page cache instead of decompressing the trajectory
+again. Converted coordinates depend only on the trajectory and the atom indices,
+so any topology selecting a subset of the converted atoms can use them.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .store import coordinate_dir
+
+POSITIONS_FILE = "positions.npy"
+TIMES_FILE = "times.npy"
+ATOMS_FILE = "atoms.npy"
+
+
+def _selection_key(indices):
+    return hashlib.blake2b(np.asarray(indices, dtype=np.int64).tobytes(), digest_size=16).hexdigest()
+
+
+def _trajectory_path(atomgroup):
+    return getattr(atomgroup.universe.trajectory, "filename", None)
+
+
+def convert_coordinates(atomgroup, block_size):
+    """
+    Decode every frame of the atomgroup's (stored) trajectory into the coordinate
+    store, unless an entry for these atoms exists already.
+
+    Returns a dict with the entry key, its shape, size on disk and whether it was
+    created by this call.
+    """
+    trajectory_path = _trajectory_path(atomgroup)
+    root = coordinate_dir(trajectory_path) if trajectory_path else None
+    if root is None:
+        raise ValueError("Only trajectories from the trajectory store can be converted.")
+
+    key = _selection_key(atomgroup.indices)
+    entry = os.path.join(root, key)
+    created = False
+    if not os.path.isdir(entry):
+        os.makedirs(root, exist_ok=True)
+        work_dir = tempfile.mkdtemp(dir=root, prefix=".convert-")
+        try:
+            trajectory = atomgroup.universe.trajectory
+            n_frames = len(trajectory)
+            positions = np.lib.format.open_memmap(os.path.join(work_dir, POSITIONS_FILE), mode="w+",
+                                                  dtype=np.float32, shape=(n_frames, len(atomgroup), 3))
+            times = np.empty(n_frames, dtype=np.float64)
+            for start in range(0, n_frames, block_size):
+                for ts in trajectory[start:start + block_size]:
+                    positions[ts.frame] = atomgroup.positions
+                    times[ts.frame] = ts.time
+                positions.flush()
+            del positions
+            np.save(os.path.join(work_dir, TIMES_FILE), times)
+            np.save(os.path.join(work_dir, ATOMS_FILE), atomgroup.indices.astype(np.int64))
+            try:
+                os.rename(work_dir, entry)
+                created = True
+            except OSError:
+                # Converted concurrently by another request
+                pass
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    positions = np.load(os.path.join(entry, POSITIONS_FILE), mmap_mode="r")
+    return {
+        "key": key,
+        "n_frames": positions.shape[0],
+        "n_atoms": positions.shape[1],
+        "size_bytes": sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry)),
+        "created": created,
+    }
+
+
+def find_coordinates(atomgroup):
+    """
+    Converted coordinates covering `atomgroup`, as (positions, times, atom_index)
+    where `atom_index` selects the group's columns (a slice when contiguous), or
+    None when the trajectory has not been converted for these atoms.
+
+    The smallest matching entry wins. `positions` is a copy-on-write memory map,
+    so callers may modify blocks in place without touching the file.
+    """
+    trajectory_path = _trajectory_path(atomgroup)
+    root = coordinate_dir(trajectory_path) if trajectory_path else None
+    if root is None or not os.path.isdir(root):
+        return None
+
+    n_frames = len(atomgroup.universe.trajectory)
+    indices = atomgroup.indices
+    candidates = []
+    for name in os.listdir(root):
+        entry = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isdir(entry):
+            continue
+        try:
+            atoms = np.load(os.path.join(entry, ATOMS_FILE))
+        except (OSError, ValueError):
+            continue
+        local = np.searchsorted(atoms, indices)
+        if np.any(local >= len(atoms)) or np.any(atoms[np.minimum(local, len(atoms) - 1)] != indices):
+            continue
+        candidates.append((len(atoms), entry, local))
+    for _, entry, local in sorted(candidates, key=lambda c: c[0]):
+        positions = np.load(os.path.join(entry, POSITIONS_FILE), mmap_mode="c")
+        if positions.shape[0] != n_frames:
+            continue
+        if len(local) and np.all(np.diff(local) == 1):
+            local = slice(int(local[0]), int(local[-1]) + 1)
+        return positions, np.load(os.path.join(entry, TIMES_FILE)), local
+    return None
+
+
+def stored_position_blocks(stored, frames, block_size):
+    """
+    Yield (frame_indices, times, positions) blocks from converted coordinates.
+
+    Runs of consecutive frames of the full atom set are zero-copy views of the
+    memory map; other frame or atom subsets are gathered into new arrays.
+    """
+    positions, times, atom_index = stored
+    full = isinstance(atom_index, slice) and atom_index == slice(0, positions.shape[1])
+    for start in range(0, len(frames), block_size):
+        block_frames = frames[start:start + block_size]
+        if np.all(np.diff(block_frames) == 1):
+            rows = positions[int(block_frames[0]):int(block_frames[-1]) + 1]
+        else:
+            rows = positions[block_frames]
+        if not full:
+            rows = rows[:, atom_index]
+        yield block_frames, times[block_frames], np.asarray(rows)
@@ -0,0 +1,100 @@
+"""
+Low-rank dynamic cross-correlation.
+
+The covariance of the atom fluctuations is approximated by its top-k principal
+modes from an incremental PCA. Per-atom covariance factors A (atoms x 3k, so
+that cov = A A^T) are turned into unit-norm row factors F with F F^T equal to
+the DCCM (the correlation of the covariance rows, as in the dense endpoint), so
+any block of the matrix is one (rows x 3k) @ (3k x cols) product and memory stays
+O(atoms * k). Factors are saved under the cache directory and addressed by id.
+"""
+
+import os
+import uuid
+
+import numpy as np
+
+from .store import CACHE_DIR
+
+DCCM_DIR = os.path.join(CACHE_DIR, "dccm")
+DEFAULT_DCCM_MODES = 20
+MAX_STORED_DCCM = 32
+
+# Memory for the frames buffered between incremental PCA fits (as float64)
+DCCM_BATCH_BYTES = 256 << 20
+
+# Residues per axis in the plotted preview of a low-rank DCCM
+DCCM_PREVIEW_SIZE = 1000
+
+# Largest block (in matrix elements) reconstructed per request
+MAX_BLOCK_ELEMENTS = 1 << 22
+
+
+def covariance_factors(components, variances, n_atoms):
+    """
+    Per-atom factors A with A A^T the atom-atom covariance (summed over x, y, z)
+    of the modes `components` (k x 3N) with variances `variances` (k).
+    """
+    scaled = components.T * np.sqrt(np.clip(variances, 0.0, None))
+    return scaled.reshape(n_atoms, 3 * len(variances))
+
+
+def correlation_factors(factors):
+    """
+    Unit-norm row factors F with F F^T = np.corrcoef(A A^T).
+
+    The centred rows of A A^T are A_i B with B = A^T (I - 11^T/N), so their
+    covariance is A G A^T with G = B B^T, and F is A G^(1/2) with rows normalised.
+    """
+    factors = np.asarray(factors, dtype=np.float64)
+    mean = factors.mean(axis=0)
+    gram = factors.T @ factors - len(factors) * np.outer(mean, mean)
+    values, vectors = np.linalg.eigh(gram)
+    root = (vectors * np.sqrt(np.clip(values, 0.0, None))) @ vectors.T
+    rows = factors @ root
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    return rows / np.where(norms > 0, norms, 1.0)
+
+
+def _dccm_path(dccm_id):
+    if not dccm_id or not all(c in "0123456789abcdef" for c in dccm_id):
+        raise ValueError("Invalid DCCM id")
+    return os.path.join(DCCM_DIR, f"{dccm_id}.npz")
+
+
+def save_lowrank_dccm(factors, **arrays):
+    """Store correlation factors (float32) plus residue metadata; returns the new id."""
+    os.makedirs(DCCM_DIR, exist_ok=True)
+    entries = sorted((os.path.getmtime(os.path.join(DCCM_DIR, name)), name)
+                     for name in os.listdir(DCCM_DIR) if name.endswith(".npz"))
+    for _, name in entries[:max(0, len(entries) - MAX_STORED_DCCM + 1)]:
+        os.unlink(os.path.join(DCCM_DIR, name))
+
+    dccm_id = uuid.uuid4().hex
+    np.savez(_dccm_path(dccm_id), factors=factors.astype(np.float32), **arrays)
+    return dccm_id
+
+
+def load_lowrank_dccm(dccm_id):
+    """Arrays stored for a low-rank DCCM by `save_lowrank_dccm`."""
+    path = _dccm_path(dccm_id)
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown DCCM id '{dccm_id}'")
+    with np.load(path) as stored:
+        return {name: stored[name] for name in stored.files}
+
+
+def correlation_block(factors, row_start=0, row_stop=None, col_start=0, col_stop=None, stride=1):
+    """
+    Reconstruct DCCM rows [row_start:row_stop:stride] x columns [col_start:col_stop:stride].
+    Raises ValueError for empty or oversized blocks.
+    """
+    stride = max(1, stride)
+    rows = factors[row_start:row_stop:stride].astype(np.float64)
+    cols = factors[col_start:col_stop:stride].astype(np.float64)
+    if len(rows) == 0 or len(cols) == 0:
+        raise ValueError("Requested DCCM block is empty.")
+    if len(rows) * len(cols) > MAX_BLOCK_ELEMENTS:
+        raise ValueError(f"Requested block has {len(rows) * len(cols)} elements; "
+                         f"the limit is {MAX_BLOCK_ELEMENTS}. Use a smaller range or a larger stride.")
+    return np.clip(rows @ cols.T, -1.0, 1.0)
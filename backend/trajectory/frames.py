@@ -0,0 +1,105 @@
+"""
+Block-wise coordinate reading.
+
+Frames are decoded into a reusable (block, n_atoms, 3) float32 buffer so that
+analyses can work on whole blocks at once without per-frame allocations. When
+the trajectory has been converted into the coordinate store for a superset of
+the atoms, blocks are read from its memory map instead.
+"""
+
+import numpy as np
+
+from resources import budget_workers, process_pool
+from structure.cache import resolve_selection
+
+from .coordinates import find_coordinates, stored_position_blocks
+
+DEFAULT_BLOCK_SIZE = 256
+
+
+def select_atoms(universe, selection):
+    """Select atoms (through the selection cache), raising ValueError for an empty selection."""
+    atoms = resolve_selection(universe, selection)
+    if len(atoms) == 0:
+        raise ValueError(f"Selection '{selection}' did not match any atoms.")
+    return atoms
+
+
+def select_frames(trajectory, start=None, stop=None, stride=1, time_start=None, time_stop=None):
+    """
+    Frame indices for a frame range (start/stop/stride, slice semantics) and an
+    optional time window in ps, computed from the frame count and time step only.
+
+    No frames are decoded, so only the selected frames are read later (by seeking
+    through the trajectory's offset index). Raises ValueError if nothing is selected.
+    """
+    frames = np.arange(len(trajectory))[start:stop]
+    if time_start is not None or time_stop is not None:
+        ts = trajectory.ts
+        time_zero = ts.time - ts.frame * trajectory.dt
+        times = time_zero + frames * trajectory.dt
+        # Tolerance for times stored in single precision
+        tolerance = 1e-6 * max(abs(trajectory.dt), 1.0)
+        keep = np.ones(len(frames), dtype=bool)
+        if time_start is not None:
+            keep &= times >= time_start - tolerance
+        if time_stop is not None:
+            keep &= times <= time_stop + tolerance
+        frames = frames[keep]
+    frames = frames[::max(1, stride)]
+    if len(frames) == 0:
+        raise ValueError("No frames in the requested frame range or time window.")
+    return frames
+
+
+def split_frames(frames, n_parts):
+    """Split an array of frame indices into at most `n_parts` contiguous parts."""
+    frames = np.asarray(frames, dtype=np.int64)
+    n_parts = max(1, min(n_parts, len(frames)))
+    return [part for part in np.array_split(frames, n_parts) if len(part)]
+
+
+def map_frame_parts(worker, frames, n_workers, *args):
+    """
+    Run worker(part, *args) over contiguous parts of `frames` and concatenate results.
+
+    The worker returns a tuple of arrays for its part. Parts run in separate worker
+    processes when n_workers > 1 (capped by the job's thread budget), each opening
+    its own copy of the trajectory.
+    """
+    parts = split_frames(frames, budget_workers(n_workers))
+    if len(parts) <= 1:
+        results = [worker(np.asarray(frames, dtype=np.int64), *args)]
+    else:
+        with process_pool(len(parts)) as executor:
+            results = list(executor.map(worker, parts, *[[arg] * len(parts) for arg in args]))
+    return tuple(np.concatenate(column) for column in zip(*results))
+
+
+def iter_position_blocks(atomgroup, frames=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Yield (frame_indices, times, positions) for consecutive blocks of frames.
+
+    `frames` is an array of frame indices (default: every frame). `positions` is a
+    view into a buffer that is reused for the next block (or into the coordinate
+    store's memory map), so callers must copy anything they want to keep.
+    """
+    trajectory = atomgroup.universe.trajectory
+    if frames is None:
+        frames = np.arange(len(trajectory))
+    frames = np.asarray(frames, dtype=np.int64)
+
+    stored = find_coordinates(atomgroup)
+    if stored is not None:
+        yield from stored_position_blocks(stored, frames, block_size)
+        return
+
+    buffer = np.empty((min(block_size, max(len(frames), 1)), len(atomgroup), 3), dtype=np.float32)
+    times = np.empty(len(buffer), dtype=np.float64)
+    for start in range(0, len(frames), block_size):
+        block_frames = frames[start:start + block_size]
+        for k, ts in enumerate(trajectory[block_frames]):
+            buffer[k] = atomgroup.positions
+            times[k] = ts.time
+        n = len(block_frames)
+        yield block_frames, times[:n], buffer[:n]
@@ -0,0 +1,68 @@
+"""
+Batched radius of gyration.
+
+Frames are read in blocks into a reusable float32 buffer and the mass-weighted
+radius of gyration (total and about each axis) is computed for the whole block in
+one vectorised operation.
+"""
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+from structure.ingest import load_universe
+
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, map_frame_parts, select_atoms, select_frames
+
+
+def gyration_block(positions, weights):
+    """
+    Radius of gyration for a block of frames (n_frames, n_atoms, 3).
+
+    `weights` are normalised masses. Returns (rg, rg_axes) where rg_axes holds the
+    radius about the x, y and z axes (GROMACS gmx gyrate convention). The block is
+    centred in place.
+    """
+    positions -= np.einsum('bni,n->bi', positions, weights)[:, None, :].astype(positions.dtype)
+    # Mass-weighted mean square extent along each Cartesian component
+    components = np.einsum('bni,bni,n->bi', positions, positions, weights)
+    rg = np.sqrt(components.sum(axis=1))
+    rg_axes = np.sqrt(components.sum(axis=1, keepdims=True) - components)
+    return rg, rg_axes
+
+
+def gyration_frames(frames, topology_path, trajectory_path, selection, block_size=DEFAULT_BLOCK_SIZE):
+    """Compute (times, rg, rg_axes) for the given frame indices; used directly and by workers."""
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    weights = atoms.masses.astype(np.float64)
+    weights /= weights.sum()
+
+    times = np.empty(len(frames), dtype=np.float64)
+    rg = np.empty(len(frames), dtype=np.float64)
+    rg_axes = np.empty((len(frames), 3), dtype=np.float64)
+    offset = 0
+    for block_frames, block_times, positions in iter_position_blocks(atoms, frames, block_size):
+        n = len(block_frames)
+        times[offset:offset + n] = block_times
+        rg[offset:offset + n], rg_axes[offset:offset + n] = gyration_block(positions, weights)
+        offset += n
+    return times, rg, rg_axes
+
+
+def compute_gyration(topology_path, trajectory_path, selection="protein", start=None, stop=None, stride=1,
+                     time_start=None, time_stop=None, n_workers=1, block_size=DEFAULT_BLOCK_SIZE):
+    """Radius of gyration (Angstrom) per frame; returns (frames, times, rg, rg_axes)."""
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+
+    u = load_universe(topology_path, trajectory_path)
+    select_atoms(u, selection)
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+    times, rg, rg_axes = map_frame_parts(gyration_frames, frames, n_workers, topology_path,
+                                         trajectory_path, selection, block_size)
+    return frames, times, rg, rg_axes
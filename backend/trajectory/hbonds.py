@@ -0,0 +1,214 @@
+"""
+Hydrogen-bond analysis over trajectories.
+
+Donor-hydrogen pairs are assigned once from the topology coordinates. In each
+frame, hydrogen-acceptor candidates come from the cell-list search and the
+distance and D-H...A angle criteria are applied to all candidates at once.
+Per-pair occupancy and run (lifetime) statistics are accumulated block by block,
+and frame ranges can be split across worker processes and merged afterwards.
+"""
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+from structure.ingest import load_universe
+
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, map_frame_parts, select_atoms, select_frames
+from .neighbors import neighbor_pairs
+
+DEFAULT_DA_CUTOFF = 3.0
+DEFAULT_ANGLE_CUTOFF = 150.0
+DONOR_HYDROGEN_CUTOFF = 1.2
+
+
+def assign_hydrogen_bond_atoms(universe, selection="protein", hydrogens_selection="name H*",
+                               donor_heavy_selection="name N* O*", acceptors_selection="name O* N*"):
+    """
+    Return (donors, hydrogens, acceptors) as atom index arrays.
+
+    Each hydrogen within 1.2 Angstrom of a donor heavy atom in the topology
+    coordinates becomes a donor-hydrogen pair; donors[k] is the donor of hydrogens[k].
+    """
+    atoms = select_atoms(universe, selection)
+    hydrogens = atoms.select_atoms(hydrogens_selection)
+    heavy = atoms.select_atoms(donor_heavy_selection)
+    acceptors = atoms.select_atoms(acceptors_selection)
+    if len(hydrogens) == 0 or len(heavy) == 0 or len(acceptors) == 0:
+        raise ValueError("Selection contains no donor hydrogens or acceptors.")
+
+    h_local, d_local, distances = neighbor_pairs(hydrogens.positions, heavy.positions,
+                                                 DONOR_HYDROGEN_CUTOFF, return_distances=True)
+    # Keep the closest heavy atom for every hydrogen
+    order = np.lexsort((distances, h_local))
+    h_local, d_local = h_local[order], d_local[order]
+    first = np.r_[True, h_local[1:] != h_local[:-1]]
+    h_local, d_local = h_local[first], d_local[first]
+    if len(h_local) == 0:
+        raise ValueError("No donor-hydrogen pairs found in the topology.")
+    return heavy.indices[d_local], hydrogens.indices[h_local], acceptors.indices
+
+
+def hbonds_frame(positions, donors, hydrogens, acceptors, d_a_cutoff=DEFAULT_DA_CUTOFF,
+                 angle_cutoff=DEFAULT_ANGLE_CUTOFF):
+    """
+    Hydrogen bonds in one frame as (hydrogen, acceptor) positions in the given
+    index arrays. `positions` covers all atoms referenced by the index arrays.
+    """
+    h_pos = positions[hydrogens]
+    a_pos = positions[acceptors]
+    # H...A is never longer than D...A for a bond that passes the angle criterion
+    hi, ai = neighbor_pairs(h_pos, a_pos, cutoff=d_a_cutoff)
+    keep = donors[hi] != acceptors[ai]
+    hi, ai = hi[keep], ai[keep]
+
+    d_pos = positions[donors[hi]]
+    da = a_pos[ai] - d_pos
+    hd = d_pos - h_pos[hi]
+    ha = a_pos[ai] - h_pos[hi]
+    cos_angle = np.einsum('pi,pi->p', hd, ha) / (np.linalg.norm(hd, axis=1) * np.linalg.norm(ha, axis=1))
+    keep = (np.einsum('pi,pi->p', da, da) <= d_a_cutoff ** 2) & (cos_angle <= np.cos(np.radians(angle_cutoff)))
+    return hi[keep], ai[keep]
+
+
+def _add_counts(keys, counts, new_keys, new_counts):
+    merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    return merged, np.bincount(inverse, weights=np.concatenate([counts, new_counts]),
+                               minlength=len(merged)).astype(np.int64)
+
+
+class PairTracker:
+    """Per-pair frame counts and run counts over consecutive analysed frames."""
+
+    def __init__(self):
+        empty = np.zeros(0, dtype=np.int64)
+        self.keys, self.present = empty, empty
+        self.run_keys, self.runs = empty, empty
+        self.first_keys = None
+        self.previous = None
+
+    def update(self, frame_keys):
+        """Fold a list of per-frame sorted unique key arrays (consecutive frames)."""
+        if not frame_keys:
+            return
+        if self.first_keys is None:
+            self.first_keys = frame_keys[0]
+        starts = []
+        previous = self.previous
+        for keys in frame_keys:
+            starts.append(keys if previous is None else keys[~np.isin(keys, previous, assume_unique=True)])
+            previous = keys
+        self.previous = previous
+
+        keys, counts = np.unique(np.concatenate(frame_keys), return_counts=True)
+        self.keys, self.present = _add_counts(self.keys, self.present, keys, counts)
+        keys, counts = np.unique(np.concatenate(starts), return_counts=True)
+        self.run_keys, self.runs = _add_counts(self.run_keys, self.runs, keys, counts)
+
+    def table(self):
+        """Return (keys, frames present, runs, present in first frame, present in last frame)."""
+        runs = np.zeros(len(self.keys), dtype=np.int64)
+        runs[np.searchsorted(self.keys, self.run_keys)] = self.runs
+        empty = np.zeros(0, dtype=np.int64)
+        at_start = np.isin(self.keys, self.first_keys if self.first_keys is not None else empty)
+        at_end = np.isin(self.keys, self.previous if self.previous is not None else empty)
+        return self.keys, self.present, runs, at_start, at_end
+
+
+def hbond_frames(frames, topology_path, trajectory_path, donors, hydrogens, acceptors,
+                 d_a_cutoff=DEFAULT_DA_CUTOFF, angle_cutoff=DEFAULT_ANGLE_CUTOFF,
+                 block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Per-frame counts and pair statistics for the given frame indices; used directly
+    and by workers. Pair rows are tagged with the part's first frame for merging;
+    that frame is also returned on its own, so parts without any pair are known.
+    """
+    u = load_universe(topology_path, trajectory_path)
+    # Read only the atoms involved and remap indices into that subset
+    involved = np.unique(np.concatenate([donors, hydrogens, acceptors]))
+    atoms = u.atoms[involved]
+    local = lambda indices: np.searchsorted(involved, indices)
+    l_donors, l_hydrogens, l_acceptors = local(donors), local(hydrogens), local(acceptors)
+    n_acceptors = len(acceptors)
+
+    times = np.empty(len(frames), dtype=np.float64)
+    counts = np.empty(len(frames), dtype=np.int64)
+    tracker = PairTracker()
+    offset = 0
+    for block_frames, block_times, positions in iter_position_blocks(atoms, frames, block_size):
+        frame_keys = []
+        for k in range(len(block_frames)):
+            hi, ai = hbonds_frame(positions[k], l_donors, l_hydrogens, l_acceptors, d_a_cutoff, angle_cutoff)
+            frame_keys.append(np.unique(hi * n_acceptors + ai))
+            counts[offset + k] = len(frame_keys[-1])
+        tracker.update(frame_keys)
+        times[offset:offset + len(block_frames)] = block_times
+        offset += len(block_frames)
+
+    keys, present, runs, at_start, at_end = tracker.table()
+    first = frames[0] if len(frames) else 0
+    part = np.full(len(keys), first, dtype=np.int64)
+    return times, counts, keys, present, runs, at_start, at_end, part, np.array([first], dtype=np.int64)
+
+
+def merge_pair_parts(keys, present, runs, at_start, at_end, part, part_starts):
+    """
+    Merge per-part pair statistics, joining runs that continue across part boundaries.
+    `part_starts` holds the first frame of every part, so a part without any pair
+    still separates its neighbours.
+    """
+    if len(keys) == 0:
+        return keys, present, runs
+    part_rank = np.searchsorted(np.unique(part_starts), part)
+    order = np.lexsort((part_rank, keys))
+    keys, present, runs = keys[order], present[order], runs[order].copy()
+    at_start, at_end, part_rank = at_start[order], at_end[order], part_rank[order]
+
+    joined = ((keys[1:] == keys[:-1]) & (part_rank[1:] == part_rank[:-1] + 1)
+              & at_end[:-1] & at_start[1:])
+    runs[1:][joined] -= 1
+
+    merged, inverse = np.unique(keys, return_inverse=True)
+    return (merged,
+            np.bincount(inverse, weights=present, minlength=len(merged)).astype(np.int64),
+            np.bincount(inverse, weights=runs, minlength=len(merged)).astype(np.int64))
+
+
+def compute_hbonds(topology_path, trajectory_path, selection="protein", start=None, stop=None, stride=1,
+                   time_start=None, time_stop=None, d_a_cutoff=DEFAULT_DA_CUTOFF,
+                   angle_cutoff=DEFAULT_ANGLE_CUTOFF, n_workers=1, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Hydrogen-bond counts per frame plus per-pair occupancy and mean lifetime.
+
+    Returns a dict with frames, times, counts, the donor/hydrogen/acceptor index
+    arrays, and the pair table (hydrogen position, acceptor position, frames
+    present, number of runs).
+    """
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+
+    u = load_universe(topology_path, trajectory_path)
+    donors, hydrogens, acceptors = assign_hydrogen_bond_atoms(load_universe(topology_path), selection)
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+
+    times, counts, keys, present, runs, at_start, at_end, part, part_starts = map_frame_parts(
+        hbond_frames, frames, n_workers, topology_path, trajectory_path, donors, hydrogens, acceptors,
+        d_a_cutoff, angle_cutoff, block_size
+    )
+    keys, present, runs = merge_pair_parts(keys, present, runs, at_start, at_end, part, part_starts)
+    return {
+        "frames": frames,
+        "times": times,
+        "counts": counts,
+        "donors": donors,
+        "hydrogens": hydrogens,
+        "acceptors": acceptors,
+        "pair_hydrogen": keys // len(acceptors),
+        "pair_acceptor": keys % len(acceptors),
+        "pair_present": present,
+        "pair_runs": runs,
+    }
@@ -0,0 +1,72 @@
+"""
+Cell-list neighbour search.
+
+Points are binned into cubic cells of the cutoff size; candidate pairs come only
+from the 27 surrounding cells and are found with sorted cell keys and
+searchsorted, so the whole search is vectorised and scales linearly with the
+number of points at constant density. Periodic boundaries are not applied.
+"""
+
+import numpy as np
+
+# The 27 cell offsets of a 3x3x3 neighbourhood
+_OFFSETS = np.array([(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)], dtype=np.int64)
+
+
+def _cell_keys(cells, dims):
+    return (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+
+def neighbor_pairs(coords_a, coords_b=None, cutoff=8.0, return_distances=False):
+    """
+    Index pairs (i, j) with |a_i - b_j| < cutoff.
+
+    With `coords_b` omitted, pairs are searched within `coords_a` and each pair is
+    reported once with i < j. Returns (i, j) or (i, j, distances).
+    """
+    coords_a = np.asarray(coords_a, dtype=np.float64)
+    self_search = coords_b is None
+    coords_b = coords_a if self_search else np.asarray(coords_b, dtype=np.float64)
+    empty = np.zeros(0, dtype=np.int64)
+    if len(coords_a) == 0 or len(coords_b) == 0 or cutoff <= 0:
+        return (empty, empty, np.zeros(0)) if return_distances else (empty, empty)
+
+    origin = np.minimum(coords_a.min(axis=0), coords_b.min(axis=0))
+    cells_a = np.floor((coords_a - origin) / cutoff).astype(np.int64)
+    cells_b = np.floor((coords_b - origin) / cutoff).astype(np.int64)
+    dims = np.maximum(cells_a.max(axis=0), cells_b.max(axis=0)) + 1
+
+    order = np.argsort(_cell_keys(cells_b, dims), kind="stable")
+    sorted_keys = _cell_keys(cells_b, dims)[order]
+
+    pairs_i = []
+    pairs_j = []
+    for offset in _OFFSETS:
+        neighbours = cells_a + offset
+        inside = np.all((neighbours >= 0) & (neighbours < dims), axis=1)
+        a_index = np.nonzero(inside)[0]
+        keys = _cell_keys(neighbours[inside], dims)
+        lo = np.searchsorted(sorted_keys, keys, side="left")
+        hi = np.searchsorted(sorted_keys, keys, side="right")
+        counts = hi - lo
+        total = counts.sum()
+        if total == 0:
+            continue
+        # Expand every [lo, hi) range into explicit candidate indices
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        pairs_i.append(np.repeat(a_index, counts))
+        pairs_j.append(order[np.arange(total) + starts])
+
+    if not pairs_i:
+        return (empty, empty, np.zeros(0)) if return_distances else (empty, empty)
+
+    i = np.concatenate(pairs_i)
+    j = np.concatenate(pairs_j)
+    if self_search:
+        keep = i < j
+        i, j = i[keep], j[keep]
+    distances = np.linalg.norm(coords_a[i] - coords_b[j], axis=1)
+    keep = distances < cutoff
+    if return_distances:
+        return i[keep], j[keep], distances[keep]
+    return i[keep], j[keep]
@@ -0,0 +1,131 @@
+"""
+Shared-basis PCA over many trajectory replicas.
+
+Each replica is decoded in its own worker process into a float32 memory-mapped
+feature matrix (frames x 3N coordinates, optionally fitted onto the topology
+structure). A single IncrementalPCA is then fitted batch by batch across all
+replicas and every replica is projected onto the shared basis, so memory stays
+bounded by the batch size and decoding runs on all cores.
+"""
+
+import os
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+try:
+    from sklearn.decomposition import IncrementalPCA
+    SKLEARN_INSTALLED = True
+except ImportError:
+    SKLEARN_INSTALLED = False
+
+from resources import budget_workers, process_pool
+from structure.ingest import load_universe
+
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, select_atoms, select_frames
+from .superposition import superpose
+
+DEFAULT_PCA_BATCH = 2048
+
+
+def replica_features(feature_path, topology_path, trajectory_path, selection, reference=None,
+                     start=None, stop=None, stride=1, time_start=None, time_stop=None,
+                     block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Decode the selected frames of one replica into a float32 memmap at `feature_path`.
+
+    Frames are fitted onto `reference` when it is given. Returns (feature_path,
+    shape, frames, times); used directly and by workers.
+    """
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+
+    features = np.lib.format.open_memmap(feature_path, mode="w+", dtype=np.float32,
+                                         shape=(len(frames), 3 * len(atoms)))
+    times = np.empty(len(frames), dtype=np.float64)
+    offset = 0
+    for block_frames, block_times, positions in iter_position_blocks(atoms, frames, block_size):
+        n = len(block_frames)
+        if reference is not None:
+            positions = superpose(positions, reference)
+        features[offset:offset + n] = positions.reshape(n, -1)
+        times[offset:offset + n] = block_times
+        offset += n
+    features.flush()
+    del features
+    return feature_path, (len(frames), 3 * len(atoms)), frames, times
+
+
+def _replica_batches(features, batch_size):
+    """Yield row batches of at least `batch_size` rows spanning replica boundaries."""
+    total = sum(len(f) for f in features)
+    n_batches = max(1, total // batch_size)
+    bounds = np.linspace(0, total, n_batches + 1).astype(np.int64)
+    starts = np.cumsum([0] + [len(f) for f in features])
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        parts = []
+        for k, f in enumerate(features):
+            a, b = max(lo, starts[k]), min(hi, starts[k + 1])
+            if a < b:
+                parts.append(np.asarray(f[a - starts[k]:b - starts[k]], dtype=np.float64))
+        yield np.concatenate(parts)
+
+
+def replica_pca(topology_path, trajectory_paths, work_dir, selection="backbone", n_components=10,
+                align=True, start=None, stop=None, stride=1, time_start=None, time_stop=None,
+                n_workers=1, batch_size=DEFAULT_PCA_BATCH, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Fit one PCA across all replicas and project each replica onto it.
+
+    Feature memmaps are written to `work_dir`. Returns a dict with the explained
+    variance ratios and, per replica, the analysed frames, times and projections.
+    """
+    if not MDAnalysis_INSTALLED or not SKLEARN_INSTALLED:
+        raise RuntimeError("Required libraries not installed. Please install MDAnalysis and scikit-learn.")
+    if not trajectory_paths:
+        raise ValueError("No trajectories provided")
+
+    reference = None
+    if align:
+        reference = select_atoms(load_universe(topology_path), selection).positions.astype(np.float64)
+
+    feature_paths = [os.path.join(work_dir, f"replica_{k}.npy") for k in range(len(trajectory_paths))]
+    args = [(path, topology_path, trajectory_path, selection, reference, start, stop, stride,
+             time_start, time_stop, block_size)
+            for path, trajectory_path in zip(feature_paths, trajectory_paths)]
+    n_workers = min(budget_workers(n_workers), len(args))
+    if n_workers > 1:
+        with process_pool(n_workers) as executor:
+            decoded = list(executor.map(replica_features, *zip(*args)))
+    else:
+        decoded = [replica_features(*a) for a in args]
+
+    features = [np.load(path, mmap_mode="r") for path, _, _, _ in decoded]
+    widths = {f.shape[1] for f in features}
+    if len(widths) != 1:
+        raise ValueError("Replicas do not share the same atom selection size.")
+
+    total = sum(len(f) for f in features)
+    n_components = max(1, min(n_components, total, widths.pop()))
+    pca = IncrementalPCA(n_components=n_components)
+    for batch in _replica_batches(features, max(batch_size, n_components)):
+        pca.partial_fit(batch)
+
+    replicas = []
+    for f, (_, _, frames, times) in zip(features, decoded):
+        projection = np.empty((len(f), n_components), dtype=np.float64)
+        for lo in range(0, len(f), batch_size):
+            projection[lo:lo + batch_size] = pca.transform(np.asarray(f[lo:lo + batch_size], dtype=np.float64))
+        replicas.append({"frames": frames, "times": times, "projection": projection})
+
+    return {
+        "explained_variance": pca.explained_variance_ratio_,
+        "n_atoms": features[0].shape[1] // 3,
+        "replicas": replicas,
+    }
@@ -0,0 +1,295 @@
+"""
+Single-pass multi-analysis trajectory pipeline.
+
+Analyzers are registered by name and declare the atoms they need. The pipeline
+reads the union of those atoms once per block of frames and hands each analyzer
+a copy of its own atoms' positions, so every frame is decoded exactly once
+however many analyses run. Analyzers keep streaming state and produce their
+result at the end.
+"""
+
+from functools import reduce
+
+import numpy as np
+
+try:
+    from sklearn.decomposition import PCA, IncrementalPCA
+    SKLEARN_INSTALLED = True
+except ImportError:
+    SKLEARN_INSTALLED = False
+
+from structure.ingest import load_universe
+
+from .dccm import DCCM_BATCH_BYTES, DEFAULT_DCCM_MODES, correlation_factors, covariance_factors
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, select_atoms, select_frames
+from .gyration import gyration_block
+from .pca import DEFAULT_PCA_BATCH
+from .rmsf import WelfordAccumulator, residue_average
+from .superposition import apply_transforms, fit_transforms, superposed_rmsd
+
+ANALYZERS = {}
+
+
+def register_analyzer(name):
+    """Class decorator adding an analyzer to the registry under `name`."""
+    def register(cls):
+        cls.name = name
+        ANALYZERS[name] = cls
+        return cls
+    return register
+
+
+class Analyzer:
+    """
+    Base class for streaming analyzers.
+
+    Subclasses set `self.atoms` in __init__, fold blocks of positions of those
+    atoms in `update` and return a dict of arrays from `result`. Each analyzer
+    receives its own copy of the block.
+    """
+
+    name = None
+
+    def __init__(self, universe, reference):
+        self.atoms = None
+
+    def update(self, frames, times, positions):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class _TimeSeries(Analyzer):
+    """Analyzer that collects frame times along with its per-frame values."""
+
+    def __init__(self, universe, reference):
+        super().__init__(universe, reference)
+        self.times = []
+        self.values = []
+
+    def _collect(self, times, values):
+        self.times.append(np.array(times))
+        self.values.append(values)
+
+
+@register_analyzer("dccm")
+class DCCMAnalyzer(Analyzer):
+    """
+    Dynamic cross-correlation from streaming sums of positions and position
+    products; memory is O(atoms^2) regardless of the number of frames.
+    """
+
+    def __init__(self, universe, reference, selection="name CA"):
+        super().__init__(universe, reference)
+        self.atoms = select_atoms(universe, selection)
+        n_atoms = len(self.atoms)
+        self.count = 0
+        self.shift = None
+        self.sums = np.zeros((n_atoms, 3), dtype=np.float64)
+        self.products = np.zeros((n_atoms, n_atoms), dtype=np.float64)
+
+    def update(self, frames, times, positions):
+        if self.shift is None:
+            # Sums are taken relative to the first frame to avoid cancellation
+            self.shift = positions[0].astype(np.float64)
+        block = positions - self.shift
+        self.count += len(block)
+        self.sums += block.sum(axis=0)
+        self.products += np.einsum('bik,bjk->ij', block, block)
+
+    def covariance(self):
+        """Sum over frames and components of the fluctuation products."""
+        mean = self.sums / max(self.count, 1)
+        return self.products - self.count * (mean @ mean.T)
+
+    def result(self):
+        return {"matrix": np.corrcoef(self.covariance()), "residue_count": len(self.atoms),
+                "n_frames": self.count}
+
+
+@register_analyzer("dccm_lowrank")
+class LowRankDCCMAnalyzer(Analyzer):
+    """
+    DCCM factors from the top `n_modes` covariance modes of an incremental PCA;
+    the dense matrix is never formed. Frames are buffered as float32 in batches
+    sized from `batch_bytes` and fitted as soon as a batch fills, so memory is
+    O(atoms * (n_modes + batch)) regardless of the number of frames.
+    """
+
+    def __init__(self, universe, reference, selection="name CA", n_modes=DEFAULT_DCCM_MODES,
+                 batch_size=DEFAULT_PCA_BATCH, batch_bytes=DCCM_BATCH_BYTES):
+        super().__init__(universe, reference)
+        if not SKLEARN_INSTALLED:
+            raise RuntimeError("scikit-learn not installed on the server")
+        self.atoms = select_atoms(universe, selection)
+        n_features = 3 * len(self.atoms)
+        self.n_modes = max(1, min(n_modes, n_features))
+        # Rows that fit the budget once converted to float64 for the fit; a batch
+        # holds at least twice the modes so the carried-over rows (below) leave
+        # a fit of at least n_modes rows
+        self.batch_size = max(min(batch_size, batch_bytes // (8 * n_features)), 2 * self.n_modes)
+        self.buffer = np.empty((self.batch_size, n_features), dtype=np.float32)
+        self.filled = 0
+        self.pca = None
+        self.count = 0
+
+    def _fit(self, batch):
+        if self.pca is None:
+            self.pca = IncrementalPCA(n_components=min(self.n_modes, len(batch)))
+        self.pca.partial_fit(batch.astype(np.float64))
+
+    def update(self, frames, times, positions):
+        rows = positions.reshape(len(positions), -1)
+        self.count += len(rows)
+        start = 0
+        while start < len(rows):
+            taken = min(len(rows) - start, self.batch_size - self.filled)
+            self.buffer[self.filled:self.filled + taken] = rows[start:start + taken]
+            self.filled += taken
+            start += taken
+            if self.filled == self.batch_size:
+                # The last n_modes rows are carried into the next batch, so the
+                # final fit never gets fewer rows than there are components
+                carried = self.n_modes
+                self._fit(self.buffer[:-carried])
+                self.buffer[:carried] = self.buffer[-carried:]
+                self.filled = carried
+
+    def result(self):
+        self._fit(self.buffer[:self.filled])
+        self.buffer = None
+        factors = covariance_factors(self.pca.components_, self.pca.explained_variance_, len(self.atoms))
+        return {"factors": correlation_factors(factors), "resids": self.atoms.resids,
+                "segids": self.atoms.segids, "residue_count": len(self.atoms), "n_modes": self.pca.n_components_, "n_frames": self.count,
+                "captured_variance": float(self.pca.explained_variance_ratio_.sum())}
+
+
+@register_analyzer("pca")
+class PCAAnalyzer(_TimeSeries):
+    """Principal components of the flattened coordinates of the selection."""
+
+    def __init__(self, universe, reference, selection="backbone", n_components=10):
+        super().__init__(universe, reference)
+        if not SKLEARN_INSTALLED:
+            raise RuntimeError("scikit-learn not installed on the server")
+        self.atoms = select_atoms(universe, selection)
+        self.n_components = n_components
+
+    def update(self, frames, times, positions):
+        self._collect(times, positions.reshape(len(positions), -1).copy())
+
+    def result(self):
+        features = np.concatenate(self.values).astype(np.float64)
+        features -= features.mean(axis=0)
+        pca = PCA(n_components=min(self.n_components, features.shape[0], features.shape[1]))
+        projection = pca.fit_transform(features)
+        return {"times": np.concatenate(self.times), "projection": projection,
+                "explained_variance": pca.explained_variance_ratio_, "n_atoms": len(self.atoms)}
+
+
+@register_analyzer("rmsd")
+class RMSDAnalyzer(_TimeSeries):
+    """RMSD against the topology structure after optimal superposition."""
+
+    def __init__(self, universe, reference, selection="backbone", mass_weighted=False):
+        super().__init__(universe, reference)
+        self.atoms = select_atoms(universe, selection)
+        self.reference = select_atoms(reference, selection).positions.astype(np.float64)
+        if len(self.reference) != len(self.atoms):
+            raise ValueError("Reference structure and trajectory selections differ in size.")
+        self.weights = self.atoms.masses if mass_weighted else None
+
+    def update(self, frames, times, positions):
+        self._collect(times, superposed_rmsd(positions, self.reference, self.weights))
+
+    def result(self):
+        return {"times": np.concatenate(self.times), "rmsd": np.concatenate(self.values)}
+
+
+@register_analyzer("rmsf")
+class RMSFAnalyzer(Analyzer):
+    """Per-atom and per-residue RMSF after fitting each frame onto the topology structure."""
+
+    def __init__(self, universe, reference, selection="protein", fit_selection="backbone"):
+        super().__init__(universe, reference)
+        self.selected = select_atoms(universe, selection)
+        fit_atoms = select_atoms(universe, fit_selection)
+        self.reference = select_atoms(reference, fit_selection).positions.astype(np.float64)
+        if len(self.reference) != len(fit_atoms):
+            raise ValueError("Reference structure and trajectory fit selections differ in size.")
+        self.atoms = self.selected | fit_atoms
+        self.atom_index = np.searchsorted(self.atoms.indices, self.selected.indices)
+        self.fit_index = np.searchsorted(self.atoms.indices, fit_atoms.indices)
+        self.accumulator = WelfordAccumulator((len(self.selected), 3))
+
+    def update(self, frames, times, positions):
+        transforms = fit_transforms(positions[:, self.fit_index], self.reference)
+        self.accumulator.update(apply_transforms(positions[:, self.atom_index], *transforms))
+
+    def result(self):
+        atom_rmsf = np.sqrt(self.accumulator.variance.sum(axis=1))
+        residues, residue_rmsf = residue_average(atom_rmsf, self.selected)
+        return {"atom_rmsf": atom_rmsf, "resids": residues.resids, "resnames": residues.resnames,
+                "segids": residues.segids, "residue_rmsf": residue_rmsf, "n_frames": self.accumulator.count}
+
+
+@register_analyzer("rog")
+class GyrationAnalyzer(_TimeSeries):
+    """Mass-weighted radius of gyration, total and about each axis."""
+
+    def __init__(self, universe, reference, selection="protein"):
+        super().__init__(universe, reference)
+        self.atoms = select_atoms(universe, selection)
+        self.weights = self.atoms.masses.astype(np.float64)
+        self.weights /= self.weights.sum()
+
+    def update(self, frames, times, positions):
+        # `positions` is this analyzer's own copy, so centring it in place is safe
+        self._collect(times, np.column_stack(gyration_block(positions, self.weights)))
+
+    def result(self):
+        values = np.concatenate(self.values)
+        return {"times": np.concatenate(self.times), "rg": values[:, 0], "rg_axes": values[:, 1:]}
+
+
+def jsonable(value):
+    """Convert nested analyzer results (arrays, NumPy scalars) to JSON-serialisable values."""
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def run_pipeline(topology_path, trajectory_path, analyses, start=None, stop=None, stride=1,
+                 time_start=None, time_stop=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Run several registered analyzers over one pass of the trajectory.
+
+    `analyses` is a list of (name, params) pairs. Returns {name: result} plus the
+    analysed frame indices under "frames".
+    """
+    unknown = [name for name, _ in analyses if name not in ANALYZERS]
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(unknown)}. Available: {', '.join(sorted(ANALYZERS))}")
+
+    u = load_universe(topology_path, trajectory_path)
+    reference = load_universe(topology_path)
+    analyzers = [ANALYZERS[name](u, reference, **(params or {})) for name, params in analyses]
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+
+    # Read the union of all analyzers' atoms once per frame
+    union = reduce(lambda a, b: a | b, [analyzer.atoms for analyzer in analyzers])
+    local = [np.searchsorted(union.indices, analyzer.atoms.indices) for analyzer in analyzers]
+    for block_frames, block_times, positions in iter_position_blocks(union, frames, block_size):
+        for analyzer, index in zip(analyzers, local):
+            analyzer.update(block_frames, block_times, positions[:, index])
+
+    results = {analyzer.name: analyzer.result() for analyzer in analyzers}
+    results["frames"] = frames
+    return results
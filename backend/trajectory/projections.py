@@ -0,0 +1,91 @@
+"""
+Cache of low-dimensional trajectory projections.
+
+Projections computed by the dimensionality-reduction endpoint are stored under
+the cache directory with the analysed frames and times, and addressed by a
+projection id, so follow-up analyses (free-energy landscapes, clustering) work
+on them without decoding the trajectory or refitting the model again. Arrays are
+.npy files that can be memory-mapped; a copy of the topology is kept so frames
+can be read back from the stored trajectory.
+"""
+
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from .store import CACHE_DIR
+
+PROJECTION_DIR = os.path.join(CACHE_DIR, "projections")
+MAX_STORED_PROJECTIONS = 64
+
+
+def projection_dir(projection_id):
+    """Directory of a cached projection; validates the id."""
+    if not projection_id or not all(c in "0123456789abcdef" for c in projection_id):
+        raise ValueError("Invalid projection id")
+    return os.path.join(PROJECTION_DIR, projection_id)
+
+
+def _prune_projections():
+    if not os.path.isdir(PROJECTION_DIR):
+        return
+    entries = sorted((os.path.getmtime(os.path.join(PROJECTION_DIR, name)), name)
+                     for name in os.listdir(PROJECTION_DIR))
+    for _, name in entries[:max(0, len(entries) - MAX_STORED_PROJECTIONS + 1)]:
+        shutil.rmtree(os.path.join(PROJECTION_DIR, name), ignore_errors=True)
+
+
+def save_projection(projection, frames, times, topology_path=None, trajectory_path=None, **meta):
+    """
+    Store a (frames x components) projection with its frame indices and times,
+    a copy of the topology and the stored trajectory path. `meta`
+    (JSON-serialisable) describes how it was computed. Returns the id.
+    """
+    _prune_projections()
+    projection_id = uuid.uuid4().hex
+    directory = projection_dir(projection_id)
+    os.makedirs(directory)
+    np.save(os.path.join(directory, "projection.npy"), np.asarray(projection, dtype=np.float64))
+    np.save(os.path.join(directory, "frames.npy"), np.asarray(frames, dtype=np.int64))
+    np.save(os.path.join(directory, "times.npy"), np.asarray(times, dtype=np.float64))
+    if topology_path is not None:
+        meta["topology"] = "topology" + os.path.splitext(topology_path)[1]
+        shutil.copyfile(topology_path, os.path.join(directory, meta["topology"]))
+    meta["trajectory"] = trajectory_path
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return projection_id
+
+
+def load_projection(projection_id, mmap=False):
+    """Return (projection, frames, times, meta) of a cached projection, optionally memory-mapped."""
+    directory = projection_dir(projection_id)
+    if not os.path.isdir(directory):
+        raise ValueError(f"Unknown projection id '{projection_id}'")
+    mmap_mode = "r" if mmap else None
+    projection, frames, times = (np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                                 for name in ("projection", "frames", "times"))
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    return projection, frames, times, meta
+
+
+def projection_sources(projection_id, meta):
+    """(topology, trajectory) paths a projection was computed from; raises ValueError if gone."""
+    topology = meta.get("topology")
+    trajectory = meta.get("trajectory")
+    if not topology or not trajectory or not os.path.exists(trajectory):
+        raise ValueError("The trajectory of this projection is no longer stored; rerun the projection")
+    return os.path.join(projection_dir(projection_id), topology), trajectory
+
+
+def projection_components(projection, comp1, comp2):
+    """Columns `comp1` and `comp2` of a projection, raising ValueError if out of range."""
+    n_components = projection.shape[1]
+    for comp in (comp1, comp2):
+        if not 0 <= comp < n_components:
+            raise ValueError(f"Component {comp} out of range (projection has {n_components} components)")
+    return projection[:, comp1], projection[:, comp2]
@@ -0,0 +1,66 @@
+"""
+RMSD time series of a trajectory against a reference structure.
+
+Frames are read in blocks and superposed on the reference with the batched Kabsch
+solver. The frame range can be split into contiguous parts that are processed by
+separate worker processes.
+"""
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+from structure.ingest import load_universe
+
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, map_frame_parts, select_atoms, select_frames
+from .superposition import superposed_rmsd
+
+
+def rmsd_frames(frames, topology_path, trajectory_path, selection, reference,
+                mass_weighted=False, block_size=DEFAULT_BLOCK_SIZE):
+    """Compute (times, rmsd) for the given frame indices; used directly and by workers."""
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    weights = atoms.masses if mass_weighted else None
+
+    times = np.empty(len(frames), dtype=np.float64)
+    values = np.empty(len(frames), dtype=np.float64)
+    offset = 0
+    for block_frames, block_times, positions in iter_position_blocks(atoms, frames, block_size):
+        n = len(block_frames)
+        times[offset:offset + n] = block_times
+        values[offset:offset + n] = superposed_rmsd(positions, reference, weights)
+        offset += n
+    return times, values
+
+
+def compute_rmsd_series(topology_path, trajectory_path, selection="backbone", ref_frame=None,
+                        start=None, stop=None, stride=1, time_start=None, time_stop=None,
+                        mass_weighted=False, n_workers=1, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    RMSD (in Angstrom) of each analysed frame against the reference.
+
+    The reference is the topology's own coordinates, or trajectory frame `ref_frame`
+    when given. Returns (frames, times, rmsd).
+    """
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    if ref_frame is None:
+        reference = select_atoms(load_universe(topology_path), selection).positions.astype(np.float64)
+        if len(reference) != len(atoms):
+            raise ValueError("Reference structure and trajectory selections differ in size.")
+    else:
+        u.trajectory[ref_frame]
+        reference = atoms.positions.astype(np.float64)
+
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+    times, values = map_frame_parts(rmsd_frames, frames, n_workers, topology_path, trajectory_path,
+                                    selection, reference, mass_weighted, block_size)
+    return frames, times, values
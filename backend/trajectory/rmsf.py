@@ -0,0 +1,125 @@
+"""
+Streaming per-atom and per-residue RMSF.
+
+Each block of frames is fitted onto the reference and folded into running
+per-atom mean and variance accumulators (Welford/Chan updates in float64), so
+memory is O(atoms) regardless of the number of frames. With several workers,
+each part of the frames gets its own accumulator and the parts are merged.
+"""
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+from structure.ingest import load_universe
+
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, map_frame_parts, select_atoms, select_frames
+from .superposition import apply_transforms, fit_transforms
+
+
+class WelfordAccumulator:
+    """Running mean and sum of squared deviations per coordinate, updated a block at a time."""
+
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * (count / total)
+        self.m2 += m2 + delta ** 2 * (self.count * count / total)
+        self.count = total
+
+    def update(self, block):
+        """Fold a block of samples (n_samples, *shape) into the running statistics."""
+        if len(block) == 0:
+            return
+        block = np.asarray(block, dtype=np.float64)
+        block_mean = block.mean(axis=0)
+        self._combine(len(block), block_mean, ((block - block_mean) ** 2).sum(axis=0))
+
+    def merge(self, other):
+        """Fold the statistics of another accumulator (e.g. from a worker) into this one."""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+
+    @property
+    def variance(self):
+        return self.m2 / max(self.count, 1)
+
+
+def residue_average(values, atoms):
+    """Average per-atom values over residues; returns (residues, averages)."""
+    residues = atoms.residues
+    local = np.searchsorted(residues.ix, atoms.resindices)
+    counts = np.bincount(local, minlength=len(residues))
+    sums = np.bincount(local, weights=values, minlength=len(residues))
+    return residues, sums / np.maximum(counts, 1)
+
+
+def rmsf_frames(frames, topology_path, trajectory_path, selection, fit_selection, reference,
+                block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Accumulate fitted positions of `selection` over the given frame indices; used
+    directly and by workers. Returns a one-element object array holding the accumulator.
+    """
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    fit_atoms = select_atoms(u, fit_selection)
+
+    # Read the union of both selections once per frame
+    combined = atoms | fit_atoms
+    atom_index = np.searchsorted(combined.indices, atoms.indices)
+    fit_index = np.searchsorted(combined.indices, fit_atoms.indices)
+
+    accumulator = WelfordAccumulator((len(atoms), 3))
+    for _, _, positions in iter_position_blocks(combined, frames, block_size):
+        transforms = fit_transforms(positions[:, fit_index], reference)
+        accumulator.update(apply_transforms(positions[:, atom_index], *transforms))
+    part = np.empty(1, dtype=object)
+    part[0] = accumulator
+    return (part,)
+
+
+def compute_rmsf(topology_path, trajectory_path, selection="protein", fit_selection="backbone",
+                 start=None, stop=None, stride=1, time_start=None, time_stop=None, n_workers=1,
+                 block_size=DEFAULT_BLOCK_SIZE):
+    """
+    RMSF (Angstrom) of `selection` after fitting every frame on `fit_selection`
+    of the topology structure.
+
+    Returns a dict with the analysed atoms, per-atom RMSF, residues, per-residue
+    RMSF and the number of frames.
+    """
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    fit_atoms = select_atoms(u, fit_selection)
+    reference = select_atoms(load_universe(topology_path), fit_selection).positions.astype(np.float64)
+    if len(reference) != len(fit_atoms):
+        raise ValueError("Reference structure and trajectory fit selections differ in size.")
+
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+    parts, = map_frame_parts(rmsf_frames, frames, n_workers, topology_path, trajectory_path,
+                             selection, fit_selection, reference, block_size)
+    accumulator = WelfordAccumulator((len(atoms), 3))
+    for part in parts:
+        accumulator.merge(part)
+
+    atom_rmsf = np.sqrt(accumulator.variance.sum(axis=1))
+    residues, residue_rmsf = residue_average(atom_rmsf, atoms)
+    return {
+        "atoms": atoms,
+        "atom_rmsf": atom_rmsf,
+        "residues": residues,
+        "residue_rmsf": residue_rmsf,
+        "n_frames": accumulator.count,
+    }
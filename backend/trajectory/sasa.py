@@ -0,0 +1,139 @@
+"""
+Shrake-Rupley solvent accessible surface area over trajectories.
+
+Each atom's probe-expanded sphere is covered with test points; a point is buried
+when it lies inside the expanded sphere of a neighbouring atom. Neighbours come
+from the cell-list search and occlusion is tested for all candidate pairs and
+sphere points at once. Frames can be spread over a process pool.
+"""
+
+import numpy as np
+
+try:
+    import MDAnalysis as mda
+    MDAnalysis_INSTALLED = True
+except ImportError:
+    MDAnalysis_INSTALLED = False
+
+from structure.ingest import load_universe
+
+from .frames import DEFAULT_BLOCK_SIZE, iter_position_blocks, map_frame_parts, select_atoms, select_frames
+from .neighbors import neighbor_pairs
+
+DEFAULT_PROBE_RADIUS = 1.4
+DEFAULT_SPHERE_POINTS = 100
+
+# Van der Waals radii in Angstrom (Bondi), with a generic default for other elements
+VDW_RADII = {"H": 1.2, "C": 1.7, "N": 1.55, "O": 1.52, "S": 1.8, "P": 1.8, "F": 1.47,
+             "CL": 1.75, "BR": 1.85, "I": 1.98, "SE": 1.9, "NA": 2.27, "K": 2.75,
+             "MG": 1.73, "CA": 2.31, "ZN": 1.39, "FE": 1.94}
+DEFAULT_RADIUS = 1.8
+
+# Limits the size of the (pairs, sphere points) occlusion matrix evaluated at once
+_PAIRS_PER_BATCH = 20000
+
+
+def sphere_points(n_points):
+    """Quasi-uniform unit sphere points from the golden-section spiral."""
+    k = np.arange(n_points) + 0.5
+    z = 1.0 - 2.0 * k / n_points
+    r = np.sqrt(1.0 - z * z)
+    phi = np.pi * (3.0 - np.sqrt(5.0)) * k
+    return np.column_stack([r * np.cos(phi), r * np.sin(phi), z])
+
+
+def atom_radii(atoms):
+    """Van der Waals radius per atom from its element (or the first letter of its name)."""
+    if hasattr(atoms, "elements"):
+        elements = [str(element).upper() for element in atoms.elements]
+    else:
+        elements = ["".join(c for c in name if c.isalpha())[:1].upper() for name in atoms.names]
+    return np.array([VDW_RADII.get(element, DEFAULT_RADIUS) for element in elements], dtype=np.float64)
+
+
+def sasa_frame(positions, radii, points):
+    """Per-atom SASA (Angstrom^2) for one frame; `radii` already include the probe."""
+    positions = np.asarray(positions, dtype=np.float64)
+    n_atoms = len(positions)
+    i, j = neighbor_pairs(positions, cutoff=2.0 * radii.max())
+    # Keep overlapping spheres only, in both directions, grouped by the tested atom
+    d = positions[i] - positions[j]
+    overlap = np.einsum('pi,pi->p', d, d) < (radii[i] + radii[j]) ** 2
+    i, j = i[overlap], j[overlap]
+    i, j = np.concatenate([i, j]), np.concatenate([j, i])
+    order = np.argsort(i, kind="stable")
+    i, j = i[order], j[order]
+
+    buried = np.zeros((n_atoms, len(points)), dtype=bool)
+    # Point x_i + R_i u is inside sphere j when u.(x_i - x_j) < (R_j^2 - R_i^2 - |x_i - x_j|^2) / (2 R_i)
+    for start in range(0, len(i), _PAIRS_PER_BATCH):
+        bi = i[start:start + _PAIRS_PER_BATCH]
+        bj = j[start:start + _PAIRS_PER_BATCH]
+        d = positions[bi] - positions[bj]
+        threshold = (radii[bj] ** 2 - radii[bi] ** 2 - np.einsum('pi,pi->p', d, d)) / (2.0 * radii[bi])
+        inside = (d @ points.T) < threshold[:, None]
+        # Pairs are sorted by atom, so OR-reduce each atom's run of rows
+        atoms_in_batch, run_starts = np.unique(bi, return_index=True)
+        buried[atoms_in_batch] |= np.logical_or.reduceat(inside, run_starts, axis=0)
+
+    exposed = 1.0 - buried.mean(axis=1)
+    return 4.0 * np.pi * radii ** 2 * exposed
+
+
+def sasa_frames(frames, topology_path, trajectory_path, selection, probe_radius=DEFAULT_PROBE_RADIUS,
+                n_points=DEFAULT_SPHERE_POINTS, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Compute (times, total SASA, summed per-atom SASA) for the given frame indices;
+    used directly and by workers.
+    """
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    radii = atom_radii(atoms) + probe_radius
+    points = sphere_points(n_points)
+
+    times = np.empty(len(frames), dtype=np.float64)
+    totals = np.empty(len(frames), dtype=np.float64)
+    atom_sums = np.zeros(len(atoms), dtype=np.float64)
+    offset = 0
+    for block_frames, block_times, positions in iter_position_blocks(atoms, frames, block_size):
+        for k in range(len(block_frames)):
+            areas = sasa_frame(positions[k], radii, points)
+            totals[offset + k] = areas.sum()
+            atom_sums += areas
+        times[offset:offset + len(block_frames)] = block_times
+        offset += len(block_frames)
+    return times, totals, atom_sums[None, :]
+
+
+def compute_sasa(topology_path, trajectory_path, selection="protein", start=None, stop=None, stride=1,
+                 time_start=None, time_stop=None, probe_radius=DEFAULT_PROBE_RADIUS,
+                 n_points=DEFAULT_SPHERE_POINTS, n_workers=1, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    SASA time series and per-atom/per-residue averages over the analysed frames.
+
+    Returns a dict with frames, times, total SASA per frame, the analysed atoms, the
+    mean per-atom SASA, residues and the mean per-residue SASA (all in Angstrom^2).
+    """
+    if not MDAnalysis_INSTALLED:
+        raise RuntimeError("MDAnalysis not installed on the server")
+
+    u = load_universe(topology_path, trajectory_path)
+    atoms = select_atoms(u, selection)
+    frames = select_frames(u.trajectory, start, stop, stride, time_start, time_stop)
+    times, totals, atom_sums = map_frame_parts(sasa_frames, frames, n_workers, topology_path,
+                                               trajectory_path, selection, probe_radius, n_points,
+                                               block_size)
+
+    atom_sasa = atom_sums.sum(axis=0) / max(len(frames), 1)
+    residues = atoms.residues
+    local = np.searchsorted(residues.ix, atoms.resindices)
+    residue_sasa = np.bincount(local, weights=atom_sasa, minlength=len(residues))
+    return {
+        "frames": frames,
+        "times": times,
+        "total": totals,
+        "atoms": atoms,
+        "atom_sasa": atom_sasa,
+        "residues": residues,
+        "residue_sasa": residue_sasa,
+    }
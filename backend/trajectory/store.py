@@ -0,0 +1,203 @@
+"""
+Persistent, content-addressed trajectory store.
+
+Uploaded trajectories are hashed while they are streamed to disk and kept under
+the cache directory by content hash. Re-uploading a known trajectory reuses the
+stored file, and with it the frame-offset index MDAnalysis writes next to it
+(`.<name>_offsets.npz`), so opening, counting frames and seeking stay cheap
+after the first request. The least recently used entries are evicted when the
+store grows beyond its size limit, except trajectories a running request holds
+(marked by `.<name>.inuse-<pid>-<id>` files).
+"""
+
+import contextvars
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+from uploads import save_upload
+
+CACHE_DIR = os.environ.get("SIMANA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "simana_cache"))
+TRAJECTORY_DIR = os.path.join(CACHE_DIR, "trajectories")
+COORDINATE_DIR = os.path.join(CACHE_DIR, "coordinates")
+MAX_STORE_BYTES = int(os.environ.get("SIMANA_TRAJECTORY_STORE_BYTES", 20 * (1 << 30)))
+
+TRAJECTORY_EXTENSIONS = (".xtc", ".trr", ".dcd")
+
+# In-use markers created during the current request (None outside of one)
+_held = contextvars.ContextVar("held_trajectories", default=None)
+
+
+def trajectory_extension(filename, default=".xtc"):
+    """Extension of an uploaded trajectory, falling back to XTC for unknown names."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if extension in TRAJECTORY_EXTENSIONS else default
+
+
+def sidecar_paths(path):
+    """Offset index, its lock file and the last-use marker stored next to a trajectory."""
+    directory, name = os.path.split(path)
+    return [os.path.join(directory, f".{name}{suffix}") for suffix in ("_offsets.npz", "_offsets.lock", ".used")]
+
+
+def coordinate_dir(path):
+    """
+    Directory of the converted coordinate arrays of a stored trajectory, or None
+    for trajectories that do not live in the store.
+    """
+    path = os.path.abspath(path)
+    if os.path.dirname(path) != os.path.abspath(TRAJECTORY_DIR):
+        return None
+    return os.path.join(COORDINATE_DIR, os.path.basename(path))
+
+
+def _tree_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+
+
+def mark_used(path):
+    """
+    Record a use of a stored trajectory. A separate marker file is touched because
+    changing the trajectory's own metadata would alter its ctime and invalidate the
+    MDAnalysis offset index.
+    """
+    marker = sidecar_paths(path)[2]
+    with open(marker, "a"):
+        pass
+    os.utime(marker)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _held_paths():
+    """Stored trajectories held by live processes; markers of dead processes are removed."""
+    held = set()
+    for marker in os.listdir(TRAJECTORY_DIR):
+        name, _, holder = marker[1:].partition(".inuse-")
+        if not marker.startswith(".") or not holder:
+            continue
+        try:
+            pid = int(holder.split("-", 1)[0])
+        except ValueError:
+            continue
+        if _pid_alive(pid):
+            held.add(os.path.join(TRAJECTORY_DIR, name))
+        else:
+            try:
+                os.unlink(os.path.join(TRAJECTORY_DIR, marker))
+            except FileNotFoundError:
+                pass
+    return held
+
+
+def _hold(path):
+    """Mark `path` as in use until the current request ends."""
+    held = _held.get()
+    if held is None:
+        return
+    directory, name = os.path.split(path)
+    marker = os.path.join(directory, f".{name}.inuse-{os.getpid()}-{uuid.uuid4().hex}")
+    with open(marker, "w"):
+        pass
+    held.append((path, marker))
+
+
+@contextmanager
+def hold_trajectories():
+    """
+    Request scope: trajectories stored inside it are protected from pruning until
+    it ends, after which the store is pruned once.
+    """
+    held = []
+    token = _held.set(held)
+    try:
+        yield
+    finally:
+        _held.reset(token)
+        for _, marker in held:
+            try:
+                os.unlink(marker)
+            except FileNotFoundError:
+                pass
+        prune_store()
+
+
+def _last_used(path):
+    try:
+        return os.path.getmtime(sidecar_paths(path)[2])
+    except FileNotFoundError:
+        return os.path.getmtime(path)
+
+
+def prune_store(max_bytes=MAX_STORE_BYTES, keep=()):
+    """
+    Remove least recently used trajectories (with their sidecar files and
+    converted coordinates) beyond `max_bytes`, skipping those in `keep` and
+    those held by running requests.
+    """
+    if not os.path.isdir(TRAJECTORY_DIR):
+        return
+    entries = []
+    for name in os.listdir(TRAJECTORY_DIR):
+        path = os.path.join(TRAJECTORY_DIR, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            continue
+        size = os.path.getsize(path) + _tree_size(coordinate_dir(path))
+        entries.append((_last_used(path), size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return
+    keep = set(keep) | _held_paths()
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        for stale in [path] + sidecar_paths(path):
+            try:
+                os.unlink(stale)
+            except FileNotFoundError:
+                pass
+        shutil.rmtree(coordinate_dir(path), ignore_errors=True)
+        total -= size
+
+
+async def store_trajectory_upload(upload):
+    """
+    Stream an uploaded trajectory into the store and return its stored path.
+
+    The path is derived from the content hash, so the same trajectory always maps
+    to the same file; an existing copy is kept untouched (preserving its offset
+    index) and only marked as recently used.
+    """
+    os.makedirs(TRAJECTORY_DIR, exist_ok=True)
+    digest = hashlib.blake2b(digest_size=20)
+    fd, temp_path = tempfile.mkstemp(dir=TRAJECTORY_DIR, prefix=".upload-")
+    os.close(fd)
+    try:
+        await save_upload(upload, temp_path, digest)
+        path = os.path.join(TRAJECTORY_DIR, digest.hexdigest() + trajectory_extension(upload.filename))
+        if not os.path.exists(path):
+            os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    mark_used(path)
+    _hold(path)
+
+    held = _held.get() or []
+    prune_store(keep={path} | {held_path for held_path, _ in held})
+    return path
@@ -0,0 +1,78 @@
+"""
+Batched optimal superposition (Kabsch) of coordinate blocks onto a reference.
+
+All functions work on a whole block of frames, shape (n_frames, n_atoms, 3), with
+the 3x3 covariance matrices and their SVDs computed for every frame at once.
+"""
+
+import numpy as np
+
+
+def _weights(n_atoms, weights):
+    if weights is None:
+        return np.full(n_atoms, 1.0 / n_atoms)
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def center(coordinates, weights=None):
+    """Subtract the (weighted) centre from coordinates of shape (..., n_atoms, 3)."""
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    w = _weights(coordinates.shape[-2], weights)
+    return coordinates - np.einsum('...ni,n->...i', coordinates, w)[..., None, :]
+
+
+def _kabsch(mobile, reference, w):
+    # Per-frame weighted covariance and its SVD; D flips the smallest singular
+    # vector when needed so that the result is a proper rotation.
+    h = np.einsum('bni,n,nj->bij', mobile, w, reference)
+    u, s, vt = np.linalg.svd(h)
+    d = np.sign(np.linalg.det(u) * np.linalg.det(vt))
+    return u, s, vt, d
+
+
+def superposed_rmsd(mobile, reference, weights=None):
+    """
+    RMSD of every frame in `mobile` (n_frames, n_atoms, 3) to `reference` (n_atoms, 3)
+    after optimal superposition. No rotated coordinates are formed.
+    """
+    w = _weights(reference.shape[0], weights)
+    mobile = center(mobile, w)
+    reference = center(reference, w)
+    _, s, _, d = _kabsch(mobile, reference, w)
+    s[:, 2] *= d
+    e0 = np.einsum('bni,bni,n->b', mobile, mobile, w) + np.einsum('ni,ni,n->', reference, reference, w)
+    return np.sqrt(np.maximum(e0 - 2.0 * s.sum(axis=1), 0.0))
+
+
+def fit_transforms(mobile, reference, weights=None):
+    """
+    Optimal rigid-body fits of every frame in `mobile` onto `reference`.
+
+    Returns (mobile_centers, rotations, reference_center) such that
+    (x - mobile_centers[b]) @ rotations[b] + reference_center maps any coordinates x
+    of frame b into the reference frame, e.g. atoms outside the fit selection.
+    """
+    w = _weights(reference.shape[0], weights)
+    mobile = np.asarray(mobile, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)
+    mobile_centers = np.einsum('bni,n->bi', mobile, w)
+    reference_center = reference.T @ w
+    u, _, vt, d = _kabsch(mobile - mobile_centers[:, None, :], reference - reference_center, w)
+    u[:, :, 2] *= d[:, None]
+    return mobile_centers, u @ vt, reference_center
+
+
+def apply_transforms(coordinates, mobile_centers, rotations, reference_center):
+    """Apply per-frame fits from fit_transforms to coordinates (n_frames, n_atoms, 3)."""
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    return (coordinates - mobile_centers[:, None, :]) @ rotations + reference_center
+
+
+def superpose(mobile, reference, weights=None):
+    """
+    Rotate and translate every frame in `mobile` onto `reference`.
+
+    Returns the superposed coordinates (n_frames, n_atoms, 3) in the reference frame.
+    """
+    return apply_transforms(mobile, *fit_transforms(mobile, reference, weights))
@@ -0,0 +1,23 @@
+"""
+Helpers for writing uploaded files to disk without holding them in memory.
+"""
+
+UPLOAD_BLOCK_SIZE = 1 << 20
+
+
+async def save_upload(upload, path, digest=None):
+    """
+    Stream an UploadFile to `path` block by block; returns the number of bytes written.
+    A hashlib object passed as `digest` is updated with the content on the way.
+    """
+    size = 0
+    with open(path, "wb") as f:
+        while True:
+            block = await upload.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            f.write(block)
+            if digest is not None:
+                digest.update(block)
+            size += len(block)
+    return size